@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark subscriber matching on synthetic subscriber sets.
+
+Compares SubscriberIndex with a full scan over all subscribers and checks that
+both select the same subscribers.
+
+Usage: python -m benchmarks.bench_subscribers [--sizes 1000 5000 20000] [--listings 100]
+"""
+
+import argparse
+import random
+import time
+from subscribers import Subscriber, SubscriberIndex, keyword_in, listing_attributes, _in_range
+
+CITIES = ['Delft', 'Den Haag', 'Rotterdam', 'Rijswijk', 'Schiedam', 'Vlaardingen', 'Leiden',
+          'Zoetermeer', 'Pijnacker', 'Voorburg', 'Utrecht', 'Amsterdam', 'Haarlem', 'Gouda']
+KEYWORDS = ['balkon', 'tuin', 'dakterras', 'lift', 'parkeerplaats', 'gemeubileerd', 'gestoffeerd', 'berging']
+
+
+def synthetic_subscribers(count, rng):
+    subscribers = []
+    for number in range(count):
+        min_price = rng.choice([None, 500, 750, 900, 1000, 1200])
+        max_price = rng.choice([None, 1250, 1500, 1750, 2000, 2500])
+        subscribers.append(Subscriber(
+            f"subscriber{number}@example.com",
+            min_price=min_price,
+            max_price=max_price,
+            min_area=rng.choice([None, 30, 40, 50, 60, 75, 90]),
+            min_bedrooms=rng.choice([None, 1, 2, 3]),
+            cities=rng.sample(CITIES, rng.randint(0, 3)),
+            keywords=rng.sample(KEYWORDS, rng.choice([0, 0, 0, 1, 2])),
+        ))
+    return subscribers
+
+
+def synthetic_listings(count, rng):
+    listings = []
+    for number in range(count):
+        city = rng.choice(CITIES)
+        features = [f"{rng.randint(25, 140)} m²", f"{rng.randint(1, 5)} kamers"] + rng.sample(KEYWORDS, 2)
+        listings.append({
+            'id': f"listing-{number}",
+            'title': f"Appartement Teststraat {number}",
+            'price': f"€ {rng.randint(600, 2600):,} per maand".replace(',', '.'),
+            'location': f"{rng.randint(1000, 9999)} AB {city} (Centrum)",
+            'details': ''.join(features),
+            'link': f"https://www.pararius.nl/appartement-te-huur/{city.lower()}/{number:08x}/teststraat",
+        })
+    return listings
+
+
+def full_scan(subscribers, listing):
+    """Baseline: test every subscriber against the listing."""
+    price, area, bedrooms, city, words = listing_attributes(listing)
+    return [
+        s for s in subscribers
+        if _in_range(price, s.min_price, s.max_price)
+        and _in_range(area, s.min_area, s.max_area)
+        and _in_range(bedrooms, s.min_bedrooms, s.max_bedrooms)
+        and (not s.cities or city in s.cities)
+        and (not s.keywords or any(keyword_in(keyword, words) for keyword in s.keywords))
+    ]
+
+
+def run(sizes, listing_count, seed=42):
+    rng = random.Random(seed)
+    listings = synthetic_listings(listing_count, rng)
+    results = []
+
+    for size in sizes:
+        subscribers = synthetic_subscribers(size, rng)
+
+        start = time.perf_counter()
+        index = SubscriberIndex(subscribers)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        indexed = [index.match(listing) for listing in listings]
+        index_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        scanned = [full_scan(subscribers, listing) for listing in listings]
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        assert [[s.email for s in matched] for matched in indexed] == [[s.email for s in matched] for matched in scanned]
+        matched = sum(len(m) for m in indexed)
+        results.append({
+            'subscribers': size,
+            'listings': listing_count,
+            'build_ms': round(build_ms, 2),
+            'index_batch_ms': round(index_ms, 2),
+            'scan_batch_ms': round(scan_ms, 2),
+            'matches': matched,
+        })
+        print(f"{size:>7} subscribers: build {build_ms:8.2f} ms | index {index_ms:8.2f} ms | "
+              f"full scan {scan_ms:9.2f} ms | {matched} matches for {listing_count} listings")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Subscriber matching benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--listings', type=int, default=100)
+    args = parser.parse_args()
+    run(args.sizes, args.listings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Synthetic Pararius search pages in the markup the scraper parses.
+
+Listings are derived from their number and a seed, so the same listing renders
+identically on every page and in every run.
+"""
+
+import hashlib
+import random
+from typing import Dict, Iterable, Optional
+
+STREETS = ['Oude Delft', 'Van Foreestweg', 'Westlandseweg', 'Papsouwselaan', 'Kanaalweg', 'Voorstraat',
+           'Buitenwatersloot', 'Mijnbouwstraat', 'Hugo de Grootstraat', 'Brabantse Turfmarkt']
+CITIES = [('Delft', 'delft'), ('Den Haag', 'den-haag'), ('Rijswijk', 'rijswijk'), ('Rotterdam', 'rotterdam'),
+          ('Schiedam', 'schiedam'), ('Leiden', 'leiden')]
+KINDS = [('Appartement', 'appartement'), ('Huis', 'huis'), ('Studio', 'studio'), ('Kamer', 'kamer')]
+INTERIORS = ['Gestoffeerd', 'Gemeubileerd', 'Kaal']
+
+_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="nl">
+<head>
+    <meta charset="utf-8">
+    <title>Huurwoningen - Pararius</title>
+    <script nonce="{nonce}">window.dataLayer = window.dataLayer || [];</script>
+</head>
+<body>
+<main class="page__main">
+    <section class="search-list">
+        <ul class="search-list">
+"""
+
+_LISTING = """            <li class="search-list__item search-list__item--listing">
+                <section class="listing-search-item listing-search-item--list listing-search-item--for-rent">
+                    <h2 class="listing-search-item__title">
+                        <a class="listing-search-item__link listing-search-item__link--title" href="{href}">
+                            {title}
+                        </a>
+                    </h2>
+                    <div class="listing-search-item__location">{location}</div>
+                    <div class="listing-search-item__price">{price}</div>
+                    <div class="listing-search-item__details">
+                        <ul class="illustrated-features">
+                            <li class="illustrated-features__item illustrated-features__item--surface-area">{area} m²</li>
+                            <li class="illustrated-features__item illustrated-features__item--number-of-rooms">{rooms} {rooms_label}</li>
+                            <li class="illustrated-features__item illustrated-features__item--interior">{interior}</li>
+                        </ul>
+                    </div>
+                </section>
+            </li>
+"""
+
+_PAGE_TAIL = """        </ul>
+    </section>
+{pagination}</main>
+</body>
+</html>
+"""
+
+
+_SLUG_MULTIPLIER = 0x9E3779B1
+
+
+def _seed_offset(seed: int) -> int:
+    return int.from_bytes(hashlib.blake2b(str(seed).encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def listing_fields(number: int, seed: int = 0, price_offset: int = 0) -> Dict:
+    """The fields of synthetic listing `number`; price_offset simulates a price change."""
+    rng = random.Random(seed * 1_000_003 + number)
+    street = rng.choice(STREETS)
+    city, city_slug = rng.choice(CITIES)
+    kind, kind_slug = rng.choice(KINDS)
+    house_number = rng.randint(1, 250)
+    rooms = rng.randint(1, 5)
+    price = rng.randint(6, 26) * 100 + rng.choice([0, 25, 47, 95]) + price_offset
+    # The slug is the listing's ID: an odd multiplier keeps it unique within a seed, and the hashed seed
+    # offset makes a clash between listings of different seeds as unlikely as between real listings
+    slug = f"{(number * _SLUG_MULTIPLIER + _seed_offset(seed)) & 0xffffffff:08x}"
+    return {
+        'slug': slug,
+        'href': f"/{kind_slug}-te-huur/{city_slug}/{slug}/{street.lower().replace(' ', '-')}",
+        'title': f"{kind} {street} {house_number}",
+        'location': f"{rng.randint(1000, 9999)} {rng.choice('ABCDEFGH')}{rng.choice('JKLMNPRS')} {city} (Centrum)",
+        'price': f"€ {price:,} per maand".replace(',', '.'),
+        'area': rng.randint(18, 160),
+        'rooms': rooms,
+        'rooms_label': 'kamer' if rooms == 1 else 'kamers',
+        'interior': rng.choice(INTERIORS),
+    }
+
+
+_DETAIL_PAGE = """<!DOCTYPE html>
+<html lang="nl">
+<head>
+    <meta charset="utf-8">
+    <title>{title} - Pararius</title>
+</head>
+<body>
+<main class="page__main">
+    <h1 class="listing-detail-summary__title">{title}</h1>
+    <section class="page__details page__details--features">
+        <dl class="listing-features__list">
+            <dt class="listing-features__term">Huurprijs</dt>
+            <dd class="listing-features__description listing-features__description--for_rent_price"><span class="listing-features__main-description">{price}</span></dd>
+            <dt class="listing-features__term">Borg</dt>
+            <dd class="listing-features__description listing-features__description--deposit"><span class="listing-features__main-description">{deposit}</span></dd>
+            <dt class="listing-features__term">Aanvaarding</dt>
+            <dd class="listing-features__description listing-features__description--acceptance"><span class="listing-features__main-description">{available_from}</span></dd>
+            <dt class="listing-features__term">Interieur</dt>
+            <dd class="listing-features__description listing-features__description--interior"><span class="listing-features__main-description">{interior}</span></dd>
+            <dt class="listing-features__term">Energielabel</dt>
+            <dd class="listing-features__description listing-features__description--energy_label"><span class="listing-features__main-description">{energy_label}</span><span class="listing-features__sub-description">Indicatief</span></dd>
+        </dl>
+    </section>
+</main>
+</body>
+</html>
+"""
+
+
+def detail_fields(number: int, seed: int = 0) -> Dict:
+    """Listing fields plus the features shown on the detail page of listing `number`."""
+    fields = listing_fields(number, seed)
+    rng = random.Random(seed * 1_000_003 + number + 7)
+    fields.update({
+        'deposit': f"€ {rng.randint(8, 40) * 100:,}".replace(',', '.'),
+        'available_from': rng.choice(['Per direct', f"Vanaf {rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2025"]),
+        'energy_label': rng.choice(['A++', 'A', 'B', 'C', 'D', 'E', 'F', 'G']),
+    })
+    return fields
+
+
+def render_detail_page(fields: Dict) -> str:
+    return _DETAIL_PAGE.format(**fields)
+
+
+def render_listing(fields: Dict) -> str:
+    return _LISTING.format(**fields)
+
+
+def render_pagination(path: str, page: int, page_count: int) -> str:
+    if page_count <= 1:
+        return ''
+    items = []
+    for number in range(1, page_count + 1):
+        if number == page:
+            items.append(f'            <li class="pagination__item pagination__item--active"><span class="pagination__link pagination__link--active">{number}</span></li>\n')
+        else:
+            href = path if number == 1 else f"{path}/page-{number}"
+            items.append(f'            <li class="pagination__item"><a class="pagination__link" href="{href}">{number}</a></li>\n')
+    return ('    <div class="pagination">\n        <ul class="pagination__list">\n'
+            + ''.join(items) + '        </ul>\n    </div>\n')
+
+
+def render_page(listings: Iterable[Dict], path: str = '/huurwoningen/delft', page: int = 1,
+                page_count: int = 1, nonce: Optional[str] = None) -> str:
+    """Render a search results page with the given listing fields and pagination."""
+    parts = [_PAGE_HEAD.format(nonce=nonce or f"{page:010x}")]
+    parts.extend(render_listing(fields) for fields in listings)
+    parts.append(_PAGE_TAIL.format(pagination=render_pagination(path, page, page_count)))
+    return ''.join(parts)
+
+
+def synthetic_page(count: int, seed: int = 0, **kwargs) -> str:
+    """A page with `count` distinct listings."""
+    return render_page((listing_fields(number, seed) for number in range(count)), **kwargs)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the scrape and notify hot paths.
+
+Times parsing (both engines), per-container extraction, the new-listing diff,
+email rendering and persistence on the saved fixtures and on synthetic pages
+of 30 to 10,000 listings, and the parse pool against in-process parsing on
+crawls of 1 to 64 pages to find where the pool starts to pay off. Results are written as JSON; with --baseline every
+case is compared against a saved run and the exit status is 1 when one got
+slower than the threshold allows.
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from benchmarks.pages import synthetic_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+FULL_SIZES = [30, 300, 3000, 10000]
+QUICK_SIZES = [30, 300]
+# BeautifulSoup is too slow to be worth timing on the largest pages
+SOUP_MAX_SIZE = 3000
+EMAIL_SIZES = [10, 100, 500]
+# Pages per crawl for the parse pool, 30 listings each
+FULL_PAGE_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+QUICK_PAGE_COUNTS = [1, 4, 16]
+
+
+def measure(run: Callable, setup: Optional[Callable] = None, repeat: int = 5) -> Dict:
+    """Time `run` `repeat` times; `setup` prepares a fresh argument for each run, untimed."""
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        run(argument) if setup else run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'repeat': repeat,
+    }
+
+
+def _load_fixtures() -> List[str]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'search_page_*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+def _make_scraper():
+    from scraper import ParariusScraper
+    scraper = ParariusScraper()
+    scraper.history = None
+    return scraper
+
+
+def bench_parsing(results: Dict, sizes: List[int], repeat: int):
+    scraper = _make_scraper()
+    soup_scraper = _make_scraper()
+    soup_scraper.fast_parser = None
+
+    fixtures = _load_fixtures()
+    results['parse_listings/lxml/fixtures'] = dict(
+        measure(lambda: [scraper.parse_listings(page) for page in fixtures], repeat=repeat), items=len(fixtures))
+    results['parse_listings/soup/fixtures'] = dict(
+        measure(lambda: [soup_scraper.parse_listings(page) for page in fixtures], repeat=repeat), items=len(fixtures))
+
+    for size in sizes:
+        page = synthetic_page(size)
+        results[f'parse_listings/lxml/{size}'] = dict(measure(lambda: scraper.parse_listings(page), repeat=repeat), items=size)
+        if size > SOUP_MAX_SIZE:
+            continue
+        results[f'parse_listings/soup/{size}'] = dict(measure(lambda: soup_scraper.parse_listings(page), repeat=repeat), items=size)
+
+        containers = BeautifulSoup(page, 'lxml').find_all('li', class_='search-list__item')
+        results[f'extract_listing_data/{size}'] = dict(
+            measure(lambda: [scraper._extract_listing_data(container) for container in containers], repeat=repeat), items=size)
+
+
+def bench_parse_pool(results: Dict, page_counts: List[int], repeat: int, workers: int) -> Optional[int]:
+    """parse_pages in-process and in a warm pool of `workers` processes; returns the fewest pages where the pool wins."""
+    from parse_pool import ParsePool
+
+    scraper = _make_scraper()
+    pooled = _make_scraper()
+    # Every batch goes to the pool, however small, to find where that starts to pay off
+    pooled.parse_pool = ParsePool(workers, min_bytes=0)
+    pages = [synthetic_page(30, seed=page) for page in range(max(page_counts))]
+    pooled.parse_pages(pages[:2])
+
+    crossover = None
+    try:
+        for count in page_counts:
+            batch = pages[:count]
+            local = dict(measure(lambda: [scraper.parse_listings(page) for page in batch], repeat=repeat), items=count)
+            pool = dict(measure(lambda: pooled.parse_pages(batch), repeat=repeat), items=count)
+            results[f'parse_pages/process/{count}'] = local
+            results[f'parse_pages/pool{workers}/{count}'] = pool
+            if crossover is None and count > 1 and pool['median_ms'] < local['median_ms']:
+                crossover = count
+    finally:
+        pooled.close()
+    return crossover
+
+
+def bench_diff(results: Dict, sizes: List[int], repeat: int):
+    """get_new_listings with half of the listings already in the seen store."""
+    from near_duplicates import NearDuplicateIndex
+    from seen_store import SQLiteSeenStore
+
+    for size in sizes:
+        scraper = _make_scraper()
+        listings = scraper.parse_listings(synthetic_page(size))
+        scraper.crawl = lambda url: (listings, True)
+        directory = tempfile.mkdtemp(dir='.')
+
+        def setup():
+            if scraper._seen_store is not None:
+                scraper._seen_store.close()
+            path = os.path.join(directory, f"seen-{time.perf_counter_ns()}.db")
+            scraper.seen_store = SQLiteSeenStore(path)
+            scraper.seen_store.mark_seen(listing['id'] for listing in listings[::2])
+            if scraper._duplicate_index is not None:
+                scraper._duplicate_index.close()
+            scraper.duplicate_index = NearDuplicateIndex(os.path.join(directory, f"duplicates-{time.perf_counter_ns()}.db"))
+
+        results[f'get_new_listings/{size}'] = dict(measure(lambda _: scraper.get_new_listings(), setup, repeat), items=size)
+        scraper.seen_store.close()
+        scraper.duplicate_index.close()
+
+
+def bench_email(results: Dict, repeat: int):
+    from sendgrid_notifier import SendGridNotifier
+    notifier = SendGridNotifier()
+    scraper = _make_scraper()
+
+    for size in EMAIL_SIZES:
+        listings = scraper.parse_listings(synthetic_page(size))
+        # Cold: every listing fragment rendered, as for the first email of a batch
+        results[f'create_email_content/{size}'] = dict(
+            measure(lambda _: notifier.create_email_content(listings), notifier.renderer.clear, repeat), items=size)
+        # Warm: fragments cached, as for further subscribers receiving the same listings
+        notifier.renderer.render(listings)
+        results[f'render_email_cached/{size}'] = dict(
+            measure(lambda: notifier.renderer.render(listings), repeat=repeat), items=size)
+    notifier.close()
+
+
+def bench_persistence(results: Dict, sizes: List[int], repeat: int):
+    from history_store import ListingHistory
+    from notification_log import NotificationLog
+    from seen_store import SQLiteSeenStore
+
+    scraper = _make_scraper()
+    for size in sizes:
+        listings = scraper.parse_listings(synthetic_page(size))
+        directory = tempfile.mkdtemp(dir='.')
+
+        def fresh_path(name):
+            return os.path.join(directory, f"{name}-{time.perf_counter_ns()}")
+
+        def mark_seen(store):
+            store.mark_seen(listing['id'] for listing in listings)
+            store.close()
+
+        results[f'persist/seen_store/{size}'] = dict(
+            measure(mark_seen, lambda: SQLiteSeenStore(fresh_path('seen')), repeat), items=size)
+
+        def append(log):
+            log.append({'timestamp': datetime.now().isoformat(), 'count': len(listings), 'listings': listings})
+            log.close()
+
+        results[f'persist/notification_log/{size}'] = dict(
+            measure(append, lambda: NotificationLog(fresh_path('notifications')), repeat), items=size)
+        results[f'persist/history/{size}'] = dict(
+            measure(lambda history: history.record(listings), lambda: ListingHistory(fresh_path('history')), repeat), items=size)
+
+
+def run(sizes: List[int], repeat: int = 5, page_counts: Optional[List[int]] = None,
+        parse_workers: Optional[int] = None) -> Dict:
+    """Run every benchmark in a scratch directory and return the results document."""
+    results: Dict[str, Dict] = {}
+    page_counts = page_counts or FULL_PAGE_COUNTS
+    # At least two, so a single-core machine still shows what the pool costs
+    parse_workers = parse_workers or max(os.cpu_count() or 1, 2)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        # Stores and logs created by the code under test land in the scratch directory
+        os.chdir(scratch)
+        try:
+            bench_parsing(results, sizes, repeat)
+            crossover = bench_parse_pool(results, page_counts, repeat, parse_workers)
+            bench_diff(results, sizes, repeat)
+            bench_email(results, repeat)
+            bench_persistence(results, sizes, repeat)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': repeat,
+            'cpus': os.cpu_count(),
+            # Fewest pages per crawl the pool parsed faster than the scraper's own process; None if it never did
+            'parse_pool': {'workers': parse_workers, 'crossover_pages': crossover},
+        },
+        'results': results,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, noise_floor_ms: float = 0.5) -> List[Dict]:
+    """Cases whose median got more than `threshold` (0.25 = 25%) slower than the baseline.
+
+    Cases missing from either run are skipped, as are cases faster than
+    noise_floor_ms in the baseline, where timer jitter dominates.
+    """
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous or previous['median_ms'] < noise_floor_ms:
+            continue
+        ratio = current['median_ms'] / previous['median_ms']
+        if ratio > 1 + threshold:
+            regressions.append({
+                'case': name,
+                'baseline_ms': previous['median_ms'],
+                'current_ms': current['median_ms'],
+                'ratio': round(ratio, 2),
+            })
+    return regressions
+
+
+def print_results(results: Dict, baseline: Optional[Dict] = None):
+    for name, current in results['results'].items():
+        line = f"{name:<36} {current['median_ms']:>10.3f} ms"
+        previous = baseline['results'].get(name) if baseline else None
+        if previous:
+            line += f"  (baseline {previous['median_ms']:.3f} ms, x{current['median_ms'] / previous['median_ms']:.2f})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline scraper benchmarks')
+    parser.add_argument('--quick', action='store_true', help=f'Only run sizes {QUICK_SIZES}')
+    parser.add_argument('--sizes', type=int, nargs='+', help='Synthetic page sizes (listings per page)')
+    parser.add_argument('--parse-workers', type=int, help='Parse pool size to compare against in-process parsing (default: CPU count)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the median is reported')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown before a case fails (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    # The code under test logs every page it parses
+    logging.disable(logging.INFO)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else FULL_SIZES)
+    page_counts = QUICK_PAGE_COUNTS if args.quick else FULL_PAGE_COUNTS
+    results = run(sizes, args.repeat, page_counts, args.parse_workers)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    parse_pool = results['meta']['parse_pool']
+    print(f"Parse pool of {parse_pool['workers']} on {results['meta']['cpus']} CPU(s) pays off from "
+          + (f"{parse_pool['crossover_pages']} pages per crawl" if parse_pool['crossover_pages'] else "no page count measured"))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']}: {regression['baseline_ms']:.3f} ms -> "
+                  f"{regression['current_ms']:.3f} ms (x{regression['ratio']})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
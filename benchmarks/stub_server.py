@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Pararius search pages.
+
+Serves generated search results in the markup the scraper parses, for any
+search path, with pagination, ETags, optional latency, injected 429/503
+responses and listing churn, plus a detail page for every listing link. Point the scraper at it with --base-url (or
+PARARIUS_BASE_URL) to measure throughput, backoff and correctness under churn
+without touching the real site. GET /_stats returns the response counters.
+
+Usage:
+    python -m benchmarks.stub_server --port 8765 --listings 300 --latency 0.05 --rate-429 0.05 --churn-rate 0.1
+    python main.py --once --base-url http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.pages import detail_fields, listing_fields, render_detail_page, render_page
+
+_PAGE_PATH = re.compile(r'^(.*?)(?:/page-(\d+))?/?$')
+# Listing links look like /appartement-te-huur/delft/0000002a/oude-delft
+_DETAIL_PATH = re.compile(r'^/[a-z]+-te-huur/[a-z-]+/([0-9a-f]{8})/[^/]+/?$')
+
+
+class StubPararius:
+    """Generates the pages; shared by every request handler thread.
+
+    Each search path gets its own stable set of listings. With churn enabled,
+    every churn_interval seconds (or every call to churn()) the oldest
+    churn_rate fraction of a search's listings is replaced by new ones, which
+    appear first on page 1 as on the real site.
+    """
+
+    def __init__(self, listings: int = 300, page_size: int = 30, latency: float = 0.0, jitter: float = 0.0,
+                 rate_429: float = 0.0, rate_503: float = 0.0, retry_after: int = 1,
+                 churn_rate: float = 0.0, churn_interval: float = 60.0, seed: int = 0):
+        self.listings = listings
+        self.page_size = max(page_size, 1)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_503 = rate_503
+        self.retry_after = retry_after
+        self.churn_rate = churn_rate
+        self.churn_interval = churn_interval
+        self.seed = seed
+
+        self.started = time.monotonic()
+        self.manual_epochs = 0
+        self.stats: Dict[str, int] = {'requests': 0, 'details': 0, '200': 0, '304': 0, '404': 0, '429': 0, '503': 0, 'bytes': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def churn(self):
+        """Advance the listings by one churn step immediately."""
+        with self._lock:
+            self.manual_epochs += 1
+
+    def epoch(self) -> int:
+        if not self.churn_rate:
+            return 0
+        elapsed = int((time.monotonic() - self.started) // self.churn_interval) if self.churn_interval > 0 else 0
+        return elapsed + self.manual_epochs
+
+    def page_count(self) -> int:
+        return max(-(-self.listings // self.page_size), 1)
+
+    def listing_numbers(self) -> List[int]:
+        """Listing numbers currently online, newest first."""
+        step = max(round(self.listings * self.churn_rate), 1) if self.churn_rate else 0
+        first = self.epoch() * step
+        return list(range(first + self.listings - 1, first - 1, -1))
+
+    def render(self, path: str, page: int) -> Optional[str]:
+        if page < 1 or page > self.page_count():
+            return None
+        search_seed = zlib.crc32(path.encode('utf-8')) ^ self.seed
+        numbers = self.listing_numbers()[(page - 1) * self.page_size:page * self.page_size]
+        return render_page((listing_fields(number, search_seed) for number in numbers),
+                           path=path, page=page, page_count=self.page_count())
+
+    def render_detail(self, number: int) -> str:
+        return render_detail_page(detail_fields(number, self.seed))
+
+    def fault(self) -> Optional[int]:
+        """Status code of an injected failure for this request, if any."""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_503:
+            return 503
+        return None
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._rng.uniform(0, self.jitter)
+            time.sleep(self.latency + extra)
+
+    def count_detail(self):
+        with self._lock:
+            self.stats['details'] += 1
+
+    def count(self, status: int, size: int = 0):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[str(status)] = self.stats.get(str(status), 0) + 1
+            self.stats['bytes'] += size
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    stub: StubPararius = None
+    verbose = False
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/_stats':
+            self._send(200, json.dumps(self.stub.stats).encode('utf-8'), 'application/json', count=False)
+            return
+
+        self.stub.delay()
+        status = self.stub.fault()
+        if status:
+            headers = {'Retry-After': str(self.stub.retry_after)} if status == 429 else {}
+            self._send(status, b'', 'text/plain', headers)
+            return
+
+        detail = _DETAIL_PATH.match(path)
+        if detail:
+            self.stub.count_detail()
+            body = self.stub.render_detail(int(detail.group(1), 16))
+        else:
+            search_path, page = _PAGE_PATH.match(path).groups()
+            body = self.stub.render(search_path or '/', int(page or 1))
+        if body is None:
+            self._send(404, b'', 'text/plain')
+            return
+
+        encoded = body.encode('utf-8')
+        etag = f'"{hashlib.sha1(encoded).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', None, {'ETag': etag})
+            return
+        self._send(200, encoded, 'text/html; charset=utf-8', {'ETag': etag})
+
+    def _send(self, status: int, body: bytes, content_type: Optional[str], headers: Optional[Dict] = None, count: bool = True):
+        # Count before responding, so a client that reads /_stats right after sees its own request
+        if count:
+            self.stub.count(status, len(body))
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+def start_server(stub: StubPararius, host: str = '127.0.0.1', port: int = 0,
+                 verbose: bool = False) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the stub on a background thread; returns the server and its base URL."""
+    handler = type('BoundStubHandler', (StubHandler,), {'stub': stub, 'verbose': verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Pararius stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--listings', type=int, default=300, help='Listings per search')
+    parser.add_argument('--page-size', type=int, default=30, help='Listings per page')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra seconds, at random')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests answered 429')
+    parser.add_argument('--rate-503', type=float, default=0.0, help='Fraction of requests answered 503')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--churn-rate', type=float, default=0.0, help='Fraction of listings replaced per churn step')
+    parser.add_argument('--churn-interval', type=float, default=60.0, help='Seconds between churn steps')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    stub = StubPararius(
+        listings=args.listings, page_size=args.page_size, latency=args.latency, jitter=args.jitter,
+        rate_429=args.rate_429, rate_503=args.rate_503, retry_after=args.retry_after,
+        churn_rate=args.churn_rate, churn_interval=args.churn_interval, seed=args.seed
+    )
+    server, base_url = start_server(stub, args.host, args.port, args.verbose)
+    print(f"Serving {args.listings} listings per search on {base_url} "
+          f"({stub.page_count()} page(s) of {stub.page_size}); stats at {base_url}/_stats")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
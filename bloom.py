@@ -0,0 +1,200 @@
+"""
+Bloom filters for the seen-listing index.
+
+ScalableBloomFilter grows by adding slices, each twice the size of the last
+and with a tighter error rate, so it never needs its final size up front and
+the overall false positive rate stays below the configured one.
+WindowedBloomFilter keeps one scalable filter per time window and drops
+windows older than the TTL: a key is remembered while it was added within
+the TTL (plus up to one window), and memory follows the number of keys seen
+recently, not all time. Bloom filters never forget a key they were given, so
+"not in the filter" always means "never seen".
+"""
+
+import hashlib
+import json
+import math
+import struct
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+_MAGIC = b'SBF1'
+_LN2_SQUARED = math.log(2) ** 2
+
+
+def _hashes(key: str) -> Tuple[int, int]:
+    """Two independent 64-bit hashes; bit i of a slice is (h1 + i * h2) mod m."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class _Slice:
+    __slots__ = ('capacity', 'error_rate', 'size', 'hash_count', 'bits', 'count')
+
+    def __init__(self, capacity: int, error_rate: float, count: int = 0, bits: Optional[bytearray] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(math.ceil(-capacity * math.log(error_rate) / _LN2_SQUARED), 8)
+        self.hash_count = max(math.ceil(math.log2(1 / error_rate)), 1)
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def __contains__(self, hashes: Tuple[int, int]) -> bool:
+        h1, h2 = hashes
+        bits, size = self.bits, self.size
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, hashes: Tuple[int, int]):
+        h1, h2 = hashes
+        bits, size = self.bits, self.size
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    def __init__(self, capacity: int = 1024, error_rate: float = 0.001, growth: int = 2, tightening: float = 0.5):
+        self.initial_capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.slices: List[_Slice] = []
+
+    def _contains(self, hashes: Tuple[int, int]) -> bool:
+        # Newest slices hold the most keys, check them first
+        return any(hashes in piece for piece in reversed(self.slices))
+
+    def __contains__(self, key: str) -> bool:
+        return self._contains(_hashes(key))
+
+    def add(self, key: str) -> bool:
+        """Add a key; returns False when it was (probably) present already."""
+        hashes = _hashes(key)
+        if self._contains(hashes):
+            return False
+        if not self.slices or self.slices[-1].count >= self.slices[-1].capacity:
+            # Error rates of the slices form a geometric series summing to at most error_rate
+            self.slices.append(_Slice(
+                self.initial_capacity * self.growth ** len(self.slices),
+                self.error_rate * (1 - self.tightening) * self.tightening ** len(self.slices)
+            ))
+        self.slices[-1].add(hashes)
+        return True
+
+    def __len__(self) -> int:
+        return sum(piece.count for piece in self.slices)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(piece.bits) for piece in self.slices)
+
+
+class WindowedBloomFilter:
+    """Scalable Bloom filters per time window, forgetting keys not added for `ttl` seconds.
+
+    ttl=0 keeps a single filter forever. Every method takes the time the key
+    was seen, so history loaded from a store lands in the window it belongs to.
+    """
+
+    def __init__(self, ttl: float = 0.0, error_rate: float = 0.001, windows: int = 4, capacity: int = 1024):
+        self.ttl = ttl
+        self.error_rate = error_rate
+        self.windows = windows
+        self.capacity = capacity
+        self.window = ttl / windows if ttl > 0 else math.inf
+        # Window number -> filter of the keys added during it
+        self.generations: Dict[int, ScalableBloomFilter] = {}
+        # Every key added with a time up to here is in the filter; saved with it by to_bytes()
+        self.synced: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _window_of(self, seen: float) -> int:
+        return int(seen // self.window) if self.window != math.inf else 0
+
+    def _new_generation(self) -> ScalableBloomFilter:
+        # Each window answers with a share of the error budget, so the union stays within error_rate
+        return ScalableBloomFilter(self.capacity, self.error_rate / (self.windows + 1))
+
+    def add(self, key: str, seen: float) -> bool:
+        """Record a key as seen at `seen`; returns True when the filter changed."""
+        window = self._window_of(seen)
+        with self._lock:
+            generation = self.generations.get(window)
+            if generation is None:
+                generation = self.generations[window] = self._new_generation()
+            return generation.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        hashes = _hashes(key)
+        with self._lock:
+            return any(generation._contains(hashes) for generation in self.generations.values())
+
+    def expire(self, now: float) -> int:
+        """Drop the windows that ended more than ttl ago; returns how many were dropped."""
+        if self.window == math.inf:
+            return 0
+        oldest = self._window_of(now - self.ttl)
+        with self._lock:
+            doomed = [window for window in self.generations if window < oldest]
+            for window in doomed:
+                del self.generations[window]
+        return len(doomed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(generation) for generation in self.generations.values())
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(generation.nbytes for generation in self.generations.values())
+
+    def compatible(self, other: 'WindowedBloomFilter') -> bool:
+        return (self.ttl, self.error_rate, self.windows) == (other.ttl, other.error_rate, other.windows)
+
+    def to_bytes(self) -> bytes:
+        with self._lock:
+            header = {
+                'ttl': self.ttl, 'error_rate': self.error_rate, 'windows': self.windows,
+                'capacity': self.capacity, 'synced': self.synced,
+                'generations': [
+                    [window, [[piece.capacity, piece.error_rate, piece.count] for piece in generation.slices]]
+                    for window, generation in self.generations.items()
+                ],
+            }
+            bits = b''.join(piece.bits for generation in self.generations.values() for piece in generation.slices)
+        encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        return _MAGIC + zlib.compress(struct.pack('>I', len(encoded)) + encoded + bits, 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'WindowedBloomFilter':
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("not a saved Bloom filter")
+        payload = zlib.decompress(data[len(_MAGIC):])
+        (length,) = struct.unpack('>I', payload[:4])
+        header = json.loads(payload[4:4 + length])
+        bloom = cls(header['ttl'], header['error_rate'], header['windows'], header['capacity'])
+        bloom.synced = header['synced']
+        offset = 4 + length
+        for window, slices in header['generations']:
+            generation = bloom._new_generation()
+            for capacity, error_rate, count in slices:
+                piece = _Slice(capacity, error_rate, count)
+                piece.bits = bytearray(payload[offset:offset + len(piece.bits)])
+                offset += len(piece.bits)
+                generation.slices.append(piece)
+            bloom.generations[window] = generation
+        if offset != len(payload):
+            raise ValueError("truncated Bloom filter")
+        return bloom
+
+    @classmethod
+    def load(cls, path: str) -> 'WindowedBloomFilter':
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
@@ -1,19 +1,132 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+
+def _load_env_file(path: str):
+    """Set the KEY=value lines of a .env file that the environment does not set already.
+
+    Covers what python-dotenv's load_dotenv does for this project's .env files
+    (comments, `export`, quoted values) without importing it on every start.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('export '):
+                line = line[len('export '):].lstrip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = (part.strip() for part in line.split('=', 1))
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+                value = value[1:-1]
+            else:
+                value = value.split(' #', 1)[0].rstrip()
+            os.environ.setdefault(key, value)
+
+
+# Load environment variables from a .env file next to this module or in the working directory;
+# deployments set real environment variables instead
+for _env_file in (os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'), os.path.abspath('.env')):
+    if os.path.isfile(_env_file):
+        _load_env_file(_env_file)
+        break
 
 # Website configuration
 TARGET_URL = "https://www.pararius.nl/huurwoningen/delft/0-1500/straal-10/2-slaapkamers"
+# Scheme and host that search URLs are sent to; point at a local stand-in server (benchmarks/stub_server.py) for testing
+PARARIUS_BASE_URL = os.getenv('PARARIUS_BASE_URL', 'https://www.pararius.nl')
 CHECK_INTERVAL_MINUTES = int(os.getenv('CHECK_INTERVAL_MINUTES', 30))  # How often to check for new listings
 
+# Adaptive scheduling in continuous mode: each search's interval follows its recent rate of new listings
+MIN_CHECK_INTERVAL_SECONDS = float(os.getenv('MIN_CHECK_INTERVAL_SECONDS', 60))
+MAX_CHECK_INTERVAL_SECONDS = float(os.getenv('MAX_CHECK_INTERVAL_SECONDS', 3600))
+TARGET_NEW_PER_CHECK = float(os.getenv('TARGET_NEW_PER_CHECK', 1))  # New listings one check should find on average
+ARRIVAL_RATE_SMOOTHING = float(os.getenv('ARRIVAL_RATE_SMOOTHING', 0.3))  # Weight of the latest check in the rate average
+SCHEDULE_JITTER = float(os.getenv('SCHEDULE_JITTER', 0.1))  # Random +/- fraction added to every interval
+SCHEDULE_PROFILES = os.getenv('SCHEDULE_PROFILES', '')  # e.g. "08:00-18:00=0.5;00:00-07:00=4" scales the interval by time of day
+MAX_PAGES = int(os.getenv('MAX_PAGES', 20))  # Upper bound on result pages crawled per search
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', 4))  # Concurrent page fetches per search
+PARSER_ENGINE = os.getenv('PARSER_ENGINE', 'lxml')  # 'lxml' (fast path) or 'soup' (BeautifulSoup fallback)
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 0))  # Processes parsing result pages (0 parses in the scraper's process)
+PARSE_POOL_MIN_BYTES = int(os.getenv('PARSE_POOL_MIN_BYTES', 256 * 1024))  # Smaller crawls are parsed in-process; see parse_pages in the benchmarks
+PARSE_BATCH_BYTES = int(os.getenv('PARSE_BATCH_BYTES', 128 * 1024))  # Page bytes sent to a parse worker per task
+
+# Multiple searches per run (see searches_example.json); falls back to TARGET_URL when the file is missing
+SEARCHES_FILE = os.getenv('SEARCHES_FILE', 'searches.json')
+SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', 8))  # Searches crawled concurrently
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 8))  # Global cap on in-flight requests
+HOST_RATE_LIMIT = float(os.getenv('HOST_RATE_LIMIT', 2))  # Sustained requests per second per host (0 disables)
+HOST_RATE_BURST = float(os.getenv('HOST_RATE_BURST', 4))  # Requests per host allowed in a burst
+FETCH_MAX_RETRIES = int(os.getenv('FETCH_MAX_RETRIES', 3))  # Retries for throttled, 5xx or failed page requests
+FETCH_BACKOFF_BASE = float(os.getenv('FETCH_BACKOFF_BASE', 1))  # Seconds; retry delays grow with decorrelated jitter
+FETCH_BACKOFF_CAP = float(os.getenv('FETCH_BACKOFF_CAP', 30))  # Longest delay between retries
+FETCH_MAX_RETRY_AFTER = float(os.getenv('FETCH_MAX_RETRY_AFTER', 60))  # Longer Retry-After values pause the host instead
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))  # Consecutive failures before a host is paused
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', 300))  # How long a paused host is left alone
+
 # SendGrid configuration
 SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
 SENDGRID_FROM_EMAIL = os.getenv('SENDGRID_FROM_EMAIL')
 RECIPIENT_EMAIL = os.getenv('RECIPIENT_EMAIL')
+SENDGRID_API_URL = os.getenv('SENDGRID_API_URL', 'https://api.sendgrid.com/v3/mail/send')  # Override to test against a mock server
+SENDGRID_MAX_RETRY_AFTER = float(os.getenv('SENDGRID_MAX_RETRY_AFTER', 30))  # Longer Retry-After values fail the send instead of blocking a worker
+
+# Subscribers with per-person filters (see subscribers_example.json); defaults to RECIPIENT_EMAIL without filters
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'subscribers.json')
+
+# Background notification dispatch
+DISPATCH_WORKERS = int(os.getenv('DISPATCH_WORKERS', 1))  # Notifications delivered concurrently
+DISPATCH_QUEUE_SIZE = int(os.getenv('DISPATCH_QUEUE_SIZE', 100))  # Pending notifications before the scraper is slowed down
+DISPATCH_DRAIN_SECONDS = float(os.getenv('DISPATCH_DRAIN_SECONDS', 60))  # How long shutdown waits for pending notifications
+CHANNEL_TIMEOUTS = {  # Seconds each notification channel may take
+    'email': float(os.getenv('EMAIL_CHANNEL_TIMEOUT', 120)),
+    'file': float(os.getenv('FILE_CHANNEL_TIMEOUT', 10)),
+    'console': float(os.getenv('CONSOLE_CHANNEL_TIMEOUT', 10)),
+}
+
+# Metrics: Prometheus text endpoint in continuous mode (0 disables), JSON summary pushed after single runs
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+METRICS_PUSH_URL = os.getenv('METRICS_PUSH_URL')  # Optional; the summary is always logged
 
-# File to store previously seen listings
+# Detail-page enrichment of new listings (deposit, available from, energy label, interior)
+DETAILS_ENABLED = os.getenv('DETAILS_ENABLED', 'false').lower() == 'true'
+DETAIL_WORKERS = int(os.getenv('DETAIL_WORKERS', 4))  # Concurrent detail page fetches
+DETAIL_CACHE_FILE = os.getenv('DETAIL_CACHE_FILE', 'detail_cache.db')
+DETAIL_CACHE_MAX_BYTES = int(os.getenv('DETAIL_CACHE_MAX_BYTES', 20 * 1024 * 1024))  # Least recently used pages are dropped beyond this
+
+# Near-duplicate detection: new listings that match one already seen (relisted under a new URL, or offered by
+# another agency) are marked as such in notifications
+DUPLICATE_DETECTION = os.getenv('DUPLICATE_DETECTION', 'true').lower() == 'true'
+DUPLICATE_ACTION = os.getenv('DUPLICATE_ACTION', 'flag')  # 'flag' marks suspected duplicates in the alert, 'drop' leaves them out
+DUPLICATE_DB_FILE = os.getenv('DUPLICATE_DB_FILE', 'near_duplicates.db')
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', 0.7))  # Estimated Jaccard similarity of title, address and size tokens
+DUPLICATE_ONLINE_SECONDS = float(os.getenv('DUPLICATE_ONLINE_SECONDS', 7200))  # An original any search saw this recently is still online, so a match is a copy, not a relisting
+
+# Disk cache of fetched pages, used by main.py and railway_job.py (--no-cache disables it)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'auto').lower()  # auto (only --once and --test runs), true or false
+RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR', 'response_cache')
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 100 * 1024 * 1024))  # Compressed size before least recently used pages are dropped
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 60))  # Seconds a cached page is used without asking the server
+RESPONSE_CACHE_TTLS = os.getenv('RESPONSE_CACHE_TTLS', '/*-te-huur/*=86400')  # Per-route TTLs by path pattern, e.g. "/huurwoningen/*=30;/*-te-huur/*=86400"
+RESPONSE_CACHE_COMPRESSION = os.getenv('RESPONSE_CACHE_COMPRESSION', 'auto')  # auto (zstd if installed), zstd or gzip
+
+# Profiling (--profile): cProfile + tracemalloc reports for 1 in PROFILE_EVERY checks
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_EVERY = int(os.getenv('PROFILE_EVERY', 1))
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', 25))  # Functions and allocation sites listed in each report
+
+# Seen listings store: 'sqlite' (default) or 'json' (legacy single file)
+SEEN_STORE_BACKEND = os.getenv('SEEN_STORE_BACKEND', 'sqlite')
+SEEN_DB_FILE = os.getenv('SEEN_DB_FILE', 'seen_listings.db')
+SEEN_FLUSH_SECONDS = float(os.getenv('SEEN_FLUSH_SECONDS', 30))  # Continuous mode keeps seen listings in memory and writes them back this often
+SEEN_TTL_DAYS = float(os.getenv('SEEN_TTL_DAYS', 60))  # Listings not seen for this long are forgotten (0 keeps them forever)
+SEEN_RECENT_HOURS = float(os.getenv('SEEN_RECENT_HOURS', 24))  # Continuous mode keeps the exact IDs seen this recently in memory
+SEEN_BLOOM_FILE = os.getenv('SEEN_BLOOM_FILE', 'seen_listings.bloom')  # Bloom filter of everything seen within the TTL
+SEEN_BLOOM_ERROR_RATE = float(os.getenv('SEEN_BLOOM_ERROR_RATE', 0.001))  # False positives cost a store lookup, never a missed listing
+
+# Columnar history of every listing snapshot, for price analytics (see history_store.py)
+HISTORY_ENABLED = os.getenv('HISTORY_ENABLED', 'true').lower() == 'true'
+HISTORY_DIR = os.getenv('HISTORY_DIR', 'listing_history')
+
+# Legacy file of previously seen listings, migrated into SQLite on first run
 LISTINGS_FILE = 'seen_listings.json'
 
 # Headers to mimic a real browser
@@ -24,4 +137,12 @@ HEADERS = {
     'Accept-Encoding': 'gzip, deflate',
     'Connection': 'keep-alive',
     'Upgrade-Insecure-Requests': '1',
-} 
\ No newline at end of file
+}
+
+# Local notification log (append-only JSONL, rotated by size)
+NOTIFICATIONS_LOG_FILE = os.getenv('NOTIFICATIONS_LOG_FILE', 'notifications.jsonl')
+NOTIFICATIONS_LOG_MAX_BYTES = int(os.getenv('NOTIFICATIONS_LOG_MAX_BYTES', 5 * 1024 * 1024))
+NOTIFICATIONS_LOG_COMPRESS = os.getenv('NOTIFICATIONS_LOG_COMPRESS', 'true').lower() == 'true'
+
+# Legacy notification file, imported into the log on first run
+LEGACY_NOTIFICATIONS_FILE = 'notifications.json'
@@ -0,0 +1,103 @@
+"""
+On-disk LRU cache of listing detail-page fields.
+
+Entries are keyed by listing URL and hold the fields extracted from the detail
+page as JSON. The cache is bounded by the total size of those entries; when it
+grows past max_bytes the least recently used entries are dropped. SQLite keeps
+it shared between runs, so re-runs and overlapping searches never fetch the
+same detail page twice.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DetailCache:
+    def __init__(self, path: str, max_bytes: int = 20 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                url TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_details_accessed ON details (accessed)")
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM details").fetchone()[0]
+        self._last_access = self.conn.execute("SELECT COALESCE(MAX(accessed), 0) FROM details").fetchone()[0]
+
+    def _touch(self) -> float:
+        # Strictly increasing, so entries used within the same clock tick still have an order
+        self._last_access = max(time.time(), self._last_access + 1e-6)
+        return self._last_access
+
+    def get(self, url: str) -> Optional[Dict]:
+        """The cached fields for a URL, marking it as recently used."""
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM details WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE details SET accessed = ? WHERE url = ?", (self._touch(), url))
+        return json.loads(row[0])
+
+    def put(self, url: str, fields: Dict):
+        data = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+        size = len(data.encode('utf-8')) + len(url)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO details (url, data, size, accessed) VALUES (?, ?, ?, ?)",
+                                  (url, data, size, self._touch()))
+                # Other runs write to the same file: count what is there now, under this transaction's write lock
+                self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM details").fetchone()[0]
+                self._evict()
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM details").fetchone()[0]
+                raise
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+        doomed = []
+        freed = 0
+        for url, size in self.conn.execute("SELECT url, size FROM details ORDER BY accessed"):
+            doomed.append((url,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM details WHERE url = ?", doomed)
+        self.size -= freed
+        logger.debug(f"Evicted {len(doomed)} detail page(s) from the cache")
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM details WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,157 @@
+"""
+Background notification dispatch.
+
+The scrape loop hands new listings to NotificationDispatcher.submit and moves
+on; worker threads deliver them through every notifier channel in parallel,
+each channel bounded by its own timeout. The queue is bounded: when it is full
+submit blocks (backpressure) and, if space does not free up in time, delivers
+in the caller's thread rather than dropping listings that are already marked
+as seen.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Channel = Tuple[str, Callable[[List[Dict]], bool]]
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    def __init__(self, channels: List[Channel], timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = 60.0, workers: int = 1, capacity: int = 100,
+                 submit_timeout: float = 30.0):
+        self.channels = channels
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.submit_timeout = submit_timeout
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max(capacity, 1))
+        # Every worker, plus one inline delivery from submit, can run all of its channels at once
+        self.channel_pool = ThreadPoolExecutor(
+            max_workers=max(len(channels), 1) * (max(workers, 1) + 1),
+            thread_name_prefix='notify-channel'
+        )
+        self.delivered = 0
+        self.failed = 0
+        self._accepting = True
+        self._lock = threading.Lock()
+        # Channel calls not finished yet, including ones deliver() stopped waiting for
+        self._running: Set[Future] = set()
+
+        self.workers = []
+        for number in range(max(workers, 1)):
+            worker = threading.Thread(target=self._run, name=f'notify-worker-{number}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, listings: List[Dict]) -> bool:
+        """Queue listings for delivery.
+
+        Returns True if they were queued (or delivered inline because the queue
+        stayed full), False if the dispatcher is shutting down.
+        """
+        if not listings:
+            return True
+        if not self._accepting:
+            logger.error(f"Dispatcher is shutting down, not queueing {len(listings)} listing(s)")
+            return False
+
+        try:
+            self.queue.put(listings, timeout=self.submit_timeout)
+            logger.info(f"Queued notification for {len(listings)} listing(s) ({self.queue.qsize()} pending)")
+        except queue.Full:
+            logger.warning("Notification queue full, delivering in the scrape thread")
+            self.deliver(listings)
+        return True
+
+    def deliver(self, listings: List[Dict]) -> bool:
+        """Run every channel for the listings in parallel; True if any channel succeeded."""
+        started = time.monotonic()
+        futures = [(name, self.channel_pool.submit(send, listings)) for name, send in self.channels]
+        with self._lock:
+            self._running.update(future for _, future in futures)
+        for _, future in futures:
+            future.add_done_callback(self._finished)
+
+        success = False
+        for name, future in futures:
+            timeout = self.timeouts.get(name, self.default_timeout)
+            remaining = max(timeout - (time.monotonic() - started), 0)
+            try:
+                if future.result(timeout=remaining):
+                    success = True
+                else:
+                    logger.error(f"Notification channel '{name}' failed")
+            except FutureTimeoutError:
+                # The channel keeps running in its pool thread; we just stop waiting for it
+                logger.error(f"Notification channel '{name}' timed out after {timeout:.0f}s")
+            except Exception as e:
+                logger.error(f"Notification channel '{name}' raised: {e}")
+
+        with self._lock:
+            if success:
+                self.delivered += 1
+            else:
+                self.failed += 1
+        return success
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._running.discard(future)
+
+    def _run(self):
+        while True:
+            listings = self.queue.get()
+            try:
+                if listings is _STOP:
+                    return
+                if self.deliver(listings):
+                    logger.info(f"Notification for {len(listings)} listing(s) delivered")
+                else:
+                    logger.error(f"Failed to deliver notification for {len(listings)} listing(s)")
+            finally:
+                self.queue.task_done()
+
+    def shutdown(self, drain: bool = True, timeout: float = 30.0):
+        """Stop accepting work and, if drain is set, wait up to timeout for queued notifications."""
+        if not self._accepting:
+            return
+        self._accepting = False
+        deadline = time.monotonic() + timeout
+
+        if not drain:
+            # Discard whatever has not started yet
+            try:
+                while True:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+            except queue.Empty:
+                pass
+
+        for _ in self.workers:
+            try:
+                self.queue.put(_STOP, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                break
+        for worker in self.workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+
+        # Channels that timed out keep running; the notifier must not be closed under them
+        with self._lock:
+            running = list(self._running)
+        _, unfinished = wait(running, timeout=max(deadline - time.monotonic(), 0))
+
+        pending = self.queue.qsize()
+        if any(worker.is_alive() for worker in self.workers) or unfinished:
+            logger.warning(f"Notification dispatcher did not drain within {timeout:.0f}s "
+                           f"({pending} pending, {len(unfinished)} channel call(s) still running)")
+        else:
+            logger.info("Notification dispatcher drained")
+        self.channel_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+"""
+SendGrid delivery engine.
+
+Reuses one pooled session for every request, packs recipients into batches of
+personalizations (one per recipient, so addresses stay private) and retries
+throttled or failed requests with exponential backoff and full jitter,
+honoring Retry-After when SendGrid sends it, up to max_retry_after: a longer
+wait would hold a dispatcher worker past the shutdown drain, so the send is
+given up instead.
+"""
+
+import logging
+import random
+import time
+from typing import Callable, Dict, List
+from config import SENDGRID_API_URL, SENDGRID_MAX_RETRY_AFTER
+from http_retry import RETRY_STATUSES, parse_retry_after
+from metrics import SENDGRID_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# SendGrid accepts at most 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+
+
+class SendGridDelivery:
+    def __init__(self, api_key: str, api_url: str = SENDGRID_API_URL, batch_size: int = MAX_PERSONALIZATIONS,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_cap: float = 60.0,
+                 max_retry_after: float = SENDGRID_MAX_RETRY_AFTER, timeout: float = 30.0, sleep: Callable[[float], None] = time.sleep):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.batch_size = min(batch_size, MAX_PERSONALIZATIONS)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+        self.sleep = sleep
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=4))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=4))
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def send(self, from_email: str, subject: str, content: List[Dict], recipients: List[str]) -> bool:
+        """Send one message to every recipient, batching personalizations.
+
+        Returns True only if every batch was accepted.
+        """
+        recipients = list(dict.fromkeys(recipients))
+        success = True
+        for start in range(0, len(recipients), self.batch_size):
+            batch = recipients[start:start + self.batch_size]
+            payload = {
+                "personalizations": [{"to": [{"email": email}]} for email in batch],
+                "from": {"email": from_email},
+                "subject": subject,
+                "content": content
+            }
+            if self._post(payload):
+                logger.info(f"Email accepted by SendGrid for {len(batch)} recipient(s)")
+            else:
+                success = False
+        return success
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _post(self, payload: Dict) -> bool:
+        """POST a payload, retrying on 429/5xx and connection errors."""
+        from requests import HTTPError, RequestException
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                SENDGRID_SECONDS.observe(time.perf_counter() - started, status=response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return True
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                reason = f"HTTP {response.status_code}"
+            except HTTPError as e:
+                # Other 4xx errors will not succeed on retry
+                logger.error(f"SendGrid rejected the request: {e}")
+                return False
+            except RequestException as e:
+                SENDGRID_SECONDS.observe(time.perf_counter() - started, status='error')
+                reason = str(e)
+
+            if retry_after is not None and retry_after > self.max_retry_after:
+                logger.error(f"Giving up on SendGrid request: asked to retry after {retry_after:.0f}s ({reason})")
+                return False
+            if attempt == self.max_retries:
+                logger.error(f"Giving up on SendGrid request after {attempt + 1} attempt(s): {reason}")
+                return False
+
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            logger.warning(f"SendGrid request failed ({reason}), retrying in {delay:.1f}s")
+            self.sleep(delay)
+        return False
@@ -0,0 +1,178 @@
+"""
+Notification email rendering.
+
+The static parts of the email (head, styles, footer) are built once; each
+listing is rendered into an HTML and a plain-text fragment that is cached by
+listing id together with the text it was rendered from, so per-subscriber
+digests that share listings only render each listing once, and an edited
+listing is rendered again. Every scraped field is HTML-escaped. Parts are collected in a
+list and joined once.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from html import escape
+from operator import attrgetter
+from typing import List, Mapping, Optional, Sequence, Tuple
+from listing import Listing
+
+_HTML_HEAD = """<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }
+        .container { max-width: 600px; margin: 0 auto; background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        .listing { border: 1px solid #ddd; margin: 15px 0; padding: 20px; border-radius: 8px; background-color: #fafafa; }
+        .title { color: #2c3e50; font-size: 18px; font-weight: bold; margin-bottom: 10px; }
+        .price { color: #e74c3c; font-size: 16px; font-weight: bold; margin: 5px 0; }
+        .location { color: #7f8c8d; margin: 5px 0; }
+        .details { color: #34495e; margin: 5px 0; }
+        .link { color: #3498db; text-decoration: none; font-weight: bold; }
+        .header { background-color: #ecf0f1; padding: 20px; border-radius: 8px; margin-bottom: 20px; text-align: center; }
+        .footer { text-align: center; margin-top: 20px; color: #7f8c8d; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🏠 New Apartment Listings Found!</h1>
+            <p>New apartment listings have been found on Pararius for Delft (€0-1500, 2 bedrooms, 10km radius).</p>
+"""
+
+_HTML_COUNT = '            <p><strong>Found: {count} new listing(s)</strong></p>\n        </div>\n'
+
+def _html_listing(title: str, price: str, location: str, details: str, link: str, features: str, note: str) -> str:
+    features = f'            <div class="details">🔎 {features}</div>\n' if features else ''
+    features += f'            <div class="details">⚠️ {note}</div>\n' if note else ''
+    return f"""        <div class="listing">
+            <div class="title">{title}</div>
+            <div class="price">{price}</div>
+            <div class="location">📍 {location}</div>
+            <div class="details">📋 {details}</div>
+{features}            <div style="margin-top: 10px;">
+                <a href="{link}" class="link" target="_blank">View Listing →</a>
+            </div>
+        </div>
+"""
+
+
+_HTML_FOOTER = """        <div class="footer">
+            <p>This notification was sent by your Apartment Scraper Agent</p>
+            <p>Generated on: {generated}</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+_TEXT_HEADER = "New apartment listings found on Pararius for Delft (€0-1500, 2 bedrooms, 10km radius)\nFound: {count} new listing(s)\n"
+
+
+def _text_listing(title: str, price: str, location: str, details: str, link: str, features: str, note: str) -> str:
+    features = f"   {features}\n" if features else ''
+    features += f"   {note}\n" if note else ''
+    return f"{title}\n   Price: {price}\n   Location: {location}\n   Details: {details}\n{features}   {link}\n"
+
+
+def describe_features(features: Optional[Mapping]) -> str:
+    """One line summarizing the detail-page features of a listing (see enrichment.py)."""
+    if not features:
+        return ''
+    parts = []
+    if features.get('deposit'):
+        parts.append(f"Deposit {features['deposit']}")
+    if features.get('available_from'):
+        parts.append(f"Available {features['available_from']}")
+    if features.get('energy_label'):
+        parts.append(f"Energy label {features['energy_label']}")
+    if features.get('interior'):
+        parts.append(features['interior'])
+    return ' · '.join(parts)
+
+
+def describe_duplicate(duplicate_of: Optional[Mapping]) -> str:
+    """A warning for a listing that looks like one seen before (see near_duplicates.py)."""
+    if not duplicate_of:
+        return ''
+    if duplicate_of.get('kind') == 'relisting':
+        return "Possibly a relisting of a home advertised before"
+    original = duplicate_of.get('link')
+    return f"Possibly the same home as {original}" if original else "Possibly the same home as another listing"
+
+
+_TEXT_FOOTER = "\n--\nSent by your Apartment Scraper Agent on {generated}\n"
+
+_FIELDS = ('title', 'price', 'location', 'details', 'link', 'features', 'duplicate_of')
+_listing_fields = attrgetter(*_FIELDS)
+# Most scraped text has nothing to escape; skip html.escape's five replace passes for it
+_NEEDS_ESCAPE = re.compile(r'[&<>"\']').search
+
+
+class EmailRenderer:
+    def __init__(self, max_fragments: int = 4096):
+        self.max_fragments = max_fragments
+        # listing id -> (the text it was rendered from, (html fragment, plain-text fragment)), least recently used first
+        self._fragments: 'OrderedDict[str, Tuple[Tuple[str, ...], Tuple[str, str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fragment(self, listing: Mapping) -> Tuple[str, str]:
+        # Called with the lock held; rendering is pure Python, so holding it costs no parallelism
+        if isinstance(listing, Listing):
+            listing_id = listing.id
+            values = _listing_fields(listing)
+        else:
+            listing_id = listing.get('id')
+            values = [listing.get(field) for field in _FIELDS]
+        *values, features, duplicate_of = values
+        text = ['' if value is None else str(value) for value in values]
+        text.append(describe_features(features))
+        text.append(describe_duplicate(duplicate_of))
+        text = tuple(text)
+
+        # IDs survive price and title edits, so a fragment is only reused for the same text
+        if listing_id is not None:
+            cached = self._fragments.get(listing_id)
+            if cached is not None and cached[0] == text:
+                self._fragments.move_to_end(listing_id)
+                self.hits += 1
+                return cached[1]
+
+        html = [escape(value) for value in text] if _NEEDS_ESCAPE(''.join(text)) else text
+        fragment = (_html_listing(*html), _text_listing(*text))
+
+        if listing_id is not None:
+            self.misses += 1
+            self._fragments[listing_id] = (text, fragment)
+            self._fragments.move_to_end(listing_id)
+            if len(self._fragments) > self.max_fragments:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def render(self, listings: Sequence[Mapping], generated_at: Optional[datetime] = None) -> Tuple[str, str]:
+        """The (plain text, HTML) bodies of the email for these listings."""
+        generated = (generated_at or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            fragments = [self._fragment(listing) for listing in listings]
+
+        html_parts: List[str] = [_HTML_HEAD, _HTML_COUNT.format(count=len(listings))]
+        html_parts.extend(fragment for fragment, _ in fragments)
+        html_parts.append(_HTML_FOOTER.format(generated=generated))
+
+        text_parts: List[str] = [_TEXT_HEADER.format(count=len(listings))]
+        for number, (_, text) in enumerate(fragments, 1):
+            text_parts.append(f"\n{number}. ")
+            text_parts.append(text)
+        text_parts.append(_TEXT_FOOTER.format(generated=generated))
+
+        return ''.join(text_parts), ''.join(html_parts)
+
+    def render_html(self, listings: Sequence[Mapping], generated_at: Optional[datetime] = None) -> str:
+        return self.render(listings, generated_at)[1]
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
@@ -0,0 +1,151 @@
+"""
+Detail-page enrichment for new listings.
+
+Search results only carry title, price, location and a short summary. The
+deposit, available-from date, energy label and interior (furnished or not)
+are on each listing's detail page. ListingEnricher fetches those pages for new
+listings only, on a bounded worker pool, and keeps the extracted fields in a
+DetailCache so a page is fetched at most once.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from lxml import etree
+import lxml.html
+from detail_cache import DetailCache
+from listing import Listing, parse_price_cents
+from metrics import DETAIL_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Definition list terms on the detail page, in Dutch and English
+_TERMS = {
+    'deposit': ('borg', 'waarborgsom', 'deposit', 'security deposit'),
+    'available_from': ('beschikbaar', 'beschikbaar per', 'beschikbaar vanaf', 'aanvaarding', 'available',
+                       'available from', 'acceptance'),
+    'energy_label': ('energielabel', 'energy label', 'energy rating'),
+    'interior': ('interieur', 'interior'),
+}
+_FIELD_BY_TERM = {term: field for field, terms in _TERMS.items() for term in terms}
+# dd modifier classes Pararius uses for the same features
+_FIELD_BY_CLASS = {'deposit': 'deposit', 'acceptance': 'available_from', 'available': 'available_from',
+                   'energy_label': 'energy_label', 'energy-label': 'energy_label', 'interior': 'interior'}
+_FURNISHING = {'gemeubileerd': 'furnished', 'furnished': 'furnished',
+               'gestoffeerd': 'upholstered', 'upholstered': 'upholstered',
+               'kaal': 'shell', 'shell': 'shell', 'unfurnished': 'shell'}
+
+_TERMS_XPATH = etree.XPath("//dl//dt")
+_DESCRIPTION = etree.XPath("following-sibling::dd[1]")
+_MAIN_DESCRIPTION = etree.XPath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' listing-features__main-description ')]")
+_DD_MODIFIER = re.compile(r'listing-features__description--([\w-]+)')
+_ENERGY_LABEL = re.compile(r'\b([A-G]\+*)\b')
+_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def _text(element) -> str:
+    return ' '.join(element.text_content().split())
+
+
+def parse_detail_page(html_content) -> Dict:
+    """Extract deposit, availability, energy label and interior from a listing detail page."""
+    if isinstance(html_content, str):
+        html_content = html_content.encode('utf-8')
+    if not html_content.strip():
+        return {}
+    tree = lxml.html.fromstring(html_content, parser=_PARSER)
+
+    fields = {}
+    for term in _TERMS_XPATH(tree):
+        descriptions = _DESCRIPTION(term)
+        if not descriptions:
+            continue
+        description = descriptions[0]
+        modifier = _DD_MODIFIER.search(description.get('class') or '')
+        field = _FIELD_BY_CLASS.get(modifier.group(1)) if modifier else None
+        field = field or _FIELD_BY_TERM.get(_text(term).lower().rstrip(':'))
+        if not field or field in fields:
+            continue
+        # Pararius puts the value in a main-description span, followed by notes
+        main = _MAIN_DESCRIPTION(description)
+        value = _text(main[0] if main else description)
+        if value:
+            fields[field] = value
+
+    if 'deposit' in fields:
+        fields['deposit_cents'] = parse_price_cents(fields['deposit'])
+    if 'energy_label' in fields:
+        label = _ENERGY_LABEL.search(fields['energy_label'])
+        fields['energy_label'] = label.group(1) if label else fields['energy_label']
+    if 'interior' in fields:
+        fields['furnishing'] = _FURNISHING.get(fields['interior'].split()[0].lower().rstrip(','))
+    return fields
+
+
+class ListingEnricher:
+    def __init__(self, fetch_page: Callable[[str], Optional[str]], cache: Optional[DetailCache] = None,
+                 workers: int = 4, parse: Callable[[str], Dict] = parse_detail_page):
+        self.fetch_page = fetch_page
+        self.cache = cache
+        self.workers = max(workers, 1)
+        self.parse = parse
+
+    def _fetch(self, url: str) -> Optional[Dict]:
+        html_content = self.fetch_page(url)
+        if html_content is None:
+            return None
+        try:
+            return self.parse(html_content)
+        except Exception as e:
+            logger.error(f"Error parsing detail page {url}: {e}")
+            return None
+
+    def _cached(self, url: str) -> Optional[Dict]:
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(url)
+        except Exception as e:
+            logger.error(f"Error reading detail cache for {url}: {e}")
+            return None
+
+    def enrich(self, listings: List[Listing]) -> int:
+        """Attach detail-page features to the listings; returns how many were enriched.
+
+        Failed fetches leave a listing without features and are not cached, so
+        the page is tried again the next time the listing comes up.
+        """
+        urls = list(dict.fromkeys(listing['link'] for listing in listings if listing['link']))
+        features: Dict[str, Dict] = {}
+        missing = []
+        for url in urls:
+            cached = self._cached(url)
+            if cached is not None:
+                features[url] = cached
+            else:
+                missing.append(url)
+        DETAIL_LOOKUPS.inc(len(urls) - len(missing), result='hit')
+        DETAIL_LOOKUPS.inc(len(missing), result='miss')
+
+        if missing:
+            logger.info(f"Fetching {len(missing)} detail page(s) with {min(self.workers, len(missing))} worker(s), "
+                        f"{len(urls) - len(missing)} cached")
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(missing)), thread_name_prefix='detail') as pool:
+                for url, fields in zip(missing, pool.map(self._fetch, missing)):
+                    if fields is None:
+                        continue
+                    features[url] = fields
+                    if self.cache is not None:
+                        try:
+                            self.cache.put(url, fields)
+                        except Exception as e:
+                            logger.error(f"Error caching detail page {url}: {e}")
+
+        enriched = 0
+        for listing in listings:
+            fields = features.get(listing['link'])
+            if fields is not None:
+                listing.features = fields
+                enriched += 1
+        return enriched
@@ -0,0 +1,202 @@
+"""
+Resilient page fetching.
+
+Every request goes through the host's token bucket and the global request
+cap. Throttled (429), unavailable (5xx) and failed requests are retried with
+decorrelated-jitter backoff, waiting for Retry-After when the server sends it.
+A per-host circuit breaker stops requests to a host after repeated failures
+(or a Retry-After too long to wait out) and lets a single probe through once
+the pause is over. Callers get a FetchResult describing what happened instead
+of a bare None.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+from urllib.parse import urlparse
+from http_retry import RETRY_STATUSES, parse_retry_after
+from rate_limit import HostRateLimiter
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# FetchResult outcomes
+OK = 'ok'
+NOT_MODIFIED = 'not_modified'
+THROTTLED = 'throttled'
+HTTP_ERROR = 'http_error'
+NETWORK_ERROR = 'network_error'
+CIRCUIT_OPEN = 'circuit_open'
+
+
+def decorrelated_jitter(previous: float, base: float, cap: float, rng: random.Random = random) -> float:
+    """Next backoff delay: random between base and three times the previous delay, capped."""
+    return min(cap, rng.uniform(base, max(previous, base) * 3))
+
+
+class FetchResult:
+    """Outcome of one fetch, after retries."""
+
+    __slots__ = ('url', 'outcome', 'response', 'status_code', 'attempts', 'error', 'elapsed')
+
+    def __init__(self, url: str, outcome: str, response: Optional['requests.Response'] = None,
+                 attempts: int = 0, error: Optional[str] = None, elapsed: float = 0.0):
+        self.url = url
+        self.outcome = outcome
+        self.response = response
+        self.status_code = response.status_code if response is not None else None
+        self.attempts = attempts
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in (OK, NOT_MODIFIED)
+
+    def __repr__(self):
+        return f"FetchResult({self.url!r}, {self.outcome}, status={self.status_code}, attempts={self.attempts})"
+
+
+class CircuitBreaker:
+    """Closed until `threshold` consecutive failures, then open for `reset_timeout` seconds.
+
+    After the pause one request is let through (half-open); its success closes
+    the breaker and its failure opens it again.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.open_until > self.clock():
+            return 'open'
+        return 'half-open' if self.open_until else 'closed'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if not self.open_until:
+                return True
+            if self.open_until > self.clock() or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                self._open(self.reset_timeout)
+
+    def pause(self, seconds: float):
+        """Open the breaker for at least `seconds`, e.g. for a long Retry-After."""
+        with self._lock:
+            self._open(seconds)
+
+    def _open(self, seconds: float):
+        self.open_until = max(self.open_until, self.clock() + seconds)
+        self.probing = False
+
+
+class Fetcher:
+    def __init__(self, session: 'requests.Session', rate_limiter: HostRateLimiter, max_concurrent: int = 8,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_cap: float = 30.0,
+                 max_retry_after: float = 60.0, breaker_threshold: int = 5, breaker_reset: float = 300.0,
+                 timeout: float = 30.0, sleep: Callable[[float], None] = time.sleep):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.request_slots = threading.BoundedSemaphore(max(max_concurrent, 1))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.timeout = timeout
+        self.sleep = sleep
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        with self._lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return breaker
+
+    def _request(self, url: str, headers: Optional[Dict]) -> 'requests.Response':
+        self.rate_limiter.acquire(url)
+        with self.request_slots:
+            return self.session.get(url, timeout=self.timeout, headers=headers)
+
+    def fetch(self, url: str, headers: Optional[Dict] = None) -> FetchResult:
+        """GET a URL with retries; never raises for HTTP or network failures."""
+        from requests import RequestException
+        started = time.monotonic()
+        breaker = self.breaker_for(url)
+        delay = self.backoff_base
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                logger.warning(f"Circuit open for {urlparse(url).netloc}, not fetching {url}")
+                return FetchResult(url, CIRCUIT_OPEN, attempts=attempt, elapsed=time.monotonic() - started)
+
+            attempt += 1
+            response = None
+            retry_after = None
+            try:
+                response = self._request(url, headers)
+            except RequestException as e:
+                outcome, reason = NETWORK_ERROR, str(e)
+            except BaseException:
+                # Raised to the caller, but a half-open probe must not stay in flight for good
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code == 304:
+                    breaker.record_success()
+                    return FetchResult(url, NOT_MODIFIED, response, attempt, elapsed=time.monotonic() - started)
+                if response.status_code < 400:
+                    breaker.record_success()
+                    return FetchResult(url, OK, response, attempt, elapsed=time.monotonic() - started)
+                if response.status_code not in RETRY_STATUSES:
+                    # Other 4xx errors will not succeed on retry; the host answered, so it is up
+                    breaker.record_success()
+                    reason = f"HTTP {response.status_code}"
+                    logger.error(f"Error fetching page {url}: {reason}")
+                    return FetchResult(url, HTTP_ERROR, response, attempt, reason, time.monotonic() - started)
+                outcome = THROTTLED if response.status_code == 429 else HTTP_ERROR
+                reason = f"HTTP {response.status_code}"
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            breaker.record_failure()
+            if retry_after is not None and retry_after > self.max_retry_after:
+                # Too long to wait inside a cycle: pause the host instead of hammering it next cycle
+                breaker.pause(retry_after)
+                logger.warning(f"{urlparse(url).netloc} asked to retry after {retry_after:.0f}s, pausing the host")
+                return FetchResult(url, outcome, response, attempt, reason, time.monotonic() - started)
+            if attempt > self.max_retries:
+                logger.error(f"Giving up on {url} after {attempt} attempt(s): {reason}")
+                return FetchResult(url, outcome, response, attempt, reason, time.monotonic() - started)
+
+            delay = retry_after if retry_after is not None else decorrelated_jitter(delay, self.backoff_base, self.backoff_cap)
+            logger.warning(f"Fetching {url} failed ({reason}), retrying in {delay:.1f}s")
+            self.sleep(delay)
@@ -0,0 +1,247 @@
+"""
+Columnar listing history.
+
+Every scrape cycle appends one snapshot row per listing to a set of column
+files: timestamp, listing code, city code, price in cents and area in m². Each
+column is a flat file of fixed-width machine values, so appending is a write
+per column and reading is a single fromfile/memmap with no parsing. Listing
+keys and cities are dictionary-encoded in small append-only text files.
+
+Recording only needs the standard library. The analytics (median price per
+m² per city per week, time-to-rent and price drops) are vectorized with NumPy,
+which is imported when they are first used.
+"""
+
+import logging
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Column name -> array typecode; -1 marks a missing price or area
+COLUMNS = {
+    'timestamp': 'd',
+    'listing': 'I',
+    'city': 'I',
+    'price_cents': 'q',
+    'area': 'i',
+}
+
+_WEEK = 7 * 24 * 3600
+# The Unix epoch was a Thursday; shift so weeks start on Monday
+_WEEK_OFFSET = 4 * 24 * 3600
+_DAY = 24 * 3600
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required for listing history analytics (pip install -r requirements-analytics.txt)") from None
+    return numpy
+
+
+class _Dictionary:
+    """Append-only mapping between strings and dense integer codes, one string per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._add(line.rstrip('\n'))
+
+    def _add(self, value: str) -> int:
+        code = self.codes[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+    def encode(self, value: str, pending: List[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self._add(value)
+            pending.append(value)
+        return code
+
+    def write(self, pending: List[str]):
+        if pending:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(value + '\n' for value in pending))
+
+
+class ListingHistory:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.listings = _Dictionary(os.path.join(directory, 'listings.txt'))
+        self.cities = _Dictionary(os.path.join(directory, 'cities.txt'))
+        self.rows = self._repair()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.col")
+
+    def _repair(self) -> int:
+        """Truncate every column to the shortest one, dropping a row cut off by a crash."""
+        lengths = {}
+        for name, typecode in COLUMNS.items():
+            path = self._column_path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths[name] = size // array(typecode).itemsize
+
+        rows = min(lengths.values())
+        for name, typecode in COLUMNS.items():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) != rows * array(typecode).itemsize:
+                logger.warning(f"Truncating history column {name} to {rows} row(s)")
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * array(typecode).itemsize)
+        return rows
+
+    def record(self, listings: Iterable, timestamp: Optional[float] = None) -> int:
+        """Append one snapshot row per listing and return the number of rows written.
+
+        Listings are keyed by their link, which survives price changes, falling
+        back to the listing id.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+
+        with self._lock:
+            new_listings: List[str] = []
+            new_cities: List[str] = []
+            for listing in listings:
+                columns['timestamp'].append(timestamp)
+                columns['listing'].append(self.listings.encode(listing.link or listing.id, new_listings))
+                columns['city'].append(self.cities.encode(listing.city or '', new_cities))
+                columns['price_cents'].append(-1 if listing.price_cents is None else listing.price_cents)
+                columns['area'].append(-1 if listing.area is None else listing.area)
+
+            count = len(columns['timestamp'])
+            if not count:
+                return 0
+
+            os.makedirs(self.directory, exist_ok=True)
+            # Dictionaries first, so a crash never leaves rows pointing at unknown codes
+            self.listings.write(new_listings)
+            self.cities.write(new_cities)
+            for name, values in columns.items():
+                with open(self._column_path(name), 'ab') as f:
+                    values.tofile(f)
+            self.rows += count
+        return count
+
+    def column(self, name: str):
+        """Load a column: a read-only NumPy memmap when NumPy is installed, otherwise an array."""
+        typecode = COLUMNS[name]
+        path = self._column_path(name)
+        try:
+            import numpy
+        except ImportError:
+            values = array(typecode)
+            if self.rows:
+                with open(path, 'rb') as f:
+                    values.fromfile(f, self.rows)
+            return values
+
+        if not self.rows:
+            return numpy.empty(0, dtype=numpy.dtype(typecode))
+        return numpy.memmap(path, dtype=numpy.dtype(typecode), mode='r', shape=(self.rows,))
+
+    def columns(self, names: Iterable[str] = COLUMNS) -> Dict:
+        return {name: self.column(name) for name in names}
+
+    def median_price_per_m2(self) -> List[Dict]:
+        """Median monthly rent per m² for every city and week.
+
+        Each listing counts once per week, at its last price that week.
+        """
+        np = _numpy()
+        data = self.columns()
+        valid = (data['price_cents'] >= 0) & (data['area'] > 0)
+        timestamps = data['timestamp'][valid]
+        listing = data['listing'][valid].astype(np.int64)
+        city = data['city'][valid].astype(np.int64)
+        price_per_m2 = data['price_cents'][valid] / 100 / data['area'][valid]
+        week = ((timestamps - _WEEK_OFFSET) // _WEEK).astype(np.int64)
+
+        # Last snapshot of each listing per week (rows are in time order)
+        week_count = int(week.max() - week.min() + 1) if len(week) else 1
+        week_index = week - (week.min() if len(week) else 0)
+        listing_week = listing * week_count + week_index
+        _, last = np.unique(listing_week[::-1], return_index=True)
+        keep = len(listing_week) - 1 - last
+        city, week, price_per_m2 = city[keep], week[keep], price_per_m2[keep]
+
+        # Sort by (city, week, value); each group is then a sorted run
+        order = np.lexsort((price_per_m2, week, city))
+        city, week, price_per_m2 = city[order], week[order], price_per_m2[order]
+        group_key = city * week_count + (week - (week.min() if len(week) else 0))
+        _, starts, counts = np.unique(group_key, return_index=True, return_counts=True)
+        medians = (price_per_m2[starts + (counts - 1) // 2] + price_per_m2[starts + counts // 2]) / 2
+
+        return [
+            {
+                'city': self.cities.values[city[start]],
+                'week': datetime.fromtimestamp(int(week[start]) * _WEEK + _WEEK_OFFSET, timezone.utc).date().isoformat(),
+                'median_price_per_m2': round(float(median), 2),
+                'listings': int(count),
+            }
+            for start, count, median in zip(starts, counts, medians)
+        ]
+
+    def time_to_rent(self, gone_after: float = _DAY, city: Optional[str] = None):
+        """Days between first and last sighting of listings that disappeared.
+
+        A listing counts as rented once it has not been seen for `gone_after`
+        seconds before the latest snapshot. Returns a NumPy array of days.
+        """
+        np = _numpy()
+        data = self.columns(('timestamp', 'listing', 'city'))
+        if not self.rows:
+            return np.empty(0)
+        timestamps, listing = data['timestamp'], data['listing']
+        if city is not None:
+            code = self.cities.codes.get(city)
+            if code is None:
+                return np.empty(0)
+            mask = data['city'] == code
+            timestamps, listing = timestamps[mask], listing[mask]
+
+        size = len(self.listings.values)
+        first_seen = np.full(size, np.inf)
+        last_seen = np.full(size, -np.inf)
+        np.minimum.at(first_seen, listing, timestamps)
+        np.maximum.at(last_seen, listing, timestamps)
+
+        gone = np.isfinite(last_seen) & (last_seen < data['timestamp'].max() - gone_after)
+        return (last_seen[gone] - first_seen[gone]) / _DAY
+
+    def price_drops(self, min_drop_cents: int = 1) -> List[Dict]:
+        """Snapshots where a listing's price fell compared with its previous snapshot."""
+        np = _numpy()
+        data = self.columns(('timestamp', 'listing', 'price_cents'))
+        valid = data['price_cents'] >= 0
+        timestamps = data['timestamp'][valid]
+        listing = data['listing'][valid]
+        price = data['price_cents'][valid]
+
+        # Stable sort by listing keeps each listing's snapshots in time order
+        order = np.argsort(listing, kind='stable')
+        timestamps, listing, price = timestamps[order], listing[order], price[order]
+        drop = np.flatnonzero((listing[1:] == listing[:-1]) & (price[:-1] - price[1:] >= min_drop_cents)) + 1
+
+        return [
+            {
+                'listing': self.listings.values[listing[index]],
+                'timestamp': float(timestamps[index]),
+                'old_price_cents': int(price[index - 1]),
+                'new_price_cents': int(price[index]),
+            }
+            for index in drop
+        ]
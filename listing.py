@@ -0,0 +1,171 @@
+"""
+Listing records.
+
+Scraped fields are parsed once, when the listing is built: the price becomes
+integer cents, the floor area square metres, and the location is split into
+postcode and city. Records keep the raw strings and read like the dicts the
+scraper used to return (`listing['price']`, `.get()`, `.items()`), and
+to_dict()/from_dict() round-trip the same JSON shape, so seen stores,
+notification logs and older consumers need no changes.
+"""
+
+import re
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Union
+
+# Dutch notation: '.' groups thousands, ',' marks decimals ("€ 1.347,50")
+_DUTCH_NUMBER = re.compile(r'\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?')
+_PRICE = re.compile(r'€\s*(' + _DUTCH_NUMBER.pattern + r')')
+_AREA = re.compile(r'(' + _DUTCH_NUMBER.pattern + r')\s*m²')
+# No trailing \b: get_text(strip=True) glues features together ("3 kamersGestoffeerd")
+_ROOMS = re.compile(r'(\d+)\s*kamers?', re.IGNORECASE)
+_BEDROOMS = re.compile(r'(\d+)\s*slaapkamers?', re.IGNORECASE)
+_POSTCODE_CITY = re.compile(r'^(\d{4})\s?([A-Z]{2})\s+(.+?)(?:\s*\(.*\))?$')
+_URL_CITY = re.compile(r'/[a-z]+-te-huur/([^/]+)/')
+# The hexadecimal listing number in a detail URL: /appartement-te-huur/delft/85b96202/oude-delft
+_URL_ID = re.compile(r'/[a-z]+-te-huur/[^/]+/([0-9a-f]{8,})(?:/|$)')
+_WORD = re.compile(r'\w+')
+
+
+def split_words(text: str) -> List[str]:
+    """The lowercase words of a text; keywords, near-duplicate tokens and city slugs all split text this way."""
+    return _WORD.findall(text.lower())
+
+
+def normalize_term(term: str) -> str:
+    """Lowercase a city or keyword and join words with hyphens, matching Pararius URL slugs."""
+    return '-'.join(split_words(term))
+
+
+def listing_id_from_link(link: Optional[str]) -> Optional[str]:
+    """The stable listing number from a Pararius detail URL ("85b96202"); None for other links."""
+    match = _URL_ID.search(link or '')
+    return match.group(1) if match else None
+
+
+def legacy_listing_id(title: str, location: str, price: str) -> str:
+    """The ID listings had before IDs came from their URL; it changes with the price."""
+    return f"{title}_{location}_{price}".replace(" ", "_").lower()
+
+
+def parse_dutch_number(text: str) -> Optional[Union[int, float]]:
+    """Parse the first number written in Dutch notation ("1.347" -> 1347, "62,5" -> 62.5)."""
+    match = _DUTCH_NUMBER.search(text or '')
+    if not match:
+        return None
+    number = match.group(0).replace('.', '')
+    if ',' in number:
+        return float(number.replace(',', '.'))
+    return int(number)
+
+
+def parse_price_cents(text: str) -> Optional[int]:
+    """Monthly rent in cents from text such as "€ 1.347 per maand"; None for "Prijs op aanvraag"."""
+    match = _PRICE.search(text or '')
+    if not match:
+        return None
+    return round(parse_dutch_number(match.group(1)) * 100)
+
+
+def parse_area(text: str) -> Optional[int]:
+    """Floor area in whole square metres from the details text."""
+    match = _AREA.search(text or '')
+    if not match:
+        return None
+    return round(parse_dutch_number(match.group(1)))
+
+
+class Listing(Mapping):
+    """A scraped listing with its numeric fields parsed.
+
+    Mapping access covers the serialized fields only, plus searches,
+    features (from the detail page) and duplicate_of (the suspected
+    original of a near-duplicate) once set; the parsed fields
+    (price_cents, area, rooms, bedrooms, postcode, city) are attributes.
+    bedrooms is only set when the listing states it, and city is the
+    Pararius URL slug ("den-haag"). The scraper takes id from the listing
+    number in the URL, so it survives price and title edits.
+    """
+
+    FIELDS = ('id', 'title', 'price', 'location', 'details', 'link', 'timestamp')
+
+    # Serialized only when set
+    OPTIONAL = ('searches', 'features', 'duplicate_of')
+
+    __slots__ = FIELDS + OPTIONAL + ('price_cents', 'area', 'rooms', 'bedrooms', 'postcode', 'city')
+
+    def __init__(self, id: str, title: str, price: str, location: str, details: str,
+                 link: Optional[str], timestamp: Optional[float] = None, searches: Optional[List[str]] = None,
+                 features: Optional[Dict] = None, duplicate_of: Optional[Dict] = None):
+        self.id = id
+        self.title = title
+        self.price = price
+        self.location = location
+        self.details = details
+        self.link = link
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.searches = searches
+        self.features = features
+        self.duplicate_of = duplicate_of
+
+        self.price_cents = parse_price_cents(price)
+        self.area = parse_area(details)
+        rooms = _ROOMS.search(details or '')
+        self.rooms = int(rooms.group(1)) if rooms else None
+        bedrooms = _BEDROOMS.search(details or '')
+        self.bedrooms = int(bedrooms.group(1)) if bedrooms else None
+
+        self.postcode = None
+        self.city = None
+        location_match = _POSTCODE_CITY.match((location or '').replace('\xa0', ' '))
+        if location_match:
+            self.postcode = f"{location_match.group(1)} {location_match.group(2)}"
+            self.city = normalize_term(location_match.group(3))
+        else:
+            url_match = _URL_CITY.search(link or '')
+            if url_match:
+                self.city = url_match.group(1)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Listing':
+        return cls(**{key: data.get(key) for key in cls.FIELDS + cls.OPTIONAL})
+
+    def to_dict(self) -> Dict:
+        return dict(self.items())
+
+    def with_searches(self, searches: List[str]) -> 'Listing':
+        """A copy tagged with the searches that found it, without re-parsing."""
+        clone = Listing.__new__(Listing)
+        for slot in self.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        clone.searches = searches
+        return clone
+
+    @property
+    def legacy_id(self) -> str:
+        return legacy_listing_id(self.title, self.location, self.price)
+
+    def __getitem__(self, key: str):
+        if key in self.FIELDS or (key in self.OPTIONAL and getattr(self, key) is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        for key in self.OPTIONAL:
+            if getattr(self, key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + sum(getattr(self, key) is not None for key in self.OPTIONAL)
+
+    def __repr__(self):
+        return f"Listing({self.id!r}, price_cents={self.price_cents}, area={self.area}, city={self.city!r})"
+
+
+def as_listing(listing: Union[Listing, Dict]) -> Listing:
+    """Accept either a Listing or a listing dict loaded from JSON."""
+    if isinstance(listing, Listing):
+        return listing
+    return Listing.from_dict(listing)
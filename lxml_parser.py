@@ -0,0 +1,82 @@
+"""
+Fast-path listing parser built on lxml and precompiled XPath expressions.
+
+Produces the same fields as the BeautifulSoup path in ParariusScraper, without
+building a BeautifulSoup tree or running a tree search per field.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+from lxml import etree
+import lxml.html
+
+logger = logging.getLogger(__name__)
+
+
+def _has_class(class_name: str) -> str:
+    """XPath predicate matching elements whose class list contains class_name."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+# Compiled once at import; each evaluation returns matches in document order
+_CONTAINERS = etree.XPath(f"//li[{_has_class('search-list__item')}]")
+_TITLE = etree.XPath(f".//a[{_has_class('listing-search-item__link')}]")
+_PRICE = etree.XPath(f".//div[{_has_class('listing-search-item__price')}]")
+_LOCATION = etree.XPath(f".//div[{_has_class('listing-search-item__location')}]")
+_DETAILS = etree.XPath(f".//div[{_has_class('listing-search-item__details')}]")
+# BeautifulSoup leaves script, style, template and ruby annotation strings out of get_text()
+_TEXT_NODES = etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style or ancestor::rt or ancestor::rp or ancestor::template)]",
+    smart_strings=False,
+)
+
+_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+# (title, link, price, location, details), link still as found in the markup
+ListingFields = Tuple[str, Optional[str], str, str, str]
+
+
+def _text(element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    return ''.join(text.strip() for text in _TEXT_NODES(element))
+
+
+class LxmlListingParser:
+    def parse_fields(self, html_content) -> List[ListingFields]:
+        """Extract raw listing fields from a search page."""
+        if isinstance(html_content, str):
+            html_content = html_content.encode('utf-8')
+        if not html_content.strip():
+            return []
+
+        tree = lxml.html.fromstring(html_content, parser=_PARSER)
+
+        fields = []
+        for container in _CONTAINERS(tree):
+            try:
+                listing_fields = self.extract_fields(container)
+                if listing_fields:
+                    fields.append(listing_fields)
+            except Exception as e:
+                logger.error(f"Error parsing listing: {e}")
+                continue
+        return fields
+
+    def extract_fields(self, container) -> Optional[ListingFields]:
+        """Extract the raw fields of a single listing container."""
+        title_elems = _TITLE(container)
+        if not title_elems:
+            return None
+
+        title_elem = title_elems[0]
+        price_elems = _PRICE(container)
+        location_elems = _LOCATION(container)
+        details_elems = _DETAILS(container)
+
+        return (
+            _text(title_elem),
+            title_elem.get('href'),
+            _text(price_elems[0]) if price_elems else "Price not available",
+            _text(location_elems[0]) if location_elems else "Location not available",
+            _text(details_elems[0]) if details_elems else "Details not available",
+        )
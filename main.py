@@ -4,34 +4,72 @@ Apartment Scraper Agent
 Scrapes Pararius for apartment listings in Delft and sends email notifications for new listings.
 """
 
-import time
-import schedule
 import logging
+import time
 import signal
 import sys
 from datetime import datetime
 from scraper import ParariusScraper
 from sendgrid_notifier import SendGridNotifier
-from config import CHECK_INTERVAL_MINUTES
+from dispatcher import NotificationDispatcher
+from scheduler import AdaptiveInterval, Job, Scheduler, parse_profiles
+from metrics import LAST_CHECK, start_metrics_server
+from seen_store import WriteBehindSeenStore
+from config import CHECK_INTERVAL_MINUTES, DISPATCH_WORKERS, DISPATCH_QUEUE_SIZE, DISPATCH_DRAIN_SECONDS, CHANNEL_TIMEOUTS
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('apartment_scraper.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def open_response_cache(one_shot: bool = False):
+    """The configured disk cache of fetched pages, or None when it is disabled.
+
+    By default (RESPONSE_CACHE_ENABLED=auto) only one-shot command-line runs
+    use it; a continuous agent already revalidates from memory, and the
+    scheduled job's disk does not outlive the run.
+    """
+    import config
+    enabled = config.RESPONSE_CACHE_ENABLED
+    if enabled == 'false' or (enabled != 'true' and not one_shot):
+        return None
+    from response_cache import ResponseCache, parse_ttls
+    return ResponseCache(
+        config.RESPONSE_CACHE_DIR,
+        max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+        ttls=parse_ttls(config.RESPONSE_CACHE_TTLS),
+        default_ttl=config.RESPONSE_CACHE_TTL,
+        compression=config.RESPONSE_CACHE_COMPRESSION
+    )
+
+
+def setup_logging(log_file: str = 'apartment_scraper.log'):
+    """Log to the console and, when log_file is set, to that file."""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
 class ApartmentScraperAgent:
-    def __init__(self):
-        self.scraper = ParariusScraper()
+    def __init__(self, base_url=None, profiler=None, use_cache=True, one_shot=False):
+        self.scraper = ParariusScraper(base_url=base_url, response_cache=open_response_cache(one_shot) if use_cache else None)
         self.notifier = SendGridNotifier()
+        self.dispatcher = NotificationDispatcher(
+            self.notifier.notification_channels(),
+            timeouts=CHANNEL_TIMEOUTS,
+            workers=DISPATCH_WORKERS,
+            capacity=DISPATCH_QUEUE_SIZE
+        )
+        self.scheduler = None
         self.running = True
         
+        # Profile (a sample of) the check cycles; scheduled jobs look the method up on the instance
+        if profiler:
+            self.check_for_new_listings = profiler.wrap(self.check_for_new_listings)
+        
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
@@ -40,66 +78,106 @@ class ApartmentScraperAgent:
         """Handle shutdown signals gracefully."""
         logger.info("Received shutdown signal. Stopping the agent...")
         self.running = False
+        self.shutdown()
         sys.exit(0)
     
-    def check_for_new_listings(self):
-        """Check for new listings and send notifications."""
+    def shutdown(self):
+        """Stop scheduled checks, write back seen listings, deliver queued notifications and close the logs."""
+        if self.scheduler:
+            self.scheduler.stop(wait=True)
+        # Before the drain, which may take long enough for the process to be killed
+        self.scraper.close()
+        self.dispatcher.shutdown(drain=True, timeout=DISPATCH_DRAIN_SECONDS)
+        self.notifier.close()
+        if self.scraper.response_cache is not None:
+            self.scraper.response_cache.close()
+    
+    def check_for_new_listings(self, searches=None) -> int:
+        """Check for new listings and send notifications; returns the number of new listings."""
         try:
             logger.info("Checking for new apartment listings...")
             
             # Get new listings
-            new_listings = self.scraper.get_new_listings()
+            new_listings = self.scraper.get_new_listings(searches)
             
             if new_listings:
                 logger.info(f"Found {len(new_listings)} new listing(s)!")
                 
-                # Send notification
-                if self.notifier.send_notification(new_listings):
-                    logger.info("Notification sent successfully!")
-                    logger.info("notifications.json has been updated with the new listings.")
-                else:
-                    logger.error("Failed to send notification!")
+                # Hand off to the background dispatcher so slow channels don't delay the next scrape
+                if not self.dispatcher.submit(new_listings):
+                    logger.error("Failed to queue notification!")
                 
                 # Log the new listings
                 for listing in new_listings:
                     logger.info(f"New listing: {listing['title']} - {listing['price']} - {listing['location']}")
             else:
                 logger.info("No new listings found.")
-                logger.info("seen_listings.json has been updated with current listings to prevent future duplicates.")
+                logger.info("Seen listings store has been updated with current listings to prevent future duplicates.")
+            LAST_CHECK.set(time.time())
+            return len(new_listings)
                 
         except Exception as e:
             logger.error(f"Error during listing check: {e}")
+            return 0
     
     def run_once(self):
         """Run the scraper once and exit."""
         logger.info("Running apartment scraper once...")
         self.check_for_new_listings()
+        self.shutdown()
         logger.info("Single run completed.")
-        logger.info("Both seen_listings.json and notifications.json have been updated.")
+        logger.info(f"Both the seen listings store and {self.notifier.notification_file} have been updated.")
     
-    def run_continuous(self):
-        """Run the scraper continuously with scheduled checks."""
-        import config
-        logger.info(f"Starting apartment scraper agent (checking every {config.CHECK_INTERVAL_MINUTES} minutes)...")
+    def run_continuous(self, fixed_interval: bool = False):
+        """Run the scraper continuously, one adaptively scheduled job per search.
         
-        # Schedule the job
-        schedule.every(config.CHECK_INTERVAL_MINUTES).minutes.do(self.check_for_new_listings)
+        With fixed_interval every search is checked every CHECK_INTERVAL_MINUTES.
+        """
+        import config
+        initial = config.CHECK_INTERVAL_MINUTES * 60
+        if fixed_interval:
+            minimum = maximum = initial
+        else:
+            minimum, maximum = config.MIN_CHECK_INTERVAL_SECONDS, config.MAX_CHECK_INTERVAL_SECONDS
+        profiles = parse_profiles(config.SCHEDULE_PROFILES)
+        logger.info(f"Starting apartment scraper agent ({len(self.scraper.searches)} search(es), "
+                    f"checking every {minimum:.0f}-{maximum:.0f}s, starting at {initial:.0f}s)...")
         
-        # Run initial check
-        self.check_for_new_listings()
+        # Keep the seen index in memory between checks; a background thread writes changes back
+        # every SEEN_FLUSH_SECONDS, and shutdown (including SIGTERM) writes the rest
+        self.scraper.seen_store = WriteBehindSeenStore(
+            self.scraper.seen_store,
+            interval=config.SEEN_FLUSH_SECONDS,
+            ttl=config.SEEN_TTL_DAYS * 86400,
+            bloom_path=config.SEEN_BLOOM_FILE,
+            error_rate=config.SEEN_BLOOM_ERROR_RATE,
+            recent=config.SEEN_RECENT_HOURS * 3600
+        ).start()
         
-        # Keep running until interrupted
-        while self.running:
+        if config.METRICS_PORT:
             try:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute for scheduled tasks
-            except KeyboardInterrupt:
-                logger.info("Interrupted by user. Stopping...")
-                break
-            except Exception as e:
-                logger.error(f"Unexpected error: {e}")
-                time.sleep(60)  # Wait before retrying
+                start_metrics_server(config.METRICS_PORT)
+            except OSError as e:
+                logger.error(f"Could not start metrics server on port {config.METRICS_PORT}: {e}")
+        
+        self.scheduler = Scheduler(workers=config.SEARCH_WORKERS)
+        for search in self.scraper.searches:
+            interval = AdaptiveInterval(
+                initial, minimum, maximum,
+                alpha=config.ARRIVAL_RATE_SMOOTHING,
+                target=config.TARGET_NEW_PER_CHECK,
+                profiles=profiles,
+                jitter=config.SCHEDULE_JITTER
+            )
+            # Every search runs once at startup, then on its own schedule
+            self.scheduler.add(Job(search.name, lambda search=search: self.check_for_new_listings([search]), interval))
         
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            logger.info("Interrupted by user. Stopping...")
+        
+        self.shutdown()
         logger.info("Apartment scraper agent stopped.")
     
     def test_components(self):
@@ -139,9 +217,15 @@ def main():
     parser = argparse.ArgumentParser(description='Apartment Scraper Agent')
     parser.add_argument('--once', action='store_true', help='Run once and exit')
     parser.add_argument('--test', action='store_true', help='Test all components')
-    parser.add_argument('--interval', type=int, help='Check interval in minutes (overrides config)')
+    parser.add_argument('--interval', type=int, help='Fixed check interval in minutes (overrides config, disables adaptive scheduling)')
+    parser.add_argument('--base-url', help='Send search requests to this host instead of Pararius (e.g. http://127.0.0.1:8765)')
+    parser.add_argument('--no-cache', action='store_true', help='Fetch every page from the server instead of reusing recently cached responses')
+    parser.add_argument('--profile', action='store_true', help='Write cProfile and tracemalloc reports for check cycles')
+    parser.add_argument('--profile-every', type=int, help='Profile only 1 in N check cycles (default PROFILE_EVERY)')
+    parser.add_argument('--profile-dir', help='Directory for profile reports (default PROFILE_DIR)')
     
     args = parser.parse_args()
+    setup_logging()
     
     # Override interval if specified
     if args.interval:
@@ -149,7 +233,19 @@ def main():
         config.CHECK_INTERVAL_MINUTES = args.interval
         logger.info(f"Using custom interval: {config.CHECK_INTERVAL_MINUTES} minutes")
     
-    agent = ApartmentScraperAgent()
+    profiler = None
+    if args.profile:
+        import config
+        from profiling import CycleProfiler
+        profiler = CycleProfiler(
+            output_dir=args.profile_dir or config.PROFILE_DIR,
+            every=args.profile_every or config.PROFILE_EVERY,
+            top=config.PROFILE_TOP
+        )
+        logger.info(f"Profiling 1 in {profiler.every} check cycle(s) into {profiler.output_dir}/")
+    
+    agent = ApartmentScraperAgent(base_url=args.base_url, profiler=profiler, use_cache=not args.no_cache,
+                                  one_shot=args.once or args.test)
     
     if args.test:
         success = agent.test_components()
@@ -157,7 +253,7 @@ def main():
     elif args.once:
         agent.run_once()
     else:
-        agent.run_continuous()
+        agent.run_continuous(fixed_interval=bool(args.interval))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+"""
+Lightweight instrumentation for the scrape and notify pipeline.
+
+Counters, gauges and histograms live in one process-wide registry and are
+rendered in the Prometheus text format, served over HTTP in continuous mode,
+or summarized as JSON for single runs. Recording a value is a dictionary
+update under a lock, cheap enough for the hot paths.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.values.items()]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {_format_labels(key) or 'total': value for key, value in self.values.items()}
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [bucket counts..., sum, count]
+        self.values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self.values.get(_label_key(labels))
+        return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self.values.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, series):
+                    cumulative += bucket
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                _format_labels(key) or 'total': {
+                    'count': series[-1],
+                    'sum': round(series[-2], 6),
+                    'mean': round(series[-2] / series[-1], 6) if series[-1] else 0.0,
+                }
+                for key, series in self.values.items()
+            }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.started = time.time()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        """Every metric that recorded something, as plain JSON-friendly values."""
+        metrics = {name: metric.summary() for name, metric in self.metrics.items()}
+        return {
+            'started': self.started,
+            'duration_seconds': round(time.time() - self.started, 3),
+            'metrics': {name: values for name, values in metrics.items() if values},
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+FETCH_SECONDS = REGISTRY.histogram('scraper_fetch_seconds', 'Page fetch latency including retries, by outcome')
+FETCH_BYTES = REGISTRY.counter('scraper_fetch_bytes_total', 'Bytes of page bodies downloaded')
+PARSE_SECONDS = REGISTRY.histogram('scraper_parse_seconds', 'Time to parse one result page')
+PARSE_BATCH_SECONDS = REGISTRY.histogram('scraper_parse_batch_seconds', 'Time to parse the changed pages of a crawl in the parse pool')
+LISTINGS_PARSED = REGISTRY.counter('scraper_listings_parsed_total', 'Listings parsed from result pages')
+SEARCH_LISTINGS = REGISTRY.gauge('scraper_search_listings', 'Listings found by the latest crawl of each search')
+NEW_LISTINGS = REGISTRY.counter('scraper_new_listings_total', 'Listings not seen before')
+PERSIST_SECONDS = REGISTRY.histogram('scraper_persist_seconds', 'Time spent writing to a store, by store')
+SENDGRID_SECONDS = REGISTRY.histogram('sendgrid_request_seconds', 'SendGrid API request latency, by status')
+DETAIL_LOOKUPS = REGISTRY.counter('scraper_detail_lookups_total', 'Detail pages needed for new listings, by cache result')
+SEEN_INDEX_LOOKUPS = REGISTRY.counter('scraper_seen_index_lookups_total', 'Seen index answers in continuous mode, by source (memory, filter, store)')
+DUPLICATE_LISTINGS = REGISTRY.counter('scraper_duplicate_listings_total', 'New listings suspected to be near-duplicates, by kind (relisting, duplicate)')
+RESPONSE_CACHE_LOOKUPS = REGISTRY.counter('scraper_response_cache_total', 'Page fetches by response cache result (fresh, revalidated, miss)')
+LAST_CHECK = REGISTRY.gauge('scraper_last_check_timestamp_seconds', 'Unix time the last check finished')
+
+
+def start_metrics_server(port: int, host: str = '0.0.0.0', registry: MetricsRegistry = REGISTRY):
+    """Serve /metrics on a background thread; returns the ThreadingHTTPServer."""
+    # Imported here: single runs never serve metrics and should not pay for http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def push_summary(url: Optional[str], registry: MetricsRegistry = REGISTRY, timeout: float = 10.0) -> bool:
+    """Log the run's metrics summary and POST it as JSON to `url` when one is configured."""
+    summary = registry.summary()
+    logger.info(f"Metrics summary: {json.dumps(summary, ensure_ascii=False)}")
+    if not url:
+        return True
+    try:
+        import requests
+        response = requests.post(url, json=summary, timeout=timeout)
+        response.raise_for_status()
+        logger.info(f"Pushed metrics summary to {url}")
+        return True
+    except Exception as e:
+        logger.error(f"Error pushing metrics summary to {url}: {e}")
+        return False
@@ -0,0 +1,271 @@
+"""
+Near-duplicate detection for new listings.
+
+A listing that is taken offline and posted again gets a new URL, and so a new
+ID, and the same apartment offered by two agencies appears twice. Both look
+new to the seen store. Each new listing is reduced to a small set of tokens
+(title words, the street address, postcode, city, floor area and rooms) and a
+MinHash signature of that set. The signatures of every listing ever indexed
+are split into bands and kept in SQLite, indexed by (band, bucket); only
+listings sharing a whole band with the new one are compared, so a lookup
+costs a few index probes instead of a scan of the history. MinHash is used
+rather than SimHash because listings yield around ten tokens, too few for
+SimHash's bit distances to separate near-duplicates from neighbours.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from listing import Listing, split_words
+
+logger = logging.getLogger(__name__)
+# Mersenne prime for the (a * x + b) mod p permutations
+_PRIME = (1 << 61) - 1
+# Floor areas within the same 5 m² step count as equal; agencies round differently
+_AREA_STEP = 5
+# Matches further apart than this many steps are different flats, e.g. two sizes in one building
+_MAX_AREA_STEPS = 1
+# Stay well below SQLite's host parameter limit
+_BATCH_SIZE = 500
+
+Signature = Tuple[int, ...]
+
+
+def listing_tokens(listing: Listing) -> Set[str]:
+    """The features compared between listings; empty when the listing has too little text to compare.
+
+    The price is left out, so a relisting at a new rent still matches. The
+    street and house number also form one combined token, which keeps two
+    flats in the same building ("Oude Delft 112" and "Oude Delft 114") apart.
+    """
+    words = split_words(listing.title or '')
+    tokens = set(words)
+    if len(words) > 1:
+        # Titles read "<kind> <street> <number>"; the kind varies between agencies
+        tokens.add('address:' + '-'.join(words[1:]))
+    if listing.postcode:
+        tokens.add('postcode:' + listing.postcode.replace(' ', '').lower())
+    if not words and not listing.postcode:
+        return set()
+    if listing.city:
+        tokens.add('city:' + listing.city)
+    if listing.area is not None:
+        tokens.add(f"area:{listing.area // _AREA_STEP}")
+    if listing.rooms is not None:
+        tokens.add(f"rooms:{listing.rooms}")
+    if listing.bedrooms is not None:
+        tokens.add(f"bedrooms:{listing.bedrooms}")
+    return tokens if len(tokens) >= 3 else set()
+
+
+def same_size(area: Optional[int], bedrooms: Optional[int], other_area: Optional[int], other_bedrooms: Optional[int]) -> bool:
+    """Whether two listings can be the same flat by size; unknown values do not rule a match out.
+
+    Tokens hold the area only as one feature among about ten, so flats at the
+    same address score high even when their sizes differ; this check vetoes them.
+    """
+    if area is not None and other_area is not None and abs(area // _AREA_STEP - other_area // _AREA_STEP) > _MAX_AREA_STEPS:
+        return False
+    return bedrooms is None or other_bedrooms is None or bedrooms == other_bedrooms
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class MinHasher:
+    """MinHash signatures with a fixed seed, so signatures stored by earlier runs stay comparable."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, tokens: Iterable[str]) -> Signature:
+        hashes = [_token_hash(token) for token in tokens]
+        return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in self.permutations)
+
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the token sets behind two signatures."""
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash LSH index of listing signatures.
+
+    With 16 bands of 4 rows, listings with a Jaccard similarity of 0.7 share a
+    band 99% of the time and unrelated listings in the same city (around 0.2)
+    under 3% of the time; candidates are then checked against the threshold,
+    and ruled out when their floor area or bedroom count says they are another flat.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.7, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                added REAL NOT NULL,
+                area INTEGER,
+                bedrooms INTEGER,
+                link TEXT
+            ) WITHOUT ROWID
+        """)
+        # Indexes written before sizes and links were stored: their rows match on signature alone
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(signatures)")}
+        for column, kind in (('area', 'INTEGER'), ('bedrooms', 'INTEGER'), ('link', 'TEXT')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE signatures ADD COLUMN {column} {kind}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._check_layout(f"{num_perm}x{bands}")
+
+    def _check_layout(self, layout: str):
+        """Start over when the index was built with other MinHash parameters; its signatures cannot be compared."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+        if row and row[0] == layout:
+            return
+        if row:
+            logger.warning(f"Rebuilding near-duplicate index {self.path}: layout changed from {row[0]} to {layout}")
+            self.conn.execute("DELETE FROM signatures")
+            self.conn.execute("DELETE FROM buckets")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+
+    def _buckets(self, signature: Signature) -> List[int]:
+        """One signed 64-bit bucket per band, the hash of that band's rows."""
+        buckets = []
+        for start in range(0, len(signature), self.rows):
+            data = array('Q', signature[start:start + self.rows]).tobytes()
+            buckets.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True))
+        return buckets
+
+    def _load(self, data: bytes) -> Signature:
+        values = array('Q')
+        values.frombytes(data)
+        return tuple(values)
+
+    def _best_match(self, listing_id: str, signature: Signature, area: Optional[int],
+                    bedrooms: Optional[int]) -> Optional[Tuple[str, float]]:
+        candidates = set()
+        for band, bucket in enumerate(self._buckets(signature)):
+            rows = self.conn.execute("SELECT id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket))
+            candidates.update(row[0] for row in rows)
+        candidates.discard(listing_id)
+        if not candidates:
+            return None
+
+        best = None
+        candidates = list(candidates)
+        for start in range(0, len(candidates), _BATCH_SIZE):
+            batch = candidates[start:start + _BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            for candidate, data, candidate_area, candidate_bedrooms in self.conn.execute(
+                    f"SELECT id, signature, area, bedrooms FROM signatures WHERE id IN ({placeholders})", batch):
+                if not same_size(area, bedrooms, candidate_area, candidate_bedrooms):
+                    continue
+                score = similarity(signature, self._load(data))
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (candidate, score)
+        return best
+
+    def _add(self, listing_id: str, signature: Signature, area: Optional[int], bedrooms: Optional[int],
+             link: Optional[str], now: float):
+        previous = self.conn.execute("SELECT signature FROM signatures WHERE id = ?", (listing_id,)).fetchone()
+        if previous:
+            self.conn.executemany("DELETE FROM buckets WHERE band = ? AND bucket = ? AND id = ?",
+                                  ((band, bucket, listing_id)
+                                   for band, bucket in enumerate(self._buckets(self._load(previous[0])))))
+        self.conn.execute("INSERT OR REPLACE INTO signatures (id, signature, added, area, bedrooms, link) VALUES (?, ?, ?, ?, ?, ?)",
+                          (listing_id, array('Q', signature).tobytes(), now, area, bedrooms, link))
+        self.conn.executemany("INSERT OR IGNORE INTO buckets (band, bucket, id) VALUES (?, ?, ?)",
+                              ((band, bucket, listing_id) for band, bucket in enumerate(self._buckets(signature))))
+
+    def _signatures(self, listings: Iterable[Listing]) -> List[Tuple[str, Signature, Optional[int], Optional[int], Optional[str]]]:
+        signatures = []
+        for listing in listings:
+            tokens = listing_tokens(listing)
+            if tokens:
+                signatures.append((listing.id, self.hasher.signature(tokens), listing.area, listing.bedrooms, listing.link))
+        return signatures
+
+    def _index(self, listings: Iterable[Listing], now: Optional[float], match: bool) -> Dict[str, Tuple[str, float]]:
+        signatures = self._signatures(listings)
+        if not signatures:
+            return {}
+        now = time.time() if now is None else now
+
+        matches = {}
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for listing_id, signature, area, bedrooms, link in signatures:
+                    best = self._best_match(listing_id, signature, area, bedrooms) if match else None
+                    if best is not None:
+                        matches[listing_id] = best
+                    self._add(listing_id, signature, area, bedrooms, link, now)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return matches
+
+    def check(self, listings: List[Listing], now: Optional[float] = None) -> Dict[str, Tuple[str, float]]:
+        """Index the listings and return, for each near-duplicate, the ID it matches and the similarity.
+
+        Listings are compared with everything indexed before them, including
+        earlier listings in the same batch. Listings with too little text to
+        compare are neither matched nor indexed.
+        """
+        return self._index(listings, now, match=True)
+
+    def add(self, listings: List[Listing], now: Optional[float] = None):
+        """Index listings without comparing them, e.g. ones already known from before the index existed."""
+        self._index(listings, now, match=False)
+
+    def links(self, listing_ids: Iterable[str]) -> Dict[str, str]:
+        """The detail-page links of indexed listings; listings indexed before links were stored have none."""
+        listing_ids = list(listing_ids)
+        links = {}
+        with self._lock:
+            for start in range(0, len(listing_ids), _BATCH_SIZE):
+                batch = listing_ids[start:start + _BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                links.update(self.conn.execute(
+                    f"SELECT id, link FROM signatures WHERE id IN ({placeholders}) AND link IS NOT NULL", batch))
+        return links
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,206 @@
+"""
+Append-only JSONL notification log.
+
+Each notification is one JSON line appended to the active segment. When the
+active segment grows past max_bytes it is closed, renamed with the next
+sequence number and optionally gzip-compressed, so writes never touch history.
+The reader streams segments oldest-first or tails the newest entries from the
+end of the log without loading everything.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def _to_json(value):
+    # Listing records serialize to the same shape as the listing dicts they replaced
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class NotificationLog:
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, compress: bool = True,
+                 fsync_every: int = 20, fsync_interval: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Unbuffered append: every entry reaches the OS in a single write() call
+            self._file = open(self.path, 'ab', buffering=0)
+        return self._file
+
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, entry: Dict):
+        """Append one entry to the log."""
+        line = (json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=_to_json) + '\n').encode('utf-8')
+
+        with self._lock:
+            f = self._open()
+            if f.tell() and f.tell() + len(line) > self.max_bytes:
+                self._rotate()
+                f = self._open()
+
+            f.write(line)
+            self._unsynced += 1
+            if self._closed:
+                # A late write, e.g. a channel still running at shutdown: keep it, but leave the log closed
+                self._sync()
+                self._file.close()
+                self._file = None
+            elif self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def flush(self):
+        """Force pending entries to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """Flush pending entries and close the active segment."""
+        with self._lock:
+            self._closed = True
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        """Seal the active segment under the next sequence number."""
+        self._sync()
+        self._file.close()
+        self._file = None
+
+        sequence = max((number for number, _ in self.segments()), default=0) + 1
+        sealed = f"{self.path}.{sequence:06d}"
+        os.replace(self.path, sealed)
+
+        if self.compress:
+            with open(sealed, 'rb') as src, gzip.open(sealed + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(sealed)
+            sealed += '.gz'
+        logger.info(f"Rotated notification log segment to {sealed}")
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """Sealed segments as (sequence, path), oldest first."""
+        pattern = re.compile(re.escape(os.path.basename(self.path)) + r'\.(\d+)(\.gz)?$')
+        found = []
+        for path in glob.glob(glob.escape(self.path) + '.*'):
+            match = pattern.match(os.path.basename(path))
+            if match:
+                found.append((int(match.group(1)), path))
+        return sorted(found)
+
+    def _iter_segment(self, path: str) -> Iterator[Dict]:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A crash can leave a partial last line behind
+                        logger.warning(f"Skipping unreadable line in {path}")
+
+    def iter_entries(self) -> Iterator[Dict]:
+        """Stream every entry, oldest first."""
+        for _, path in self.segments():
+            yield from self._iter_segment(path)
+        if os.path.exists(self.path):
+            yield from self._iter_segment(self.path)
+
+    def tail(self, n: int) -> List[Dict]:
+        """Return the last n entries, oldest first."""
+        if n <= 0:
+            return []
+
+        entries = self._tail_active(n)
+        for _, path in reversed(self.segments()):
+            if len(entries) >= n:
+                break
+            older = deque(self._iter_segment(path), maxlen=n - len(entries))
+            entries = list(older) + entries
+        return entries
+
+    def _tail_active(self, n: int) -> List[Dict]:
+        """Read the active segment backwards until n complete lines are found."""
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            while position > 0 and data.count(b'\n') <= n:
+                step = min(_TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+
+        lines = [line for line in data.split(b'\n') if line.strip()]
+        if position > 0:
+            # The first line may be cut off at the block boundary
+            lines = lines[1:]
+
+        entries = []
+        for line in lines[-n:]:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in {self.path}")
+        return entries
+
+
+def migrate_json_notifications(log: NotificationLog, json_path: str) -> int:
+    """Seed an empty log with the entries of a legacy notifications.json.
+
+    Returns the number of entries imported.
+    """
+    if os.path.exists(log.path) or log.segments() or not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading {json_path} for migration: {e}")
+        return 0
+
+    for entry in entries:
+        log.append(entry)
+    log.flush()
+    logger.info(f"Migrated {len(entries)} notifications from {json_path} to {log.path}")
+    return len(entries)
@@ -0,0 +1,124 @@
+"""
+Process pool for parsing batches of result pages.
+
+Parsing is pure Python and lxml work held under the GIL, so the page threads
+of a crawl parse one at a time on one core. With a ParsePool the crawl hands
+the changed pages to worker processes instead: raw HTML goes out as bytes,
+and each page comes back as a list of ListingFields tuples, the cheapest form
+to pickle; Listing records are built from them in the scraper's process.
+Shipping pages costs a fixed round trip per task plus pickling per byte, so
+pages are grouped into batches of about batch_bytes, and batches below
+min_bytes in total are not worth sending at all; the crossover is measured by
+`python -m benchmarks.run` (parse_pages/*).
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# One parser per worker process, built on its first batch
+_parser = None
+
+
+def _parse_batch(pages: List[bytes]) -> List[list]:
+    """Worker side: the ListingFields of every page in a batch, in order."""
+    global _parser
+    if _parser is None:
+        from lxml_parser import LxmlListingParser
+        _parser = LxmlListingParser()
+    results = []
+    for page in pages:
+        try:
+            results.append(_parser.parse_fields(page))
+        except Exception as e:
+            logger.error(f"Error parsing page in worker: {e}")
+            results.append([])
+    return results
+
+
+def plan_batches(sizes: Sequence[int], workers: int, batch_bytes: int) -> List[range]:
+    """Split pages into contiguous runs of roughly equal bytes.
+
+    There are enough runs to give every worker one, and more when that leaves
+    runs larger than batch_bytes, so a slow batch does not hold up the rest.
+    """
+    if not sizes:
+        return []
+    total = sum(sizes)
+    count = min(len(sizes), max(workers, -(-total // max(batch_bytes, 1))))
+    batches = []
+    start = 0
+    accumulated = 0
+    for index, size in enumerate(sizes):
+        accumulated += size
+        remaining, runs_to_come = len(sizes) - index - 1, count - len(batches) - 1
+        # Cut once this run reaches its share of the bytes, leaving at least a page for every run still to come
+        if remaining == runs_to_come or (remaining > runs_to_come and accumulated * count >= total * (len(batches) + 1)):
+            batches.append(range(start, index + 1))
+            start = index + 1
+            if len(batches) == count - 1:
+                break
+    if start < len(sizes):
+        batches.append(range(start, len(sizes)))
+    return batches
+
+
+class ParsePool:
+    """Worker processes parsing result pages; started on the first batch big enough to need them.
+
+    Workers come from forkserver (spawn where that is unavailable) rather than
+    fork: the scraper has fetch, scheduler and dispatcher threads running, and
+    forking copies their held locks into the children.
+    """
+
+    def __init__(self, workers: int, min_bytes: int = 256 * 1024, batch_bytes: int = 128 * 1024):
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self.batch_bytes = batch_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Set when the pool failed; every batch is then parsed in-process
+        self.broken = False
+
+    def worthwhile(self, pages: Sequence[bytes]) -> bool:
+        """Whether a batch is big enough to gain from the pool."""
+        return (not self.broken and self.workers > 1 and len(pages) > 1
+                and sum(len(page) for page in pages) >= self.min_bytes)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Searches crawl concurrently and share one pool
+        with self._lock:
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                logger.info(f"Started parse pool with {self.workers} worker processes")
+            return self._executor
+
+    def parse_fields(self, pages: Sequence[bytes]) -> List[list]:
+        """The ListingFields of every page, parsed in the worker processes.
+
+        A pool that fails (a worker died, a batch could not be pickled) is shut
+        down and marked broken, and the error is raised for the caller to parse
+        in-process instead.
+        """
+        batches = plan_batches([len(page) for page in pages], self.workers, self.batch_bytes)
+        try:
+            futures = [self.executor.submit(_parse_batch, [pages[index] for index in batch]) for batch in batches]
+            return [fields for future in futures for fields in future.result()]
+        except Exception as e:
+            logger.error(f"Parse pool failed, parsing in-process from now on: {e}")
+            self.broken = True
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,153 @@
+"""
+Per-cycle profiling.
+
+CycleProfiler wraps a function (the agent's check_for_new_listings) so that
+every Nth call runs under cProfile and tracemalloc. Each profiled cycle writes
+a .pstats file for snakeviz/pstats and a short text report with the top
+functions by cumulative time and the top allocation sites. Unprofiled cycles
+only pay for a counter increment, so sampling can stay on in production.
+
+Search and page fetches run on short-lived worker threads. From Python 3.12
+cProfile sees every thread by itself; before that, threads started during a
+profiled cycle get their own profiler through threading.setprofile, and their
+stats are merged into the cycle's. Threads started before or after the cycle
+are left alone. A profiler can only be stopped from its own thread, so a
+worker started during the cycle that outlives it stays profiled until it
+exits; later reports leave it out.
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Before 3.12 a profiler only sees the thread that enabled it
+_PER_THREAD = sys.version_info < (3, 12)
+
+
+class _Snapshot:
+    """A worker's stats for pstats without disabling its profiler, which only its own thread may do."""
+
+    def __init__(self, profile: cProfile.Profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self):
+        pass
+
+
+class CycleProfiler:
+    def __init__(self, output_dir: str = 'profiles', every: int = 1, top: int = 25, frames: int = 10):
+        self.output_dir = output_dir
+        self.every = max(every, 1)
+        self.top = top
+        self.frames = frames
+        self.calls = 0
+        self.profiled = 0
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._profiling = False
+
+    def wrap(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._lock:
+                self.calls += 1
+                sampled = (self.calls - 1) % self.every == 0
+            # One profiled cycle at a time; overlapping cycles just run normally
+            if not sampled or not self._active.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return self.profile(func, *args, **kwargs)
+            finally:
+                self._active.release()
+        return wrapper
+
+    def _profile_thread(self, frame, event, arg):
+        # Installed by threading.setprofile in threads started during the cycle; on the
+        # thread's first call it hands over to a profiler of its own
+        sys.setprofile(None)
+        if not self._profiling:
+            # Started just as the cycle ended
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        with self._lock:
+            self._thread_profiles.append(profile)
+
+    def profile(self, func: Callable, *args, **kwargs):
+        """Run func under cProfile and tracemalloc and write the reports."""
+        self._thread_profiles = []
+        profile = cProfile.Profile()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start(self.frames)
+        started = time.perf_counter()
+
+        hook = threading.getprofile()
+        self._profiling = True
+        if _PER_THREAD:
+            threading.setprofile(self._profile_thread)
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._profiling = False
+            if _PER_THREAD:
+                threading.setprofile(hook)
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not tracing:
+                tracemalloc.stop()
+            self.profiled += 1
+            try:
+                self._write_reports(profile, snapshot, peak, elapsed)
+            except Exception as e:
+                logger.error(f"Error writing profile for cycle {self.calls}: {e}")
+
+    def _write_reports(self, profile: cProfile.Profile, snapshot: tracemalloc.Snapshot, peak: int, elapsed: float):
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"cycle-{self.calls:05d}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+        stats = pstats.Stats(profile)
+        with self._lock:
+            thread_profiles = list(self._thread_profiles)
+        for thread_profile in thread_profiles:
+            try:
+                stats.add(_Snapshot(thread_profile))
+            except TypeError:
+                # A thread that never made a profiled call has no stats
+                pass
+        stats.dump_stats(f"{prefix}.pstats")
+
+        report = io.StringIO()
+        report.write(f"Cycle {self.calls}: {elapsed:.3f}s wall, {len(thread_profiles)} worker thread(s) profiled, "
+                     f"peak traced memory {peak / 1024:.1f} KiB\n\n")
+        report.write(f"Top {self.top} functions by cumulative time\n")
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(self.top)
+
+        report.write(f"\nTop {self.top} allocation sites still alive at the end of the cycle\n")
+        filtered = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        for index, stat in enumerate(filtered.statistics('lineno')[:self.top], 1):
+            frame = stat.traceback[0]
+            report.write(f"{index:3d}. {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB in {stat.count} block(s)\n")
+
+        with open(f"{prefix}.txt", 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        logger.info(f"Profiled cycle {self.calls} in {elapsed:.2f}s: {prefix}.pstats, {prefix}.txt")
@@ -6,22 +6,22 @@ Runs the apartment scraper once and exits - perfect for Railway's cron schedulin
 
 import sys
 import logging
-from main import ApartmentScraperAgent
+from main import ApartmentScraperAgent, setup_logging
+from metrics import push_summary
+from config import METRICS_PUSH_URL
 
-# Set up logging for Railway
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 def main():
     """Run the scraper once and exit."""
+    # Railway collects stdout; the container filesystem does not outlive the run
+    setup_logging(log_file=None)
     try:
         logger.info("Starting Railway scheduled apartment scraper job...")
         
         agent = ApartmentScraperAgent()
         agent.run_once()
+        push_summary(METRICS_PUSH_URL)
         
         logger.info("Railway scheduled job completed successfully!")
         sys.exit(0)
@@ -0,0 +1,287 @@
+"""
+Content-addressed disk cache of fetched pages.
+
+Bodies are stored once per SHA-256 digest, compressed with zstd when the
+zstandard package is installed and gzip otherwise, under
+<directory>/objects/ab/<digest>.<codec>. A SQLite index maps each cache key
+(the URL with its query normalized) to a digest plus the ETag and
+Last-Modified validators, so identical pages fetched for different searches or
+runs share one blob. A response is served without a request while it is
+younger than its route's TTL, and afterwards still provides validators for a
+conditional GET. Blobs are evicted least recently used first once their total
+size passes max_bytes.
+"""
+
+import fnmatch
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def cache_key(url: str) -> str:
+    """URL with a lowercase scheme and host, no default port, trailing slash or fragment, and sorted query."""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, path, '', query, ''))
+
+
+def parse_ttls(spec: str) -> List[Tuple[str, float]]:
+    """Parse "/huurwoningen/*=60;/*-te-huur/*=86400" into (path pattern, seconds) rules; the first match wins."""
+    rules = []
+    for part in filter(None, (part.strip() for part in (spec or '').split(';'))):
+        pattern, _, seconds = part.rpartition('=')
+        try:
+            rules.append((pattern.strip(), float(seconds)))
+        except ValueError:
+            logger.warning(f"Ignoring invalid response cache TTL: {part!r}")
+    return rules
+
+
+def _codec(preferred: str = 'auto') -> str:
+    if preferred in ('auto', 'zstd'):
+        try:
+            import zstandard  # noqa: F401
+            return 'zst'
+        except ImportError:
+            if preferred == 'zstd':
+                logger.warning("zstandard is not installed, compressing cached responses with gzip")
+    return 'gz'
+
+
+def _compress(body: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        import zstandard
+        return zstandard.ZstdCompressor(level=6).compress(body)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class CachedResponse:
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'fetched', 'ttl')
+
+    def __init__(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str],
+                 fetched: float, ttl: float):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = fetched
+        self.ttl = ttl
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < self.ttl
+
+
+class ResponseCache:
+    def __init__(self, directory: str, max_bytes: int = 100 * 1024 * 1024, ttls: Optional[List[Tuple[str, float]]] = None,
+                 default_ttl: float = 0.0, compression: str = 'auto'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = ttls or []
+        self.default_ttl = default_ttl
+        self.codec = _codec(compression)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.size = 0
+        self._last_access = 0.0
+
+    def _touch(self) -> float:
+        # Strictly increasing, so blobs used within the same clock tick still have an order
+        self._last_access = max(time.time(), self._last_access + 1e-6)
+        return self._last_access
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use so a cache that is never touched leaves nothing on disk
+        if self._conn is None:
+            os.makedirs(os.path.join(self.directory, 'objects'), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=30,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_digest ON responses (digest)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_accessed ON blobs (accessed)")
+            self.size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            self._last_access = conn.execute("SELECT COALESCE(MAX(accessed), 0) FROM blobs").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def ttl_for(self, url: str) -> float:
+        path = urlparse(url).path
+        for pattern, seconds in self.ttls:
+            if fnmatch.fnmatchcase(path, pattern):
+                return seconds
+        return self.default_ttl
+
+    def _blob_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.{codec}")
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """The last stored response for a URL, fresh or not; None if it is not cached."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT r.digest, r.etag, r.last_modified, r.fetched, b.codec FROM responses r "
+                "JOIN blobs b ON b.digest = r.digest WHERE r.key = ?", (cache_key(url),)).fetchone()
+            if row is None:
+                return None
+            digest, etag, last_modified, fetched, codec = row
+            self.conn.execute("UPDATE blobs SET accessed = ? WHERE digest = ?", (self._touch(), digest))
+        try:
+            with open(self._blob_path(digest, codec), 'rb') as f:
+                body = _decompress(f.read(), codec)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cached response for {url}: {e}")
+            self._forget(url)
+            return None
+        return CachedResponse(url, body, etag, last_modified, fetched, self.ttl_for(url))
+
+    def put(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a response; a body already in the cache is not written again."""
+        digest = hashlib.sha256(body).hexdigest()
+        key = cache_key(url)
+        with self._lock:
+            stored = self.conn.execute("SELECT codec FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if stored is None:
+            data = _compress(body, self.codec)
+            path = self._blob_path(digest, self.codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{threading.get_ident()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+
+        with self._lock:
+            now = self._touch()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous = self.conn.execute("SELECT digest FROM responses WHERE key = ?", (key,)).fetchone()
+                if stored is None:
+                    inserted = self.conn.execute(
+                        "INSERT OR IGNORE INTO blobs (digest, codec, size, accessed) VALUES (?, ?, ?, ?)",
+                        (digest, self.codec, len(data), now)).rowcount
+                    self.size += len(data) if inserted else 0
+                else:
+                    self.conn.execute("UPDATE blobs SET accessed = ? WHERE digest = ?", (now, digest))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, digest, etag, last_modified, fetched) VALUES (?, ?, ?, ?, ?)",
+                    (key, digest, etag, last_modified, now))
+                doomed = []
+                if previous and previous[0] != digest:
+                    doomed.extend(self._release(previous[0]))
+                doomed.extend(self._evict(keep=digest))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+                raise
+        self._remove_files(doomed)
+
+    def touch(self, url: str):
+        """Mark a stored response as just fetched, e.g. after a 304."""
+        with self._lock:
+            self.conn.execute("UPDATE responses SET fetched = ? WHERE key = ?", (time.time(), cache_key(url)))
+
+    def _release(self, digest: str) -> List[Tuple[str, str]]:
+        """Drop a blob no response points to any more; returns the files to delete."""
+        if self.conn.execute("SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return []
+        row = self.conn.execute("SELECT codec, size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return []
+        self.conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self.size -= row[1]
+        return [(digest, row[0])]
+
+    def _evict(self, keep: str) -> List[Tuple[str, str]]:
+        """Drop least recently used blobs, and the responses using them, until the cache fits."""
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return []
+        doomed = []
+        freed = 0
+        for digest, codec, size in self.conn.execute("SELECT digest, codec, size FROM blobs ORDER BY accessed"):
+            if digest == keep:
+                continue
+            doomed.append((digest, codec))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE digest = ?", [(digest,) for digest, _ in doomed])
+        self.conn.executemany("DELETE FROM blobs WHERE digest = ?", [(digest,) for digest, _ in doomed])
+        self.size -= freed
+        return doomed
+
+    def _forget(self, url: str):
+        with self._lock:
+            row = self.conn.execute("SELECT digest FROM responses WHERE key = ?", (cache_key(url),)).fetchone()
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (cache_key(url),))
+            doomed = self._release(row[0]) if row else []
+        self._remove_files(doomed)
+
+    def _remove_files(self, blobs: List[Tuple[str, str]]):
+        for digest, codec in blobs:
+            try:
+                os.remove(self._blob_path(digest, codec))
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def blob_count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
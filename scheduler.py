@@ -0,0 +1,190 @@
+"""
+Adaptive, event-driven check scheduler.
+
+Each search is its own job with its own interval. The interval follows the
+search's recent arrival rate (an exponentially weighted average of new
+listings per second), aiming for about `target` new listings per check, and
+stays within [minimum, maximum]. Time-of-day profiles scale it (e.g. poll
+twice as often during office hours), and jitter keeps checks from lining up.
+
+The scheduler thread sleeps on an Event until the next job is due, so it
+wakes exactly on time and immediately on shutdown. Jobs run on a thread pool;
+a job that is still running when it comes due again is skipped.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PROFILE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*([\d.]+)\s*$')
+
+
+class TimeOfDayProfile:
+    """Scales the check interval by `factor` between two times of day (end exclusive, may wrap midnight)."""
+
+    __slots__ = ('start', 'end', 'factor')
+
+    def __init__(self, start: int, end: int, factor: float):
+        self.start = start
+        self.end = end
+        self.factor = factor
+
+    def contains(self, minute_of_day: int) -> bool:
+        if self.start <= self.end:
+            return self.start <= minute_of_day < self.end
+        return minute_of_day >= self.start or minute_of_day < self.end
+
+    def __repr__(self):
+        return f"TimeOfDayProfile({self.start // 60:02d}:{self.start % 60:02d}-{self.end // 60:02d}:{self.end % 60:02d}={self.factor})"
+
+
+def parse_profiles(spec: str) -> List[TimeOfDayProfile]:
+    """Parse "08:00-18:00=0.5;00:00-07:00=4" into profiles; the first match wins."""
+    profiles = []
+    for part in filter(None, (part.strip() for part in (spec or '').split(';'))):
+        match = _PROFILE.match(part)
+        if not match:
+            logger.warning(f"Ignoring invalid schedule profile: {part!r}")
+            continue
+        start_h, start_m, end_h, end_m, factor = match.groups()
+        profiles.append(TimeOfDayProfile(int(start_h) * 60 + int(start_m), int(end_h) * 60 + int(end_m), float(factor)))
+    return profiles
+
+
+class AdaptiveInterval:
+    def __init__(self, initial: float, minimum: float, maximum: float, alpha: float = 0.3, target: float = 1.0,
+                 profiles: Optional[List[TimeOfDayProfile]] = None, jitter: float = 0.1,
+                 rng: Optional[random.Random] = None):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.alpha = alpha
+        self.target = target
+        self.profiles = profiles or []
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        # New listings per second; None until two checks have been observed
+        self.rate: Optional[float] = None
+
+    def observe(self, new_count: int, elapsed: float):
+        """Record that `new_count` listings appeared over the last `elapsed` seconds."""
+        if elapsed <= 0:
+            return
+        observed = new_count / elapsed
+        self.rate = observed if self.rate is None else self.alpha * observed + (1 - self.alpha) * self.rate
+
+    def factor(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for profile in self.profiles:
+            if profile.contains(minute):
+                return profile.factor
+        return 1.0
+
+    def base(self) -> float:
+        """Interval from the arrival rate alone, before profiles, bounds and jitter."""
+        if self.rate is None:
+            return self.initial
+        if self.rate <= 0:
+            return self.maximum
+        return self.target / self.rate
+
+    def next_interval(self, now: Optional[datetime] = None) -> float:
+        interval = min(max(self.base() * self.factor(now), self.minimum), self.maximum)
+        if self.jitter:
+            interval *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+        return interval
+
+
+class Job:
+    """A recurring check. `run` returns the number of new listings it found."""
+
+    def __init__(self, name: str, run: Callable[[], int], interval: AdaptiveInterval):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.running = False
+        self.last_started: Optional[float] = None
+        self.runs = 0
+        self.skipped = 0
+
+
+class Scheduler:
+    def __init__(self, workers: int = 4, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='check')
+        self.jobs: List[Job] = []
+        self._heap = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def add(self, job: Job, delay: float = 0.0):
+        """Register a job; its first run is due after `delay` seconds."""
+        self.jobs.append(job)
+        self._push(job, self.clock() + delay)
+
+    def _push(self, job: Job, due: float):
+        with self._lock:
+            heapq.heappush(self._heap, (due, next(self._sequence), job))
+        self._wake.set()
+
+    def _pop_due(self) -> Optional[float]:
+        """Start every due job; return seconds until the next one (None when there are no jobs)."""
+        while True:
+            with self._lock:
+                if not self._heap or self._stopped.is_set():
+                    return None
+                due, _, job = self._heap[0]
+                now = self.clock()
+                if due > now:
+                    return due - now
+                heapq.heappop(self._heap)
+
+            # Fixed-rate: the next run is scheduled when this one starts
+            self._push(job, now + job.interval.next_interval())
+            if job.running:
+                job.skipped += 1
+                logger.warning(f"Skipping check '{job.name}': the previous run is still going")
+                continue
+            job.running = True
+            self.pool.submit(self._execute, job, now)
+
+    def _execute(self, job: Job, started: float):
+        try:
+            new_count = job.run() or 0
+            if job.last_started is not None:
+                job.interval.observe(new_count, started - job.last_started)
+            job.last_started = started
+            job.runs += 1
+            rate = job.interval.rate
+            logger.info(f"Check '{job.name}' found {new_count} new listing(s); "
+                        f"arrival rate {rate * 3600 if rate is not None else 0:.2f}/h, "
+                        f"next interval ~{job.interval.base():.0f}s before profile and bounds")
+        except Exception as e:
+            logger.error(f"Check '{job.name}' failed: {e}")
+        finally:
+            job.running = False
+
+    def run(self):
+        """Run jobs until stop() is called."""
+        while not self._stopped.is_set():
+            self._wake.clear()
+            wait = self._pop_due()
+            self._wake.wait(wait)
+
+    def stop(self, wait: bool = True):
+        """Stop scheduling; with wait, let running checks finish."""
+        self._stopped.set()
+        self._wake.set()
+        self.pool.shutdown(wait=wait)
@@ -1,35 +1,298 @@
-import requests
-import json
 import time
-import os
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse
+from typing import TYPE_CHECKING, List, Dict, Optional, Set, Tuple
 import logging
-from config import TARGET_URL, HEADERS, LISTINGS_FILE
+from listing import Listing, legacy_listing_id, listing_id_from_link
+from config import (
+    TARGET_URL, HEADERS, CRAWL_WORKERS, MAX_PAGES, PARSER_ENGINE, PARSE_WORKERS, PARSE_POOL_MIN_BYTES, PARSE_BATCH_BYTES,
+    MAX_CONCURRENT_REQUESTS, HOST_RATE_LIMIT, HOST_RATE_BURST, HISTORY_ENABLED, HISTORY_DIR,
+    PARARIUS_BASE_URL, FETCH_MAX_RETRIES, FETCH_BACKOFF_BASE, FETCH_BACKOFF_CAP, FETCH_MAX_RETRY_AFTER,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS,
+    DETAILS_ENABLED, DETAIL_WORKERS, DETAIL_CACHE_FILE, DETAIL_CACHE_MAX_BYTES,
+    DUPLICATE_DETECTION, DUPLICATE_ACTION, DUPLICATE_DB_FILE, DUPLICATE_THRESHOLD, DUPLICATE_ONLINE_SECONDS
+)
+from metrics import (
+    FETCH_SECONDS, FETCH_BYTES, PARSE_SECONDS, PARSE_BATCH_SECONDS, LISTINGS_PARSED, NEW_LISTINGS, PERSIST_SECONDS, RESPONSE_CACHE_LOOKUPS,
+    DUPLICATE_LISTINGS
+)
+from fetcher import Fetcher, FetchResult, OK as FETCH_OK, NOT_MODIFIED as FETCH_NOT_MODIFIED
+from history_store import ListingHistory
+from rate_limit import HostRateLimiter
+from searches import Search, SearchFanOut, load_searches
+from seen_store import SeenListingStore, open_seen_store
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+if TYPE_CHECKING:
+    import requests
+    from enrichment import ListingEnricher
+    from near_duplicates import NearDuplicateIndex
+    from parse_pool import ParsePool
+    from response_cache import CachedResponse, ResponseCache
+
+# requests, lxml and BeautifulSoup are imported where they are first used, keeping cold starts cheap
 logger = logging.getLogger(__name__)
 
+# Markup that changes on every response without the listings changing
+_VOLATILE_MARKUP = re.compile(r'<script\b.*?</script>|<style\b.*?</style>|\snonce="[^"]*"', re.DOTALL | re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
 
 class ParariusScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
+    def __init__(self, base_url: Optional[str] = None, response_cache: Optional['ResponseCache'] = None):
+        # Search URLs and relative listing links are resolved against this host
+        self.base_url = (base_url or PARARIUS_BASE_URL).rstrip('/')
+        # Optional disk cache of page bodies shared across runs (see response_cache.py)
+        self.response_cache = response_cache
+        
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        
+        # Size the connection pool so concurrent page fetches reuse connections
+        adapter = HTTPAdapter(pool_maxsize=max(MAX_CONCURRENT_REQUESTS, 1))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        
+        # Shared by every search and page worker: global request cap, per-host rate limit,
+        # retries with backoff and per-host circuit breakers
+        self.fetcher = Fetcher(
+            session,
+            HostRateLimiter(HOST_RATE_LIMIT, HOST_RATE_BURST),
+            max_concurrent=MAX_CONCURRENT_REQUESTS,
+            max_retries=FETCH_MAX_RETRIES,
+            backoff_base=FETCH_BACKOFF_BASE,
+            backoff_cap=FETCH_BACKOFF_CAP,
+            max_retry_after=FETCH_MAX_RETRY_AFTER,
+            breaker_threshold=BREAKER_FAILURE_THRESHOLD,
+            breaker_reset=BREAKER_RESET_SECONDS
+        )
+        # Outcome of the most recent fetch of every URL
+        self.fetch_results: Dict[str, FetchResult] = {}
+        self.searches = load_searches()
+        
+        # Per-URL validators, body digest and parsed listings from the last successful fetch
+        self.page_cache: Dict[str, Dict] = {}
+        self._seen_store: Optional[SeenListingStore] = None
+        self.history: Optional[ListingHistory] = None
+        if HISTORY_ENABLED:
+            self.history = ListingHistory(HISTORY_DIR)
+        # Detail-page enrichment of new listings, set up on first use when enabled
+        self.details_enabled = DETAILS_ENABLED
+        self._enricher: Optional['ListingEnricher'] = None
+        # Index of new listings' fingerprints for spotting relistings and cross-agency duplicates
+        self.duplicate_detection = DUPLICATE_DETECTION
+        self.duplicate_action = DUPLICATE_ACTION
+        self.duplicate_online_seconds = DUPLICATE_ONLINE_SECONDS
+        self._duplicate_index: Optional['NearDuplicateIndex'] = None
+        
+        # Precompiled lxml/XPath parser, built on the first parse; BeautifulSoup remains the fallback
+        self._fast_parser = None
+        self._fast_parser_loaded = PARSER_ENGINE != 'lxml'
+        # Worker processes parsing the changed pages of a crawl as one batch (see parse_pool.py)
+        self.parse_pool: Optional['ParsePool'] = None
+        if PARSE_WORKERS > 0:
+            from parse_pool import ParsePool
+            self.parse_pool = ParsePool(PARSE_WORKERS, PARSE_POOL_MIN_BYTES, PARSE_BATCH_BYTES)
+    
+    @property
+    def fast_parser(self):
+        if not self._fast_parser_loaded:
+            self._fast_parser_loaded = True
+            try:
+                from lxml_parser import LxmlListingParser
+                self._fast_parser = LxmlListingParser()
+            except ImportError:
+                logger.warning("lxml parser unavailable, falling back to BeautifulSoup")
+        return self._fast_parser
+    
+    @fast_parser.setter
+    def fast_parser(self, parser):
+        self._fast_parser = parser
+        self._fast_parser_loaded = True
+    
+    @property
+    def session(self) -> 'requests.Session':
+        return self.fetcher.session
+    
+    @session.setter
+    def session(self, session: 'requests.Session'):
+        self.fetcher.session = session
+    
+    @property
+    def rate_limiter(self) -> HostRateLimiter:
+        return self.fetcher.rate_limiter
+    
+    @rate_limiter.setter
+    def rate_limiter(self, rate_limiter: HostRateLimiter):
+        self.fetcher.rate_limiter = rate_limiter
+    
+    def fetch(self, url: str, headers: Optional[Dict] = None) -> FetchResult:
+        """Fetch a URL through the resilient fetch layer and remember the outcome."""
+        logger.info(f"Fetching page: {url}")
+        result = self.fetcher.fetch(url, headers)
+        self.fetch_results[url] = result
+        self._record_fetch(result)
+        return result
+    
+    def _record_fetch(self, result: FetchResult):
+        FETCH_SECONDS.observe(result.elapsed, outcome=result.outcome)
+        if result.outcome == FETCH_OK:
+            FETCH_BYTES.inc(len(result.response.content))
+    
+    def fetch_detail_page(self, url: str) -> Optional[str]:
+        """Fetch a listing detail page; unlike search pages its outcome is not kept in fetch_results."""
+        stored = self._cached_response(url)
+        if stored is not None and stored.fresh:
+            RESPONSE_CACHE_LOOKUPS.inc(result='fresh')
+            return stored.text
+        result = self.fetcher.fetch(url)
+        self._record_fetch(result)
+        if result.outcome != FETCH_OK:
+            logger.error(f"Error fetching detail page {url}: {result.outcome} ({result.error})")
+            return None
+        if self.response_cache is not None:
+            RESPONSE_CACHE_LOOKUPS.inc(result='miss')
+        self._store_response(url, result.response.content, result.response.headers.get('ETag'),
+                             result.response.headers.get('Last-Modified'))
+        return result.response.text
     
     def fetch_page(self, url: str) -> Optional[str]:
         """Fetch the webpage content."""
+        result = self.fetch(url)
+        if result.outcome != FETCH_OK:
+            logger.error(f"Error fetching page {url}: {result.outcome} ({result.error})")
+            return None
+        return result.response.text
+    
+    def body_digest(self, html_content: str) -> str:
+        """Digest of the page body with scripts, nonces and whitespace normalized away."""
+        normalized = _WHITESPACE.sub(' ', _VOLATILE_MARKUP.sub('', html_content)).strip()
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    
+    def fetch_page_if_changed(self, url: str) -> Tuple[Optional[str], bool]:
+        """Fetch a page with a conditional GET.
+        
+        Returns (html_content, True) when the page changed since the last fetch,
+        and (None, False) when the server answered 304, the body digest matched
+        or the request failed; fetch_results[url] tells these apart. With a
+        response cache, a fresh cached copy is used without a request, and a
+        stale one supplies validators and the body for a 304.
+        """
+        cached = self.page_cache.get(url)
+        stored = self._cached_response(url)
+        if stored is not None and stored.fresh:
+            RESPONSE_CACHE_LOOKUPS.inc(result='fresh')
+            logger.info(f"Using cached response for {url} ({stored.age:.0f}s old)")
+            html_content, etag, last_modified = stored.text, stored.etag, stored.last_modified
+        else:
+            headers = {}
+            validators = cached or (stored and {'etag': stored.etag, 'last_modified': stored.last_modified})
+            if validators:
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
+            
+            result = self.fetch(url, headers)
+            if result.outcome == FETCH_NOT_MODIFIED and (cached or stored):
+                if stored is not None:
+                    RESPONSE_CACHE_LOOKUPS.inc(result='revalidated')
+                    self._touch_cached_response(url)
+                if cached:
+                    logger.info(f"Page not modified: {url}")
+                    return None, False
+                # Not parsed in this process yet: the cached body is the current page
+                html_content, etag, last_modified = stored.text, stored.etag, stored.last_modified
+            elif result.outcome != FETCH_OK:
+                # Throttled, failing or paused host: keep the last parse rather than report an empty page
+                logger.error(f"Error fetching page {url}: {result.outcome} ({result.error})")
+                return None, False
+            else:
+                if self.response_cache is not None:
+                    RESPONSE_CACHE_LOOKUPS.inc(result='miss')
+                response = result.response
+                html_content = response.text
+                etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+                self._store_response(url, response.content, etag, last_modified)
+        
+        digest = self.body_digest(html_content)
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'digest': digest,
+        }
+        if cached and cached['digest'] == digest:
+            logger.info(f"Page content unchanged: {url}")
+            cached.update(entry)
+            return None, False
+        
+        if cached:
+            entry.update({key: cached[key] for key in ('listings', 'page_count') if key in cached})
+        self.page_cache[url] = entry
+        return html_content, True
+    
+    def _cached_response(self, url: str) -> Optional['CachedResponse']:
+        if self.response_cache is None:
+            return None
         try:
-            logger.info(f"Fetching page: {url}")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            logger.error(f"Error fetching page: {e}")
+            return self.response_cache.get(url)
+        except Exception as e:
+            logger.error(f"Error reading response cache for {url}: {e}")
             return None
     
-    def parse_listings(self, html_content: str) -> List[Dict]:
+    def _store_response(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        if self.response_cache is None:
+            return
+        try:
+            with PERSIST_SECONDS.time(store='response_cache'):
+                self.response_cache.put(url, body, etag, last_modified)
+        except Exception as e:
+            logger.error(f"Error writing response cache for {url}: {e}")
+    
+    def _touch_cached_response(self, url: str):
+        try:
+            self.response_cache.touch(url)
+        except Exception as e:
+            logger.error(f"Error updating response cache for {url}: {e}")
+    
+    def parse_listings(self, html_content: str) -> List[Listing]:
         """Parse apartment listings from the HTML content."""
+        with PARSE_SECONDS.time():
+            if self.fast_parser:
+                listings = [self._make_listing(*fields) for fields in self.fast_parser.parse_fields(html_content)]
+            else:
+                listings = self._parse_listings_soup(html_content)
+        LISTINGS_PARSED.inc(len(listings))
+        
+        logger.info(f"Found {len(listings)} listings")
+        return listings
+    
+    def parse_pages(self, pages: List[str]) -> List[List[Listing]]:
+        """Parse several result pages, in the parse pool when the batch is big enough to gain from it."""
+        pool = self.parse_pool
+        if pool is not None and len(pages) > 1 and self.fast_parser:
+            encoded = [page.encode('utf-8') for page in pages]
+            if pool.worthwhile(encoded):
+                try:
+                    with PARSE_BATCH_SECONDS.time():
+                        fields = pool.parse_fields(encoded)
+                        parsed = [[self._make_listing(*item) for item in page_fields] for page_fields in fields]
+                except Exception:
+                    # The pool has logged the failure and switched itself off
+                    pass
+                else:
+                    count = sum(len(listings) for listings in parsed)
+                    LISTINGS_PARSED.inc(count)
+                    logger.info(f"Found {count} listings on {len(pages)} page(s) in the parse pool")
+                    return parsed
+        return [self.parse_listings(page) for page in pages]
+    
+    def _parse_listings_soup(self, html_content: str) -> List[Listing]:
+        """Parse listings with BeautifulSoup (fallback path)."""
+        from bs4 import BeautifulSoup
         listings = []
         soup = BeautifulSoup(html_content, 'lxml')
         
@@ -45,10 +308,9 @@ class ParariusScraper:
                 logger.error(f"Error parsing listing: {e}")
                 continue
         
-        logger.info(f"Found {len(listings)} listings")
         return listings
     
-    def _extract_listing_data(self, container) -> Optional[Dict]:
+    def _extract_listing_data(self, container) -> Optional[Listing]:
         """Extract data from a single listing container."""
         try:
             # Extract title and link
@@ -58,8 +320,6 @@ class ParariusScraper:
             
             title = title_elem.get_text(strip=True)
             link = title_elem.get('href')
-            if link and not link.startswith('http'):
-                link = f"https://www.pararius.nl{link}"
             
             # Extract price
             price_elem = container.find('div', class_='listing-search-item__price')
@@ -73,85 +333,353 @@ class ParariusScraper:
             details_elem = container.find('div', class_='listing-search-item__details')
             details = details_elem.get_text(strip=True) if details_elem else "Details not available"
             
-            # Create unique identifier
-            listing_id = f"{title}_{location}_{price}".replace(" ", "_").lower()
-            
-            return {
-                'id': listing_id,
-                'title': title,
-                'price': price,
-                'location': location,
-                'details': details,
-                'link': link,
-                'timestamp': time.time()
-            }
+            return self._make_listing(title, link, price, location, details)
             
         except Exception as e:
             logger.error(f"Error extracting listing data: {e}")
             return None
     
-    def get_current_listings(self) -> List[Dict]:
-        """Get current listings from the website."""
-        html_content = self.fetch_page(TARGET_URL)
-        if html_content:
-            return self.parse_listings(html_content)
-        return []
+    def _make_listing(self, title: str, link: Optional[str], price: str, location: str, details: str) -> Listing:
+        """Build a listing record from the extracted fields, parsing its numbers once."""
+        if link and not link.startswith('http'):
+            link = f"{self.base_url}{link}"
+        
+        # The listing number in the URL stays the same when the price or title is edited
+        listing_id = listing_id_from_link(link) or legacy_listing_id(title, location, price)
+        
+        return Listing(listing_id, title, price, location, details, link)
+    
+    def rebase_url(self, url: str) -> str:
+        """Point a search URL at the configured base URL, keeping its path and query."""
+        base = urlparse(self.base_url)
+        parsed = urlparse(url)
+        if (parsed.scheme, parsed.netloc) == (base.scheme, base.netloc):
+            return url
+        return urlunparse(parsed._replace(scheme=base.scheme, netloc=base.netloc, path=base.path.rstrip('/') + parsed.path))
+    
+    def get_page_count(self, html_content: str, url: str) -> int:
+        """Determine the number of result pages from the pagination links."""
+        path = re.escape(urlparse(url).path.rstrip('/'))
+        pages = [int(n) for n in re.findall(path + r'/page-(\d+)', html_content)]
+        return max(pages) if pages else 1
+    
+    def get_page_url(self, url: str, page: int) -> str:
+        """Build the URL of a given result page."""
+        if page <= 1:
+            return url
+        return f"{url.rstrip('/')}/page-{page}"
+    
+    def _fetch_and_parse(self, url: str, first_page: bool = False) -> Tuple[List[Listing], bool]:
+        """Fetch and parse a single result page, reusing the last parse if it is unchanged."""
+        html_content, changed = self.fetch_page_if_changed(url)
+        if not changed:
+            return self.page_cache.get(url, {}).get('listings', []), False
+        
+        try:
+            listings = self.parse_listings(html_content)
+        except Exception:
+            # Without a parse the new digest must not make the next crawl skip this page
+            self.page_cache.pop(url, None)
+            raise
+        self.page_cache[url]['listings'] = listings
+        if first_page:
+            self.page_cache[url]['page_count'] = min(self.get_page_count(html_content, url), MAX_PAGES)
+        return listings, True
+    
+    def crawl(self, url: str = TARGET_URL) -> Tuple[List[Listing], bool]:
+        """Get current listings from all result pages of a search.
+        
+        Returns the merged listings and whether any page changed since the last crawl.
+        """
+        url = self.rebase_url(url)
+        if self.parse_pool is not None:
+            return self._crawl_batched(url)
+        first_page, changed = self._fetch_and_parse(url, first_page=True)
+        if url not in self.page_cache:
+            # First page never fetched successfully, nothing to crawl
+            return [], False
+        
+        pages = [first_page]
+        page_count = self.page_cache[url].get('page_count', 1)
+        
+        if page_count > 1:
+            logger.info(f"Crawling {page_count - 1} additional page(s) with {CRAWL_WORKERS} worker(s)")
+            page_urls = [self.get_page_url(url, page) for page in range(2, page_count + 1)]
+            with ThreadPoolExecutor(max_workers=max(CRAWL_WORKERS, 1)) as executor:
+                # map() preserves page order regardless of completion order
+                for page_listings, page_changed in executor.map(self._fetch_and_parse, page_urls):
+                    pages.append(page_listings)
+                    changed = changed or page_changed
+        
+        return self._merge_pages(pages, page_count), changed
+    
+    def _crawl_batched(self, url: str) -> Tuple[List[Listing], bool]:
+        """crawl() for the parse pool: fetch every page first, then parse the changed ones in one batch."""
+        first_html, changed = self.fetch_page_if_changed(url)
+        if url not in self.page_cache:
+            return [], False
+        if changed:
+            self.page_cache[url]['page_count'] = min(self.get_page_count(first_html, url), MAX_PAGES)
+        page_count = self.page_cache[url].get('page_count', 1)
+        page_urls = [self.get_page_url(url, page) for page in range(1, page_count + 1)]
+        
+        changed_pages = {url: first_html} if changed else {}
+        if page_count > 1:
+            logger.info(f"Crawling {page_count - 1} additional page(s) with {CRAWL_WORKERS} worker(s)")
+            with ThreadPoolExecutor(max_workers=max(CRAWL_WORKERS, 1)) as executor:
+                for page_url, (html_content, page_changed) in zip(
+                        page_urls[1:], executor.map(self.fetch_page_if_changed, page_urls[1:])):
+                    if page_changed:
+                        changed_pages[page_url] = html_content
+        
+        if changed_pages:
+            try:
+                parsed = self.parse_pages(list(changed_pages.values()))
+            except Exception:
+                for page_url in changed_pages:
+                    self.page_cache.pop(page_url, None)
+                raise
+            for page_url, listings in zip(changed_pages, parsed):
+                self.page_cache[page_url]['listings'] = listings
+        pages = [self.page_cache.get(page_url, {}).get('listings', []) for page_url in page_urls]
+        return self._merge_pages(pages, page_count), bool(changed_pages)
+    
+    def _merge_pages(self, pages: List[List[Listing]], page_count: int) -> List[Listing]:
+        """Merge pages in order; a listing can shift pages mid-crawl, keep its first occurrence."""
+        listings = []
+        seen_ids = set()
+        for page_listings in pages:
+            for listing in page_listings:
+                if listing['id'] not in seen_ids:
+                    seen_ids.add(listing['id'])
+                    listings.append(listing)
+        
+        logger.info(f"Found {len(listings)} listings across {page_count} page(s)")
+        return listings
+    
+    def forget_pages(self):
+        """Drop the validators, digests and parses of all crawled pages.
+
+        The next crawl then fetches and parses every page again and reports it
+        changed, so listings a failed cycle never diffed are not skipped as
+        unchanged.
+        """
+        self.page_cache.clear()
+    
+    def get_current_listings(self, url: str = TARGET_URL) -> List[Listing]:
+        """Get current listings from all result pages of a search."""
+        listings, _ = self.crawl(url)
+        return listings
+    
+    @property
+    def seen_store(self) -> SeenListingStore:
+        """The seen-listing store, opened on first use."""
+        if self._seen_store is None:
+            self._seen_store = open_seen_store()
+        return self._seen_store
+    
+    @seen_store.setter
+    def seen_store(self, store: SeenListingStore):
+        self._seen_store = store
+    
+    def close(self):
+        """Write back and close the stores opened so far (seen listings, near-duplicates, detail pages) and stop the parse pool."""
+        if self._seen_store is not None:
+            self._seen_store.close()
+            self._seen_store = None
+        if self._duplicate_index is not None:
+            self._duplicate_index.close()
+            self._duplicate_index = None
+        if self._enricher is not None and self._enricher.cache is not None:
+            self._enricher.cache.close()
+            self._enricher = None
+        if self.parse_pool is not None:
+            self.parse_pool.close()
     
     def load_seen_listings(self) -> set:
-        """Load previously seen listing IDs from file."""
+        """Load previously seen listing IDs from the store."""
         try:
-            with open(LISTINGS_FILE, 'r') as f:
-                data = json.load(f)
-                seen_ids = set(data.get('seen_ids', []))
-                logger.info(f"Successfully loaded {len(seen_ids)} seen listings from {LISTINGS_FILE}")
-                return seen_ids
-        except FileNotFoundError:
-            logger.info(f"No previous listings file found at {LISTINGS_FILE}, starting fresh")
-            return set()
+            seen_ids = self.seen_store.all_ids()
+            logger.info(f"Successfully loaded {len(seen_ids)} seen listings")
+            return seen_ids
         except Exception as e:
-            logger.error(f"Error loading seen listings from {LISTINGS_FILE}: {e}")
+            logger.error(f"Error loading seen listings: {e}")
             return set()
     
     def save_seen_listings(self, seen_ids: set):
-        """Save seen listing IDs to file."""
+        """Record listing IDs as seen in the store."""
         try:
-            data = {'seen_ids': list(seen_ids)}
-            with open(LISTINGS_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Successfully saved {len(seen_ids)} seen listings to {LISTINGS_FILE}")
+            self.seen_store.mark_seen(seen_ids)
+            logger.info(f"Successfully saved {len(seen_ids)} seen listings")
         except Exception as e:
-            logger.error(f"Error saving seen listings to {LISTINGS_FILE}: {e}")
-            # Try to create the file if it doesn't exist
+            logger.error(f"Error saving seen listings: {e}")
+    
+    @property
+    def enricher(self) -> Optional['ListingEnricher']:
+        """The detail-page enricher, created on first use; None when enrichment is off or unavailable."""
+        if self._enricher is None and self.details_enabled:
+            try:
+                from detail_cache import DetailCache
+                from enrichment import ListingEnricher
+                self._enricher = ListingEnricher(
+                    self.fetch_detail_page,
+                    DetailCache(DETAIL_CACHE_FILE, DETAIL_CACHE_MAX_BYTES),
+                    workers=DETAIL_WORKERS
+                )
+            except Exception as e:
+                logger.error(f"Detail-page enrichment unavailable: {e}")
+                self.details_enabled = False
+        return self._enricher
+    
+    @enricher.setter
+    def enricher(self, enricher: Optional['ListingEnricher']):
+        self._enricher = enricher
+    
+    def enrich_listings(self, listings: List[Listing]):
+        """Add detail-page features to new listings when enrichment is enabled."""
+        if not listings or self.enricher is None:
+            return
+        try:
+            enriched = self.enricher.enrich(listings)
+            logger.info(f"Enriched {enriched} of {len(listings)} new listing(s) from their detail pages")
+        except Exception as e:
+            logger.error(f"Error enriching listings: {e}")
+    
+    @property
+    def duplicate_index(self) -> Optional['NearDuplicateIndex']:
+        """The near-duplicate index, opened on first use; None when detection is off or unavailable."""
+        if self._duplicate_index is None and self.duplicate_detection:
             try:
-                os.makedirs(os.path.dirname(LISTINGS_FILE) if os.path.dirname(LISTINGS_FILE) else '.', exist_ok=True)
-                with open(LISTINGS_FILE, 'w') as f:
-                    json.dump(data, f, indent=2)
-                logger.info(f"Successfully created and saved {len(seen_ids)} seen listings to {LISTINGS_FILE}")
-            except Exception as e2:
-                logger.error(f"Failed to create and save seen listings: {e2}")
-    
-    def get_new_listings(self) -> List[Dict]:
-        """Get new listings that haven't been seen before."""
-        current_listings = self.get_current_listings()
-        seen_listings = self.load_seen_listings()
-        
-        logger.info(f"Loaded {len(seen_listings)} previously seen listings")
+                from near_duplicates import NearDuplicateIndex
+                self._duplicate_index = NearDuplicateIndex(DUPLICATE_DB_FILE, DUPLICATE_THRESHOLD)
+            except Exception as e:
+                logger.error(f"Near-duplicate detection unavailable: {e}")
+                self.duplicate_detection = False
+        return self._duplicate_index
+    
+    @duplicate_index.setter
+    def duplicate_index(self, index: Optional['NearDuplicateIndex']):
+        self._duplicate_index = index
+    
+    def check_near_duplicates(self, new_listings: List[Listing], current_listings: List[Listing],
+                              carried_over: Set[str] = frozenset()) -> List[Listing]:
+        """Mark new listings that look like relistings or other agencies' copies of listings already seen.
+        
+        Suspected duplicates get duplicate_of set and stay in the result, unless
+        duplicate_action is 'drop'. An original is still online, and a match
+        another agency's copy, when it is among the current listings or any
+        search saw it within duplicate_online_seconds; searches scheduled on
+        their own only pass their own listings. carried_over are IDs of current listings seen before under their
+        legacy ID; they were never indexed, so they are added first for their copies to be recognized.
+        """
+        if not (new_listings or carried_over) or self.duplicate_index is None:
+            return new_listings
+        try:
+            with PERSIST_SECONDS.time(store='duplicates'):
+                if carried_over:
+                    self.duplicate_index.add([listing for listing in current_listings if listing['id'] in carried_over])
+                matches = self.duplicate_index.check(new_listings)
+                current = {listing['id']: listing['link'] for listing in current_listings}
+                online = self._still_online({original for original, _ in matches.values()} - set(current))
+                links = self.duplicate_index.links(online)
+        except Exception as e:
+            logger.error(f"Error checking for near-duplicate listings: {e}")
+            return new_listings
+        
+        links.update(current)
+        online.update(current)
+        kept = []
+        for listing in new_listings:
+            match = matches.get(listing['id'])
+            if match is None:
+                kept.append(listing)
+                continue
+            original, score = match
+            # Still online next to it: another agency's copy; gone: the same flat posted again
+            kind = 'duplicate' if original in online else 'relisting'
+            DUPLICATE_LISTINGS.inc(kind=kind)
+            if self.duplicate_action == 'drop':
+                logger.info(f"Skipping {listing['id']}: {kind} of {original} (similarity {score:.2f})")
+                continue
+            logger.info(f"Flagging {listing['id']}: possible {kind} of {original} (similarity {score:.2f})")
+            listing.duplicate_of = {'id': original, 'kind': kind, 'similarity': round(score, 2)}
+            if kind == 'duplicate' and links.get(original):
+                listing.duplicate_of['link'] = links[original]
+            kept.append(listing)
+        return kept
+    
+    def _still_online(self, listing_ids: Set[str]) -> Set[str]:
+        """Which of the listings any search saw within duplicate_online_seconds."""
+        if not listing_ids:
+            return set()
+        since = time.time() - self.duplicate_online_seconds
+        return {listing_id for listing_id, seen in self.seen_store.last_seen(listing_ids).items() if seen >= since}
+    
+    def _seen_under_legacy_ids(self, listings: List[Listing], new_ids: Set[str]) -> Set[str]:
+        """New IDs of listings the store already knows by the ID they had before IDs came from URLs."""
+        by_legacy_id: Dict[str, List[str]] = {}
+        for listing in listings:
+            if listing['id'] in new_ids and listing.legacy_id != listing['id']:
+                by_legacy_id.setdefault(listing.legacy_id, []).append(listing['id'])
+        if not by_legacy_id:
+            return set()
+        known = self.seen_store.known_ids(by_legacy_id)
+        return {listing_id for legacy_id in known for listing_id in by_legacy_id[legacy_id]}
+    
+    def record_history(self, listings: List[Listing]):
+        """Append this cycle's snapshot of every current listing to the history store."""
+        if self.history is None or not listings:
+            return
+        try:
+            with PERSIST_SECONDS.time(store='history'):
+                self.history.record(listings)
+        except Exception as e:
+            logger.error(f"Error recording listing history: {e}")
+    
+    def touch_seen(self, listings: List[Listing]):
+        """Keep listings of unchanged pages from expiring in the seen store; they are still online."""
+        if not listings:
+            return
+        try:
+            with PERSIST_SECONDS.time(store='seen'):
+                self.seen_store.touch(listing['id'] for listing in listings)
+        except Exception as e:
+            logger.error(f"Error refreshing seen listings: {e}")
+    
+    def get_new_listings(self, searches: Optional[List[Search]] = None) -> List[Listing]:
+        """Get new listings that haven't been seen before, across all searches or the given ones."""
+        current_listings, changed = SearchFanOut(self, searches or self.searches).run()
+        self.record_history(current_listings)
+        if not changed:
+            # 304s, identical bodies or failed fetches: nothing new to diff against
+            logger.info("Search results unchanged since last check, skipping comparison")
+            self.touch_seen(current_listings)
+            return []
+        
         logger.info(f"Found {len(current_listings)} current listings")
         
-        new_listings = []
-        current_ids = set()
+        # Inserts unseen IDs and refreshes last_seen for the rest in one transaction
+        try:
+            with PERSIST_SECONDS.time(store='seen'):
+                new_ids = self.seen_store.mark_seen(listing['id'] for listing in current_listings)
+                # Stores written before IDs came from URLs hold the old IDs; don't re-announce those listings
+                carried_over = self._seen_under_legacy_ids(current_listings, new_ids)
+                new_ids -= carried_over
+        except Exception as e:
+            logger.error(f"Error updating seen listings, rechecking all pages next cycle: {e}")
+            self.forget_pages()
+            return []
         
+        new_listings = []
         for listing in current_listings:
-            current_ids.add(listing['id'])
-            if listing['id'] not in seen_listings:
+            if listing['id'] in new_ids:
                 new_listings.append(listing)
                 logger.info(f"New listing found: {listing['id']}")
             else:
                 logger.debug(f"Listing already seen: {listing['id']}")
         
-        # Update seen listings with current ones
-        self.save_seen_listings(current_ids)
-        logger.info(f"Updated seen_listings.json with {len(current_ids)} listings")
-        
+        new_listings = self.check_near_duplicates(new_listings, current_listings, carried_over)
+        self.enrich_listings(new_listings)
+        NEW_LISTINGS.inc(len(new_listings))
         logger.info(f"Found {len(new_listings)} new listings")
-        return new_listings 
\ No newline at end of file
+        return new_listings
@@ -0,0 +1,89 @@
+"""
+Search definitions and the fan-out executor that crawls all of them in one cycle.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from listing import Listing
+from metrics import SEARCH_LISTINGS
+from config import SEARCHES_FILE, SEARCH_WORKERS, TARGET_URL
+
+logger = logging.getLogger(__name__)
+
+
+class Search:
+    """A named Pararius search results URL."""
+
+    __slots__ = ('name', 'url')
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+
+    def __repr__(self):
+        return f"Search({self.name!r}, {self.url!r})"
+
+
+def load_searches(path: str = SEARCHES_FILE) -> List[Search]:
+    """Load search definitions, falling back to the single TARGET_URL search."""
+    if not os.path.exists(path):
+        return [Search('default', TARGET_URL)]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+
+    searches = []
+    seen_urls = set()
+    for index, definition in enumerate(definitions):
+        url = definition['url'].rstrip('/')
+        if url in seen_urls:
+            logger.warning(f"Skipping duplicate search URL in {path}: {url}")
+            continue
+        seen_urls.add(url)
+        searches.append(Search(definition.get('name', f"search-{index + 1}"), url))
+
+    logger.info(f"Loaded {len(searches)} search(es) from {path}")
+    return searches
+
+
+class SearchFanOut:
+    """Crawls every search on the scraper's shared session and merges the results.
+
+    Searches run concurrently up to `workers`; the scraper itself enforces the
+    global request cap and per-host rate limit, so adding searches adds work to
+    the same connection pool instead of opening new ones.
+    """
+
+    def __init__(self, scraper, searches: List[Search], workers: int = SEARCH_WORKERS):
+        self.scraper = scraper
+        self.searches = searches
+        self.workers = max(1, min(workers, len(searches)))
+
+    def run(self) -> Tuple[List[Listing], bool]:
+        """Crawl all searches.
+
+        Returns the listings deduplicated across searches, in search order, and
+        whether any search's results changed since the last run.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(lambda search: self.scraper.crawl(search.url), self.searches))
+
+        merged: Dict[str, Listing] = {}
+        changed = False
+        for search, (listings, search_changed) in zip(self.searches, results):
+            changed = changed or search_changed
+            # A search that suddenly finds nothing usually means blocking or a markup change
+            SEARCH_LISTINGS.set(len(listings), search=search.name)
+            for listing in listings:
+                existing = merged.get(listing.id)
+                if existing is None:
+                    # Copy so the scraper's cached parse is not modified
+                    merged[listing.id] = listing.with_searches([search.name])
+                elif search.name not in existing.searches:
+                    existing.searches.append(search.name)
+
+        logger.info(f"Found {len(merged)} unique listings across {len(self.searches)} search(es)")
+        return list(merged.values()), changed
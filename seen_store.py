@@ -0,0 +1,557 @@
+"""
+Seen-listing stores.
+
+The scraper only needs two operations from its store: record the listings seen
+in this cycle and learn which of them were never seen before. SQLiteSeenStore is
+the default backend; JsonSeenStore keeps the original seen_listings.json format.
+In continuous mode WriteBehindSeenStore answers from memory (recent IDs and a
+Bloom filter) and writes changes back from a background thread. Listings not
+seen for SEEN_TTL_DAYS are forgotten, so none of them grow without limit.
+"""
+
+import abc
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from bloom import WindowedBloomFilter
+from config import SEEN_STORE_BACKEND, SEEN_DB_FILE, SEEN_TTL_DAYS, LISTINGS_FILE
+from metrics import PERSIST_SECONDS, SEEN_INDEX_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLite's host parameter limit
+_BATCH_SIZE = 500
+# How often continuous mode forgets listings older than the TTL
+_EXPIRE_EVERY = 3600
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write a temporary file and rename it over the old one, so a crash never leaves a truncated file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class SeenListingStore(abc.ABC):
+    """Interface shared by the seen-listing backends."""
+
+    @abc.abstractmethod
+    def mark_seen(self, listing_ids: Iterable[str], now: Optional[float] = None) -> Set[str]:
+        """Record listing IDs as seen and return the ones that were not seen before."""
+
+    @abc.abstractmethod
+    def all_ids(self) -> Set[str]:
+        """Return every listing ID in the store."""
+
+    def touch(self, listing_ids: Iterable[str], now: Optional[float] = None):
+        """Move last_seen up for the given listings the store already knows, without recording new ones.
+
+        For cycles whose pages did not change: the listings are still online and
+        must not expire. Stores that keep no times ignore it.
+        """
+
+    def known_ids(self, listing_ids: Iterable[str]) -> Set[str]:
+        """Return which of the given IDs are in the store, without recording anything."""
+        return set(listing_ids) & self.all_ids()
+
+    def count(self) -> int:
+        """Return the number of listing IDs in the store."""
+        return len(self.all_ids())
+
+    def last_seen(self, listing_ids: Iterable[str]) -> Dict[str, float]:
+        """Return when each of the given listings the store knows was last seen.
+
+        Stores that keep no times return nothing.
+        """
+        return {}
+
+    def seen_since(self, since: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Return (ID, last seen) for the listings last seen at or after `since`, or for all of them.
+
+        Stores that keep no times report every listing as seen now.
+        """
+        now = time.time()
+        return [(listing_id, now) for listing_id in self.all_ids()]
+
+    def expire(self, before: float) -> int:
+        """Forget listings last seen before `before` and return how many; stores without times keep everything."""
+        return 0
+
+    def close(self):
+        """Release any resources held by the store."""
+
+
+class SQLiteSeenStore(SeenListingStore):
+    """Seen listings in SQLite, one row per listing with first/last seen times.
+
+    WAL mode lets readers continue while a writer commits, and each cycle runs in
+    a single IMMEDIATE transaction so overlapping runs never both claim a listing
+    as new.
+    """
+
+    def __init__(self, path: str = SEEN_DB_FILE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        import sqlite3
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_listings (
+                id TEXT PRIMARY KEY,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_listings_last_seen ON seen_listings (last_seen)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _existing_ids(self, listing_ids: List[str]) -> Set[str]:
+        """Look up which of the given IDs already have a row."""
+        existing = set()
+        for start in range(0, len(listing_ids), _BATCH_SIZE):
+            batch = listing_ids[start:start + _BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(f"SELECT id FROM seen_listings WHERE id IN ({placeholders})", batch)
+            existing.update(row[0] for row in rows)
+        return existing
+
+    def mark_seen(self, listing_ids: Iterable[str], now: Optional[float] = None) -> Set[str]:
+        listing_ids = list(dict.fromkeys(listing_ids))
+        if not listing_ids:
+            return set()
+        now = time.time() if now is None else now
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._existing_ids(listing_ids)
+                new_ids = [listing_id for listing_id in listing_ids if listing_id not in existing]
+                self.conn.executemany(
+                    "INSERT INTO seen_listings (id, first_seen, last_seen) VALUES (?, ?, ?)",
+                    ((listing_id, now, now) for listing_id in new_ids)
+                )
+                self.conn.executemany(
+                    "UPDATE seen_listings SET last_seen = ? WHERE id = ?",
+                    ((now, listing_id) for listing_id in existing)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return set(new_ids)
+
+    def touch(self, listing_ids: Iterable[str], now: Optional[float] = None):
+        listing_ids = list(dict.fromkeys(listing_ids))
+        if not listing_ids:
+            return
+        now = time.time() if now is None else now
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "UPDATE seen_listings SET last_seen = MAX(last_seen, ?) WHERE id = ?",
+                    ((now, listing_id) for listing_id in listing_ids)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def known_ids(self, listing_ids: Iterable[str]) -> Set[str]:
+        with self._lock:
+            return self._existing_ids(list(dict.fromkeys(listing_ids)))
+
+    def all_ids(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT id FROM seen_listings")}
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM seen_listings").fetchone()[0]
+
+    def last_seen(self, listing_ids: Iterable[str]) -> Dict[str, float]:
+        listing_ids = list(dict.fromkeys(listing_ids))
+        seen = {}
+        with self._lock:
+            for start in range(0, len(listing_ids), _BATCH_SIZE):
+                batch = listing_ids[start:start + _BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                seen.update(self.conn.execute(
+                    f"SELECT id, last_seen FROM seen_listings WHERE id IN ({placeholders})", batch))
+        return seen
+
+    def seen_since(self, since: Optional[float] = None) -> List[Tuple[str, float]]:
+        with self._lock:
+            if since is None:
+                return self.conn.execute("SELECT id, last_seen FROM seen_listings").fetchall()
+            return self.conn.execute("SELECT id, last_seen FROM seen_listings WHERE last_seen >= ?", (since,)).fetchall()
+
+    def expire(self, before: float) -> int:
+        with self._lock:
+            removed = self.conn.execute("DELETE FROM seen_listings WHERE last_seen < ?", (before,)).rowcount
+        if removed:
+            logger.info(f"Forgot {removed} listing(s) not seen since {time.strftime('%Y-%m-%d', time.localtime(before))}")
+        return removed
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class JsonSeenStore(SeenListingStore):
+    """Seen listing IDs in the original seen_listings.json format."""
+
+    def __init__(self, path: str = LISTINGS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> Set[str]:
+        try:
+            with open(self.path, 'r') as f:
+                return set(json.load(f).get('seen_ids', []))
+        except FileNotFoundError:
+            return set()
+
+    def _save(self, seen_ids: Set[str]):
+        _write_atomic(self.path, json.dumps({'seen_ids': list(seen_ids)}, indent=2).encode('utf-8'))
+
+    def mark_seen(self, listing_ids: Iterable[str], now: Optional[float] = None) -> Set[str]:
+        with self._lock:
+            seen_ids = self._load()
+            new_ids = set(listing_ids) - seen_ids
+            if new_ids:
+                self._save(seen_ids | new_ids)
+        return new_ids
+
+    def all_ids(self) -> Set[str]:
+        with self._lock:
+            return self._load()
+
+
+class WriteBehindSeenStore(SeenListingStore):
+    """A memory-bounded seen index in front of another store, written back in the background.
+
+    Memory holds the exact IDs seen within the last `recent` seconds, which
+    covers every listing still online, and a windowed Bloom filter of
+    everything seen within `ttl`. A listing in the recent set is seen, and one
+    the filter has never heard of is new, without asking the backing store;
+    only listings the filter knows that were not seen recently (back online
+    after a while, or a false positive) are looked up there. Neither part
+    grows with the total history, only with the listings seen within their
+    window.
+
+    A daemon thread writes the changes to the backing store every `interval`
+    seconds and then saves the filter to `bloom_path`, so a restart loads the
+    filter and only the rows written after it instead of every ID. Once an hour
+    it also forgets listings not seen for `ttl` seconds. flush()/close() write
+    whatever is left, e.g. on shutdown. A long-running agent is assumed to be
+    the only writer: listings another process records after startup are not
+    seen here.
+    """
+
+    def __init__(self, store: SeenListingStore, interval: float = 30.0, ttl: float = 0.0,
+                 bloom_path: Optional[str] = None, error_rate: float = 0.001, recent: float = 86400.0):
+        self.store = store
+        self.interval = interval
+        self.ttl = ttl
+        self.bloom_path = bloom_path
+        self.error_rate = error_rate
+        self.recent = recent
+        self._lock = threading.Lock()
+        # Serializes writes to the backing store and the filter file between the thread and flush()
+        self._flush_lock = threading.Lock()
+        self._bloom: Optional[WindowedBloomFilter] = None
+        self._bloom_changed = False
+        # Listing ID -> time it was last seen, for the listings seen within `recent`
+        self._recent: Dict[str, float] = {}
+        # Latest sighting recorded; saved with the filter as the point it is complete up to
+        self._latest = 0.0
+        # Listing ID -> time it was last seen, for everything not yet written back,
+        # and first seen for the IDs among those that are new to the backing store
+        self._dirty: Dict[str, float] = {}
+        self._first_seen: Dict[str, float] = {}
+        self._expired_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_filter(self) -> Optional[WindowedBloomFilter]:
+        if not self.bloom_path or not os.path.exists(self.bloom_path):
+            return None
+        try:
+            bloom = WindowedBloomFilter.load(self.bloom_path)
+        except Exception as e:
+            logger.warning(f"Rebuilding the seen filter, could not load {self.bloom_path}: {e}")
+            return None
+        if not bloom.compatible(WindowedBloomFilter(self.ttl, self.error_rate)):
+            logger.info(f"Rebuilding the seen filter, {self.bloom_path} was built with other settings")
+            return None
+        return bloom
+
+    def _hydrate(self):
+        """Load the filter and the recent IDs on first use; the caller holds the lock."""
+        if self._bloom is not None:
+            return
+        now = time.time()
+        bloom = self._load_filter()
+        if bloom is None:
+            bloom, since = WindowedBloomFilter(self.ttl, self.error_rate), None
+        else:
+            since = bloom.synced
+        # Everything when rebuilding, otherwise the rows written after the filter was saved
+        loaded = 0
+        for listing_id, seen in self.store.seen_since(since):
+            bloom.add(listing_id, seen)
+            self._latest = max(self._latest, seen)
+            loaded += 1
+        bloom.expire(now)
+        self._latest = max(self._latest, bloom.synced or 0.0)
+        self._recent = dict(self.store.seen_since(now - self.recent))
+        self._bloom = bloom
+        self._bloom_changed = loaded > 0
+        logger.info(f"Seen index: {len(bloom)} listing(s) in the filter ({bloom.nbytes / 1024:.0f} KiB, "
+                    f"{loaded} loaded from the store), {len(self._recent)} seen in the last {self.recent / 3600:.0f}h")
+
+    def start(self) -> 'WriteBehindSeenStore':
+        """Load the index and start the write-behind thread."""
+        with self._lock:
+            self._hydrate()
+        self._expired_at = time.monotonic()
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='seen-write-behind', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+            if time.monotonic() - self._expired_at >= _EXPIRE_EVERY:
+                self._expired_at = time.monotonic()
+                try:
+                    self.expire()
+                except Exception as e:
+                    logger.error(f"Error expiring seen listings: {e}")
+
+    def _lookup(self, listing_ids: List[str]) -> Set[str]:
+        """Which of the IDs were seen before; the caller holds the lock."""
+        self._hydrate()
+        known = set()
+        maybe = []
+        for listing_id in listing_ids:
+            if listing_id in self._recent or listing_id in self._dirty:
+                known.add(listing_id)
+            elif listing_id in self._bloom:
+                maybe.append(listing_id)
+        memory_hits = len(known)
+        if maybe:
+            # Back after a while, or a false positive: the store has the exact answer
+            known.update(self.store.known_ids(maybe))
+        SEEN_INDEX_LOOKUPS.inc(memory_hits, source='memory')
+        SEEN_INDEX_LOOKUPS.inc(len(listing_ids) - memory_hits - len(maybe), source='filter')
+        SEEN_INDEX_LOOKUPS.inc(len(maybe), source='store')
+        return known
+
+    def mark_seen(self, listing_ids: Iterable[str], now: Optional[float] = None) -> Set[str]:
+        listing_ids = list(dict.fromkeys(listing_ids))
+        now = time.time() if now is None else now
+        with self._lock:
+            known = self._lookup(listing_ids)
+            new_ids = {listing_id for listing_id in listing_ids if listing_id not in known}
+            for listing_id in listing_ids:
+                self._recent[listing_id] = now
+                self._dirty[listing_id] = now
+                # Added again while it stays online, so it lives on in the newest window
+                if self._bloom.add(listing_id, now):
+                    self._bloom_changed = True
+            self._first_seen.update((listing_id, now) for listing_id in new_ids)
+            self._latest = max(self._latest, now)
+        return new_ids
+
+    def touch(self, listing_ids: Iterable[str], now: Optional[float] = None):
+        listing_ids = list(dict.fromkeys(listing_ids))
+        now = time.time() if now is None else now
+        with self._lock:
+            # Kept in memory and written back like any sighting, but never for a listing not seen before
+            for listing_id in self._lookup(listing_ids):
+                self._recent[listing_id] = now
+                self._dirty[listing_id] = now
+                if self._bloom.add(listing_id, now):
+                    self._bloom_changed = True
+            self._latest = max(self._latest, now)
+
+    def known_ids(self, listing_ids: Iterable[str]) -> Set[str]:
+        with self._lock:
+            return self._lookup(list(dict.fromkeys(listing_ids)))
+
+    def all_ids(self) -> Set[str]:
+        self.flush()
+        return self.store.all_ids()
+
+    def count(self) -> int:
+        self.flush()
+        return self.store.count()
+
+    def last_seen(self, listing_ids: Iterable[str]) -> Dict[str, float]:
+        listing_ids = list(dict.fromkeys(listing_ids))
+        with self._lock:
+            seen = {listing_id: self._dirty.get(listing_id) or self._recent[listing_id]
+                    for listing_id in listing_ids if listing_id in self._dirty or listing_id in self._recent}
+        rest = [listing_id for listing_id in listing_ids if listing_id not in seen]
+        if rest:
+            seen.update(self.store.last_seen(rest))
+        return seen
+
+    @property
+    def pending(self) -> int:
+        """Listings changed in memory and not yet written back."""
+        with self._lock:
+            return len(self._dirty)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the Bloom filter's bit arrays."""
+        return self._bloom.nbytes if self._bloom is not None else 0
+
+    def flush(self) -> int:
+        """Write pending changes to the backing store, then save the filter; returns how many listings were written.
+
+        Changes that fail to write stay pending and are tried again on the next flush.
+        """
+        with self._flush_lock:
+            written = self._write_back()
+            self._save_filter()
+            return written
+
+    def _write_back(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            first_seen, self._first_seen = self._first_seen, {}
+        if not dirty:
+            return 0
+        try:
+            with PERSIST_SECONDS.time(store='seen_flush'):
+                # The backing stores take one timestamp per call: insert new listings as of their
+                # first sighting, then move every listing's last_seen up to its latest one
+                for times in (first_seen, dirty):
+                    by_time: Dict[float, List[str]] = {}
+                    for listing_id, seen in times.items():
+                        by_time.setdefault(seen, []).append(listing_id)
+                    for seen in sorted(by_time):
+                        self.store.mark_seen(by_time[seen], now=seen)
+        except Exception as e:
+            logger.error(f"Error writing back seen listings, will retry: {e}")
+            with self._lock:
+                # Anything recorded since the swap is newer and wins
+                self._dirty = {**dirty, **self._dirty}
+                self._first_seen = {**first_seen, **self._first_seen}
+            return 0
+        logger.debug(f"Wrote {len(dirty)} seen listing(s) back to the store")
+        return len(dirty)
+
+    def _save_filter(self):
+        """Save the filter when it changed; the caller holds the flush lock."""
+        if not self.bloom_path:
+            return
+        with self._lock:
+            if self._bloom is None or not self._bloom_changed:
+                return
+            self._bloom.synced = self._latest
+            data = self._bloom.to_bytes()
+            self._bloom_changed = False
+        try:
+            with PERSIST_SECONDS.time(store='seen_filter'):
+                _write_atomic(self.bloom_path, data)
+        except Exception as e:
+            logger.error(f"Error saving the seen filter to {self.bloom_path}: {e}")
+            with self._lock:
+                self._bloom_changed = True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Forget listings not seen for ttl seconds, in the store and the filter, and prune the recent IDs.
+
+        Returns the number of listings removed from the store.
+        """
+        now = time.time() if now is None else now
+        self.flush()
+        removed = self.store.expire(now - self.ttl) if self.ttl > 0 else 0
+        with self._lock:
+            if self._bloom is not None and self._bloom.expire(now):
+                self._bloom_changed = True
+            cutoff = now - self.recent
+            self._recent = {listing_id: seen for listing_id, seen in self._recent.items() if seen >= cutoff}
+        with self._flush_lock:
+            self._save_filter()
+        return removed
+
+    def close(self):
+        """Stop the write-behind thread, write pending changes and the filter, and close the backing store."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.interval, 1) + 30)
+            self._thread = None
+        self.flush()
+        self.store.close()
+
+
+def migrate_json_seen_listings(store: SQLiteSeenStore, json_path: str = LISTINGS_FILE) -> int:
+    """Import IDs from a legacy seen_listings.json into the SQLite store, once.
+
+    Returns the number of IDs imported.
+    """
+    if store.get_meta('json_migrated') or not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, 'r') as f:
+            seen_ids = json.load(f).get('seen_ids', [])
+    except Exception as e:
+        logger.error(f"Error reading {json_path} for migration: {e}")
+        return 0
+
+    imported = store.mark_seen(seen_ids, now=os.path.getmtime(json_path))
+    store.set_meta('json_migrated', json_path)
+    logger.info(f"Migrated {len(imported)} seen listings from {json_path} to {store.path}")
+    return len(imported)
+
+
+def open_seen_store(backend: str = SEEN_STORE_BACKEND) -> SeenListingStore:
+    """Open the configured seen-listing store."""
+    if backend == 'json':
+        return JsonSeenStore(LISTINGS_FILE)
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown seen store backend: {backend}")
+
+    store = SQLiteSeenStore(SEEN_DB_FILE)
+    migrate_json_seen_listings(store, LISTINGS_FILE)
+    if SEEN_TTL_DAYS > 0:
+        store.expire(time.time() - SEEN_TTL_DAYS * 86400)
+    return store
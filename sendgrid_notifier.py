@@ -4,13 +4,18 @@ SendGrid Email Notifier
 Streamlined email notification system using only SendGrid.
 """
 
-import requests
-import json
-import os
 import logging
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
-from config import SENDGRID_API_KEY, SENDGRID_FROM_EMAIL, RECIPIENT_EMAIL
+from config import (
+    SENDGRID_API_KEY, SENDGRID_FROM_EMAIL, RECIPIENT_EMAIL,
+    NOTIFICATIONS_LOG_FILE, NOTIFICATIONS_LOG_MAX_BYTES, NOTIFICATIONS_LOG_COMPRESS, LEGACY_NOTIFICATIONS_FILE
+)
+from notification_log import NotificationLog, migrate_json_notifications
+from subscribers import SubscriberIndex, load_subscribers
+from email_delivery import SendGridDelivery
+from email_template import EmailRenderer, describe_duplicate, describe_features
+from metrics import PERSIST_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -20,105 +25,81 @@ class SendGridNotifier:
         self.api_key = SENDGRID_API_KEY
         self.from_email = SENDGRID_FROM_EMAIL
         self.to_email = RECIPIENT_EMAIL
-        self.notification_file = "notifications.json"
+        self.notification_file = NOTIFICATIONS_LOG_FILE
+        self.notification_log = NotificationLog(
+            NOTIFICATIONS_LOG_FILE,
+            max_bytes=NOTIFICATIONS_LOG_MAX_BYTES,
+            compress=NOTIFICATIONS_LOG_COMPRESS
+        )
+        migrate_json_notifications(self.notification_log, LEGACY_NOTIFICATIONS_FILE)
+        self.subscriber_index = SubscriberIndex(load_subscribers())
+        self.delivery = SendGridDelivery(self.api_key)
+        # Listing fragments are cached across emails, so subscribers sharing listings reuse them
+        self.renderer = EmailRenderer()
     
     def create_email_content(self, listings: List[Dict]) -> str:
         """Create HTML email content for the listings."""
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-                .container {{ max-width: 600px; margin: 0 auto; background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .listing {{ border: 1px solid #ddd; margin: 15px 0; padding: 20px; border-radius: 8px; background-color: #fafafa; }}
-                .title {{ color: #2c3e50; font-size: 18px; font-weight: bold; margin-bottom: 10px; }}
-                .price {{ color: #e74c3c; font-size: 16px; font-weight: bold; margin: 5px 0; }}
-                .location {{ color: #7f8c8d; margin: 5px 0; }}
-                .details {{ color: #34495e; margin: 5px 0; }}
-                .link {{ color: #3498db; text-decoration: none; font-weight: bold; }}
-                .header {{ background-color: #ecf0f1; padding: 20px; border-radius: 8px; margin-bottom: 20px; text-align: center; }}
-                .footer {{ text-align: center; margin-top: 20px; color: #7f8c8d; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🏠 New Apartment Listings Found!</h1>
-                    <p>New apartment listings have been found on Pararius for Delft (€0-1500, 2 bedrooms, 10km radius).</p>
-                    <p><strong>Found: {len(listings)} new listing(s)</strong></p>
-                </div>
-        """
-        
-        for listing in listings:
-            html_content += f"""
-                <div class="listing">
-                    <div class="title">{listing['title']}</div>
-                    <div class="price">{listing['price']}</div>
-                    <div class="location">📍 {listing['location']}</div>
-                    <div class="details">📋 {listing['details']}</div>
-                    <div style="margin-top: 10px;">
-                        <a href="{listing['link']}" class="link" target="_blank">View Listing →</a>
-                    </div>
-                </div>
-            """
-        
-        html_content += f"""
-                <div class="footer">
-                    <p>This notification was sent by your Apartment Scraper Agent</p>
-                    <p>Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_content
+        return self.renderer.render_html(listings)
     
-    def send_email(self, listings: List[Dict]) -> bool:
+    def send_email(self, listings: List[Dict], to_email: Optional[str] = None) -> bool:
         """Send email notification using SendGrid."""
-        if not all([self.api_key, self.from_email, self.to_email]):
+        return self.send_email_batch(listings, [to_email or self.to_email])
+    
+    def send_email_batch(self, listings: List[Dict], recipients: List[str]) -> bool:
+        """Send the same listings email to several recipients in as few requests as possible."""
+        recipients = [email for email in recipients if email]
+        if not all([self.api_key, self.from_email, recipients]):
             logger.error("SendGrid configuration incomplete. Please check your .env file.")
             return False
         
         try:
-            url = "https://api.sendgrid.com/v3/mail/send"
+            # Create email content; SendGrid wants the plain-text part first
+            text_content, html_content = self.renderer.render(listings)
+            content = [
+                {
+                    "type": "text/plain",
+                    "value": text_content
+                },
+                {
+                    "type": "text/html",
+                    "value": html_content
+                }
+            ]
+            subject = f"🏠 {len(listings)} New Apartment Listing(s) Found in Delft!"
             
-            # Create email content
-            html_content = self.create_email_content(listings)
-            
-            payload = {
-                "personalizations": [
-                    {
-                        "to": [{"email": self.to_email}]
-                    }
-                ],
-                "from": {"email": self.from_email},
-                "subject": f"🏠 {len(listings)} New Apartment Listing(s) Found in Delft!",
-                "content": [
-                    {
-                        "type": "text/html",
-                        "value": html_content
-                    }
-                ]
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            logger.info(f"Email notification sent successfully to {self.to_email}")
-            return True
+            if self.delivery.send(self.from_email, subject, content, recipients):
+                logger.info(f"Email notification sent successfully to {len(recipients)} recipient(s)")
+                return True
+            logger.error("Error sending email notification: SendGrid did not accept every batch")
+            return False
             
         except Exception as e:
             logger.error(f"Error sending email notification: {e}")
             return False
     
+    def send_subscriber_emails(self, listings: List[Dict]) -> bool:
+        """Email every subscriber the listings that match their filters."""
+        matches = self.subscriber_index.match_batch(listings)
+        if not matches:
+            logger.info("No subscriber filters matched the new listings")
+            return True
+        
+        # Subscribers that matched the same listings share one rendered email
+        groups: Dict[tuple, List[str]] = {}
+        for email, matched_listings in matches.items():
+            key = tuple(listing['id'] for listing in matched_listings)
+            groups.setdefault(key, []).append(email)
+        by_id = {listing['id']: listing for listing in listings}
+        
+        logger.info(f"New listings matched {len(matches)} subscriber(s) in {len(groups)} distinct email(s)")
+        success = True
+        for listing_ids, recipients in groups.items():
+            if not self.send_email_batch([by_id[listing_id] for listing_id in listing_ids], recipients):
+                success = False
+        return success
+    
     def save_local_notification(self, listings: List[Dict]) -> bool:
-        """Save notifications to a local file for backup."""
+        """Append notifications to the local log for backup."""
         try:
             notification_data = {
                 "timestamp": datetime.now().isoformat(),
@@ -126,46 +107,22 @@ class SendGridNotifier:
                 "listings": listings
             }
             
-            # Load existing notifications
-            existing_notifications = []
-            if os.path.exists(self.notification_file):
-                try:
-                    with open(self.notification_file, 'r', encoding='utf-8') as f:
-                        existing_notifications = json.load(f)
-                    logger.info(f"Loaded {len(existing_notifications)} existing notifications from {self.notification_file}")
-                except Exception as e:
-                    logger.warning(f"Error loading existing notifications from {self.notification_file}: {e}")
-                    existing_notifications = []
-            else:
-                logger.info(f"No existing notifications file found at {self.notification_file}, creating new one")
-            
-            # Add new notification
-            existing_notifications.append(notification_data)
-            
-            # Keep only last 50 notifications
-            if len(existing_notifications) > 50:
-                existing_notifications = existing_notifications[-50:]
-                logger.info(f"Trimmed notifications to last 50 entries")
-            
-            # Save to file
-            with open(self.notification_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_notifications, f, indent=2, ensure_ascii=False)
+            with PERSIST_SECONDS.time(store='notification_log'):
+                self.notification_log.append(notification_data)
             
             logger.info(f"Successfully saved {len(listings)} new listings to {self.notification_file}")
             return True
             
         except Exception as e:
             logger.error(f"Error saving local notification to {self.notification_file}: {e}")
-            # Try to create the directory if it doesn't exist
-            try:
-                os.makedirs(os.path.dirname(self.notification_file) if os.path.dirname(self.notification_file) else '.', exist_ok=True)
-                with open(self.notification_file, 'w', encoding='utf-8') as f:
-                    json.dump([notification_data], f, indent=2, ensure_ascii=False)
-                logger.info(f"Successfully created and saved {len(listings)} new listings to {self.notification_file}")
-                return True
-            except Exception as e2:
-                logger.error(f"Failed to create and save notification: {e2}")
-                return False
+            return False
+    
+    def close(self):
+        """Flush and close the local notification log."""
+        try:
+            self.notification_log.close()
+        except Exception as e:
+            logger.error(f"Error closing notification log {self.notification_file}: {e}")
     
     def print_notification(self, listings: List[Dict]) -> bool:
         """Print notifications to console."""
@@ -179,6 +136,10 @@ class SendGridNotifier:
                 print(f"   💰 {listing['price']}")
                 print(f"   📍 {listing['location']}")
                 print(f"   📋 {listing['details']}")
+                if listing.get('features'):
+                    print(f"   🔎 {describe_features(listing['features'])}")
+                if listing.get('duplicate_of'):
+                    print(f"   ⚠️ {describe_duplicate(listing['duplicate_of'])}")
                 print(f"   🔗 {listing['link']}")
             
             print("\n" + "="*60)
@@ -194,21 +155,23 @@ class SendGridNotifier:
             return True
         
         success = False
-        
-        # Method 1: Send email via SendGrid
-        if self.send_email(listings):
-            success = True
-        
-        # Method 2: Save to local file (backup)
-        if self.save_local_notification(listings):
-            success = True
-        
-        # Method 3: Print to console (immediate feedback)
-        if self.print_notification(listings):
-            success = True
+        for name, send in self.notification_channels():
+            if send(listings):
+                success = True
         
         return success
     
+    def notification_channels(self) -> List[Tuple[str, Callable[[List[Dict]], bool]]]:
+        """The delivery channels, as (name, send function) pairs."""
+        return [
+            # Method 1: Send email via SendGrid to matching subscribers
+            ('email', self.send_subscriber_emails),
+            # Method 2: Save to local file (backup)
+            ('file', self.save_local_notification),
+            # Method 3: Print to console (immediate feedback)
+            ('console', self.print_notification),
+        ]
+    
     def test_notification_system(self) -> bool:
         """Test the notification system."""
         test_listing = {
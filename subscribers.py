@@ -0,0 +1,254 @@
+"""
+Subscribers and the index that matches new listings against their filters.
+
+Each subscriber owns one bit position. The index precomputes, per filter
+dimension, which subscribers accept a given value: numeric ranges are split
+into elementary intervals over the sorted range boundaries, and cities and
+keywords map terms to subscriber bitmasks. Matching a listing is then a few
+binary searches, dictionary lookups and big-integer ANDs, independent of how
+many subscribers there are.
+"""
+
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from listing import Listing, as_listing, normalize_term, split_words
+from config import SUBSCRIBERS_FILE, RECIPIENT_EMAIL
+
+logger = logging.getLogger(__name__)
+
+
+def listing_attributes(listing: Union[Listing, Dict]) -> Tuple[Optional[int], Optional[int], Optional[int], Optional[str], Set[str]]:
+    """Return (price in euros, area in m², bedrooms, city, words) for filtering.
+
+    Search results only state the number of rooms; unless bedrooms are listed
+    explicitly they are estimated as rooms minus the living room.
+    """
+    listing = as_listing(listing)
+    if listing.bedrooms is not None:
+        bedrooms = listing.bedrooms
+    elif listing.rooms is not None:
+        bedrooms = max(listing.rooms - 1, 0)
+    else:
+        bedrooms = None
+
+    text = ' '.join(field or '' for field in (listing.title, listing.details, listing.location))
+    words = set(split_words(text))
+
+    return (
+        None if listing.price_cents is None else listing.price_cents // 100,
+        listing.area,
+        bedrooms,
+        listing.city,
+        words,
+    )
+
+
+class Subscriber:
+    """An email recipient and the listings they want to hear about.
+
+    Unset bounds and empty city/keyword lists do not restrict anything.
+    """
+
+    __slots__ = ('email', 'name', 'min_price', 'max_price', 'min_area', 'max_area',
+                 'min_bedrooms', 'max_bedrooms', 'cities', 'keywords')
+
+    def __init__(self, email: str, name: Optional[str] = None,
+                 min_price: Optional[int] = None, max_price: Optional[int] = None,
+                 min_area: Optional[int] = None, max_area: Optional[int] = None,
+                 min_bedrooms: Optional[int] = None, max_bedrooms: Optional[int] = None,
+                 cities: Iterable[str] = (), keywords: Iterable[str] = ()):
+        self.email = email
+        self.name = name
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_area = min_area
+        self.max_area = max_area
+        self.min_bedrooms = min_bedrooms
+        self.max_bedrooms = max_bedrooms
+        self.cities = [normalize_term(city) for city in cities]
+        self.keywords = [normalize_term(keyword) for keyword in keywords]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Subscriber':
+        return cls(**{key: value for key, value in data.items() if key in cls.__slots__})
+
+    def matches(self, listing: Dict) -> bool:
+        """Check a single listing without an index (reference implementation)."""
+        price, area, bedrooms, city, words = listing_attributes(listing)
+        return (
+            _in_range(price, self.min_price, self.max_price)
+            and _in_range(area, self.min_area, self.max_area)
+            and _in_range(bedrooms, self.min_bedrooms, self.max_bedrooms)
+            and (not self.cities or city is None or city in self.cities)
+            and (not self.keywords or any(keyword_in(keyword, words) for keyword in self.keywords))
+        )
+
+    def __repr__(self):
+        return f"Subscriber({self.email!r})"
+
+
+def keyword_in(keyword: str, words: Set[str]) -> bool:
+    """Whether a normalized keyword occurs in a listing's words; a multi-word keyword needs all of them."""
+    return all(term in words for term in keyword.split('-'))
+
+
+def _in_range(value: Optional[int], low: Optional[int], high: Optional[int]) -> bool:
+    # Unknown values (e.g. "Prijs op aanvraag") never filter a listing out
+    if value is None:
+        return True
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+class RangeIndex:
+    """Maps a numeric value to the bitmask of subscribers whose range contains it.
+
+    The sorted, distinct range boundaries split the number line into regions:
+    region 2*i+1 is exactly boundary i, region 2*i lies just below it. Each
+    region's mask is precomputed with one sweep, so a lookup is one bisect.
+    """
+
+    def __init__(self, ranges: List[Tuple[Optional[int], Optional[int]]]):
+        self.boundaries = sorted({bound for pair in ranges for bound in pair if bound is not None})
+        region_count = 2 * len(self.boundaries) + 1
+        starts = [0] * (region_count + 1)
+        ends = [0] * (region_count + 1)
+
+        self.all = 0
+        for position, (low, high) in enumerate(ranges):
+            bit = 1 << position
+            self.all |= bit
+            first = 0 if low is None else self._region(low)
+            last = region_count - 1 if high is None else self._region(high)
+            if first <= last:
+                starts[first] |= bit
+                ends[last + 1] |= bit
+
+        self.masks = []
+        current = 0
+        for region in range(region_count):
+            current = (current & ~ends[region]) | starts[region]
+            self.masks.append(current)
+
+    def _region(self, value: int) -> int:
+        index = bisect_left(self.boundaries, value)
+        if index < len(self.boundaries) and self.boundaries[index] == value:
+            return 2 * index + 1
+        return 2 * index
+
+    def lookup(self, value: Optional[int]) -> int:
+        if value is None:
+            return self.all
+        return self.masks[self._region(value)]
+
+
+class TermIndex:
+    """Inverted index from terms to the bitmask of subscribers interested in them."""
+
+    def __init__(self, term_lists: List[List[str]]):
+        self.unrestricted = 0
+        self.all = 0
+        self.postings: Dict[str, int] = {}
+        for position, terms in enumerate(term_lists):
+            bit = 1 << position
+            self.all |= bit
+            if not terms:
+                self.unrestricted |= bit
+            for term in terms:
+                self.postings[term] = self.postings.get(term, 0) | bit
+
+    def lookup(self, term: Optional[str]) -> int:
+        if term is None:
+            return self.all
+        return self.unrestricted | self.postings.get(term, 0)
+
+    def lookup_any(self, terms: Iterable[str]) -> int:
+        mask = self.unrestricted
+        for term in terms:
+            mask |= self.postings.get(term, 0)
+        return mask
+
+
+class KeywordIndex(TermIndex):
+    """TermIndex over whole keywords, looked up with the words of a listing.
+
+    Multi-word keywords are filed under their first word and only checked for
+    their other words when a listing contains that one.
+    """
+
+    def __init__(self, term_lists: List[List[str]]):
+        super().__init__(term_lists)
+        self.phrases: Dict[str, List[Tuple[str, List[str]]]] = {}
+        for keyword in self.postings:
+            first, *rest = keyword.split('-')
+            if rest:
+                self.phrases.setdefault(first, []).append((keyword, rest))
+
+    def lookup_words(self, words: Set[str]) -> int:
+        mask = self.unrestricted
+        for word in words:
+            mask |= self.postings.get(word, 0)
+            for keyword, rest in self.phrases.get(word, ()):
+                if all(term in words for term in rest):
+                    mask |= self.postings[keyword]
+        return mask
+
+
+class SubscriberIndex:
+    def __init__(self, subscribers: List[Subscriber]):
+        self.subscribers = subscribers
+        self.price = RangeIndex([(s.min_price, s.max_price) for s in subscribers])
+        self.area = RangeIndex([(s.min_area, s.max_area) for s in subscribers])
+        self.bedrooms = RangeIndex([(s.min_bedrooms, s.max_bedrooms) for s in subscribers])
+        self.cities = TermIndex([s.cities for s in subscribers])
+        self.keywords = KeywordIndex([s.keywords for s in subscribers])
+
+    def match_mask(self, listing: Dict) -> int:
+        """Bitmask of the subscribers whose filters accept the listing."""
+        price, area, bedrooms, city, words = listing_attributes(listing)
+        mask = self.price.lookup(price)
+        if mask:
+            mask &= self.area.lookup(area)
+        if mask:
+            mask &= self.bedrooms.lookup(bedrooms)
+        if mask:
+            mask &= self.cities.lookup(city)
+        if mask:
+            mask &= self.keywords.lookup_words(words)
+        return mask
+
+    def _subscribers_in(self, mask: int) -> List[Subscriber]:
+        # Scanning the reversed binary string with str.find is much faster than
+        # peeling off one bit at a time from a wide integer
+        bits = bin(mask)[:1:-1]
+        matched = []
+        position = bits.find('1')
+        while position != -1:
+            matched.append(self.subscribers[position])
+            position = bits.find('1', position + 1)
+        return matched
+
+    def match(self, listing: Dict) -> List[Subscriber]:
+        """Subscribers whose filters accept the listing."""
+        return self._subscribers_in(self.match_mask(listing))
+
+    def match_batch(self, listings: List[Dict]) -> Dict[str, List[Dict]]:
+        """Group a batch of listings by the email address of every subscriber they match."""
+        matches: Dict[str, List[Dict]] = {}
+        for listing in listings:
+            for subscriber in self.match(listing):
+                matches.setdefault(subscriber.email, []).append(listing)
+        return matches
+
+
+def load_subscribers(path: str = SUBSCRIBERS_FILE) -> List[Subscriber]:
+    """Load subscribers, falling back to RECIPIENT_EMAIL without filters."""
+    if not os.path.exists(path):
+        return [Subscriber(RECIPIENT_EMAIL)] if RECIPIENT_EMAIL else []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        subscribers = [Subscriber.from_dict(data) for data in json.load(f)]
+    logger.info(f"Loaded {len(subscribers)} subscriber(s) from {path}")
+    return subscribers
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the synthetic pages and the benchmark regression check.
+"""
+
+from benchmarks.pages import synthetic_page, listing_fields
+from benchmarks.run import compare
+from scraper import ParariusScraper
+
+
+def test_synthetic_page_parses():
+    scraper = ParariusScraper()
+    html_content = synthetic_page(50, seed=3, path='/huurwoningen/delft', page_count=4)
+    listings = scraper.parse_listings(html_content)
+    assert len(listings) == 50
+    assert len({listing.link for listing in listings}) == 50
+    assert all(listing.price_cents and listing.area and listing.city for listing in listings)
+    assert scraper.get_page_count(html_content, 'https://www.pararius.nl/huurwoningen/delft') == 4
+    assert listing_fields(7, seed=3) == listing_fields(7, seed=3)
+    # Pages built from small seeds, like the parse pool benchmark's, do not share listings
+    assert len({listing_fields(number, seed)['slug'] for seed in range(4) for number in range(100)}) == 400
+
+
+def test_compare_flags_regressions():
+    baseline = {'results': {'fast': {'median_ms': 0.1}, 'parse': {'median_ms': 10.0}, 'gone': {'median_ms': 5.0}}}
+    current = {'results': {'fast': {'median_ms': 0.3}, 'parse': {'median_ms': 12.0}, 'new': {'median_ms': 1.0}}}
+    assert compare(current, baseline, threshold=0.25) == []
+
+    current['results']['parse']['median_ms'] = 13.0
+    assert compare(current, baseline, threshold=0.25) == [
+        {'case': 'parse', 'baseline_ms': 10.0, 'current_ms': 13.0, 'ratio': 1.3}]
+
+
+if __name__ == "__main__":
+    test_synthetic_page_parses()
+    test_compare_flags_regressions()
+    print("✅ Benchmark tests passed!")
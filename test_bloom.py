@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the scalable and windowed Bloom filters behind the seen index.
+"""
+
+import os
+import tempfile
+from bloom import ScalableBloomFilter, WindowedBloomFilter
+
+DAY = 86400
+
+
+def test_scalable_filter_grows_within_its_error_rate():
+    bloom = ScalableBloomFilter(capacity=100, error_rate=0.01)
+    # add() reports a false positive as already present
+    added = sum(bloom.add(f"seen-{number}") for number in range(5000))
+    assert added > 4900 and len(bloom) == added and len(bloom.slices) > 1
+    # No false negatives, ever
+    assert all(f"seen-{number}" in bloom for number in range(5000))
+    assert not bloom.add('seen-42')
+
+    false_positives = sum(f"other-{number}" in bloom for number in range(20000))
+    assert false_positives / 20000 < 0.01
+
+
+def test_windowed_filter_forgets_after_ttl_and_round_trips():
+    bloom = WindowedBloomFilter(ttl=60 * DAY, error_rate=0.001, windows=4)
+    bloom.add('old', 0)
+    bloom.add('kept', 0)
+    bloom.add('kept', 50 * DAY)
+    assert 'old' in bloom and 'kept' in bloom
+
+    bloom.expire(80 * DAY)
+    assert 'old' not in bloom and 'kept' in bloom
+
+    bloom.synced = 50 * DAY
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'seen.bloom')
+        with open(path, 'wb') as f:
+            f.write(bloom.to_bytes())
+        loaded = WindowedBloomFilter.load(path)
+    assert loaded.compatible(bloom) and loaded.synced == 50 * DAY
+    assert 'kept' in loaded and 'old' not in loaded and len(loaded) == len(bloom)
+
+    try:
+        WindowedBloomFilter.from_bytes(bloom.to_bytes()[:-10])
+        assert False, "a truncated filter must not load"
+    except Exception:
+        pass
+
+
+def test_memory_stays_flat_over_months_of_polling():
+    """Dozens of searches, 1000 listings online, 40 new a day: the filter stops growing once the TTL is reached."""
+    bloom = WindowedBloomFilter(ttl=60 * DAY, error_rate=0.001, windows=4)
+    online = [f"listing-{number}" for number in range(1000)]
+    next_number = 1000
+    sizes = {}
+    for day in range(1, 241):
+        online = online[40:] + [f"listing-{number}" for number in range(next_number, next_number + 40)]
+        next_number += 40
+        for listing_id in online:
+            bloom.add(listing_id, day * DAY)
+        bloom.expire(day * DAY)
+        sizes[day] = bloom.nbytes
+    assert all(listing_id in bloom for listing_id in online)
+    assert 'listing-0' not in bloom
+    assert max(sizes[day] for day in range(120, 241)) <= 1.25 * max(sizes[day] for day in range(60, 120))
+
+
+if __name__ == "__main__":
+    test_scalable_filter_grows_within_its_error_rate()
+    test_windowed_filter_forgets_after_ttl_and_round_trips()
+    test_memory_stays_flat_over_months_of_polling()
+    print("✅ Bloom filter tests passed!")
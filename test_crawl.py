@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the multi-page crawl, using the saved HTML fixtures.
+"""
+
+import os
+import tempfile
+import time
+from scraper import ParariusScraper
+from searches import Search, SearchFanOut
+from seen_store import SQLiteSeenStore
+from rate_limit import TokenBucket, HostRateLimiter
+from config import TARGET_URL
+
+DAY = 24 * 3600
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    """Read a saved HTML fixture."""
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Serves fixture pages instead of hitting Pararius."""
+
+    def __init__(self, pages, etags=None):
+        self.pages = pages
+        self.etags = etags or {}
+        self.headers = {}
+        self.requested = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.requested.append(url)
+        etag = self.etags.get(url)
+        if etag and (headers or {}).get('If-None-Match') == etag:
+            return FakeResponse('', status_code=304)
+        return FakeResponse(self.pages[url], headers={'ETag': etag} if etag else {})
+
+
+def make_scraper(etags=None):
+    """Create a scraper whose session serves the three fixture pages."""
+    scraper = ParariusScraper()
+    scraper.session = FakeSession({
+        TARGET_URL: load_fixture('search_page_1.html'),
+        f"{TARGET_URL}/page-2": load_fixture('search_page_2.html'),
+        f"{TARGET_URL}/page-3": load_fixture('search_page_3.html'),
+    }, etags)
+    scraper.rate_limiter = HostRateLimiter(0, 0)
+    scraper.history = None
+    return scraper
+
+
+def count_parses(scraper):
+    """Wrap parse_listings so the test can see how often it runs."""
+    calls = []
+    parse_listings = scraper.parse_listings
+
+    def counting_parse(html_content):
+        calls.append(html_content)
+        return parse_listings(html_content)
+
+    scraper.parse_listings = counting_parse
+    return calls
+
+
+def test_page_count():
+    scraper = ParariusScraper()
+    assert scraper.get_page_count(load_fixture('search_page_1.html'), TARGET_URL) == 3
+    assert scraper.get_page_count('<html></html>', TARGET_URL) == 1
+
+
+def test_crawl_fetches_all_pages_in_order():
+    scraper = make_scraper()
+    listings = scraper.get_current_listings()
+
+    assert sorted(scraper.session.requested) == sorted([TARGET_URL, f"{TARGET_URL}/page-2", f"{TARGET_URL}/page-3"])
+    links = [listing['link'] for listing in listings]
+    # The Westlandseweg studio shifted from page 1 to page 2 mid-crawl and is only kept once
+    assert len(links) == len(set(links))
+    assert links[0].endswith('/85b96202/oude-delft')
+    assert links[-1].endswith('/e91f0b36/oostlaan')
+
+
+def test_unchanged_body_skips_parse():
+    scraper = make_scraper()
+    parses = count_parses(scraper)
+    first, changed = scraper.crawl()
+    assert changed and len(parses) == 3
+
+    # A new script nonce alone does not count as a change
+    page = scraper.session.pages[TARGET_URL]
+    scraper.session.pages[TARGET_URL] = page.replace('nonce="c2f47f70a1"', 'nonce="0000000000"')
+    second, changed = scraper.crawl()
+    assert not changed and len(parses) == 3
+    assert [listing['id'] for listing in second] == [listing['id'] for listing in first]
+
+
+def test_not_modified_skips_diff():
+    scraper = make_scraper(etags={TARGET_URL: '"v1"', f"{TARGET_URL}/page-2": '"v1"', f"{TARGET_URL}/page-3": '"v1"'})
+    scraper.crawl()
+
+    class UndiffedStore:
+        touched = []
+
+        def mark_seen(self, listing_ids, now=None):
+            raise AssertionError("an unchanged crawl must not be diffed against the seen store")
+
+        def touch(self, listing_ids, now=None):
+            self.touched.extend(listing_ids)
+
+    scraper.seen_store = UndiffedStore()
+    assert scraper.get_new_listings() == []
+    # The listings are still online, so their last sighting moves up
+    assert sorted(UndiffedStore.touched) == sorted(listing['id'] for listing in scraper.get_current_listings())
+
+
+def test_failed_seen_update_rechecks_pages():
+    scraper = make_scraper(etags={TARGET_URL: '"v1"', f"{TARGET_URL}/page-2": '"v1"', f"{TARGET_URL}/page-3": '"v1"'})
+    seen = set()
+
+    class FlakyStore:
+        failures = 1
+
+        def mark_seen(self, listing_ids, now=None):
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("database is locked")
+            listing_ids = set(listing_ids)
+            new_ids = listing_ids - seen
+            seen.update(listing_ids)
+            return new_ids
+
+        def known_ids(self, listing_ids):
+            return set()
+
+    scraper.seen_store = FlakyStore()
+    scraper.duplicate_detection = False
+    assert scraper.get_new_listings() == []
+
+    # The pages answer 304 now, but the listings were never diffed
+    new_listings = scraper.get_new_listings()
+    assert new_listings and len(new_listings) == len(scraper.get_current_listings())
+    assert scraper.get_new_listings() == []
+
+
+def test_unchanged_listings_outlive_the_ttl():
+    scraper = make_scraper(etags={TARGET_URL: '"v1"', f"{TARGET_URL}/page-2": '"v1"', f"{TARGET_URL}/page-3": '"v1"'})
+    scraper.duplicate_detection = False
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteSeenStore(os.path.join(directory, 'seen.db'))
+        scraper.seen_store = store
+        first = scraper.get_new_listings()
+        assert len(first) == 8
+
+        # Announced 60 days ago; the pages have answered 304 ever since
+        store.conn.execute("UPDATE seen_listings SET first_seen = first_seen - ?, last_seen = last_seen - ?", (60 * DAY,) * 2)
+        for _ in range(3):
+            assert scraper.get_new_listings() == []
+        assert store.expire(time.time() - 30 * DAY) == 0
+
+        # A page changes: nothing that stayed online is announced again
+        scraper.session.etags[f"{TARGET_URL}/page-2"] = '"v2"'
+        scraper.session.pages[f"{TARGET_URL}/page-2"] += '<!-- v2 -->'
+        assert scraper.get_new_listings() == []
+        store.close()
+
+
+def test_fan_out_dedups_across_searches():
+    scraper = make_scraper()
+    other_url = "https://www.pararius.nl/huurwoningen/den-haag/0-1500"
+    scraper.session.pages[other_url] = load_fixture('search_page_2.html')
+
+    listings, changed = SearchFanOut(scraper, [Search('delft', TARGET_URL), Search('den-haag', other_url)]).run()
+    assert changed
+    ids = [listing['id'] for listing in listings]
+    assert len(ids) == len(set(ids)) == 8
+
+    by_link = {listing['link'].rsplit('/', 2)[-2]: listing['searches'] for listing in listings}
+    assert by_link['7b3e55d1'] == ['delft', 'den-haag']
+    assert by_link['85b96202'] == ['delft']
+    # The scraper's cached parse is left untouched
+    assert all('searches' not in listing for listing in scraper.get_current_listings())
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(7):
+        bucket.acquire()
+    # Two burst tokens, then five more at 50/s
+    assert time.monotonic() - start >= 0.09
+
+
+if __name__ == "__main__":
+    test_page_count()
+    test_crawl_fetches_all_pages_in_order()
+    test_unchanged_body_skips_parse()
+    test_not_modified_skips_diff()
+    test_failed_seen_update_rechecks_pages()
+    test_unchanged_listings_outlive_the_ttl()
+    test_fan_out_dedups_across_searches()
+    test_token_bucket_limits_rate()
+    print("✅ Crawl tests passed!")
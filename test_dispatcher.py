@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the background notification dispatcher.
+"""
+
+import threading
+import time
+from dispatcher import NotificationDispatcher
+
+LISTINGS = [{'id': 'a', 'title': 'A'}]
+
+
+def test_submit_returns_before_slow_channel():
+    release = threading.Event()
+    delivered = []
+
+    def slow_email(listings):
+        release.wait(5)
+        delivered.append(listings)
+        return True
+
+    dispatcher = NotificationDispatcher([('email', slow_email)])
+    start = time.monotonic()
+    assert dispatcher.submit(LISTINGS)
+    assert time.monotonic() - start < 0.5
+    assert not delivered
+
+    release.set()
+    dispatcher.shutdown(drain=True, timeout=5)
+    assert delivered == [LISTINGS]
+    assert dispatcher.delivered == 1
+    assert not dispatcher.submit(LISTINGS)
+
+
+def test_channels_run_in_parallel_with_own_timeouts():
+    calls = []
+
+    def stuck(listings):
+        time.sleep(1)
+        return True
+
+    def fast(listings):
+        calls.append('file')
+        return True
+
+    dispatcher = NotificationDispatcher([('email', stuck), ('file', fast)], timeouts={'email': 0.1, 'file': 1})
+    start = time.monotonic()
+    # The stuck channel times out, the fast one still counts as delivered
+    assert dispatcher.deliver(LISTINGS)
+    assert time.monotonic() - start < 0.9
+    assert calls == ['file']
+    dispatcher.shutdown(timeout=2)
+
+
+def test_shutdown_waits_for_timed_out_channels():
+    finished = []
+
+    def slow_file(listings):
+        time.sleep(0.3)
+        finished.append(listings)
+        return True
+
+    dispatcher = NotificationDispatcher([('file', slow_file)], timeouts={'file': 0.05})
+    assert not dispatcher.deliver(LISTINGS) and not finished
+    # The notifier is closed right after shutdown, so the channel must be done by then
+    dispatcher.shutdown(timeout=2)
+    assert finished == [LISTINGS]
+
+
+def test_full_queue_delivers_inline():
+    release = threading.Event()
+    calls = []
+
+    def channel(listings):
+        calls.append(listings)
+        if len(calls) == 1:
+            release.wait(5)
+        return True
+
+    dispatcher = NotificationDispatcher([('email', channel)], capacity=1, submit_timeout=0.05)
+    dispatcher.submit(LISTINGS)  # picked up by the worker, which blocks
+    time.sleep(0.1)
+    dispatcher.submit(LISTINGS)  # fills the queue
+    dispatcher.submit(LISTINGS)  # queue stays full: delivered in this thread instead of dropped
+    assert dispatcher.delivered == 1
+
+    release.set()
+    dispatcher.shutdown(drain=True, timeout=5)
+    assert dispatcher.delivered == 3
+
+
+if __name__ == "__main__":
+    test_submit_returns_before_slow_channel()
+    test_channels_run_in_parallel_with_own_timeouts()
+    test_shutdown_waits_for_timed_out_channels()
+    test_full_queue_delivers_inline()
+    print("✅ Dispatcher tests passed!")
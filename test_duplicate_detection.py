@@ -3,7 +3,6 @@
 Test script to verify duplicate detection and file updates.
 """
 
-import json
 import os
 import logging
 from scraper import ParariusScraper
@@ -27,19 +26,10 @@ def test_duplicate_detection():
     # Check current state of files
     logger.info("Checking current state of files...")
     
-    if os.path.exists('seen_listings.json'):
-        with open('seen_listings.json', 'r') as f:
-            seen_data = json.load(f)
-            logger.info(f"seen_listings.json contains {len(seen_data.get('seen_ids', []))} seen listings")
-    else:
-        logger.info("seen_listings.json does not exist")
+    logger.info(f"Seen listings store contains {scraper.seen_store.count()} seen listings")
     
-    if os.path.exists('notifications.json'):
-        with open('notifications.json', 'r') as f:
-            notifications = json.load(f)
-            logger.info(f"notifications.json contains {len(notifications)} notification entries")
-    else:
-        logger.info("notifications.json does not exist")
+    notification_count = sum(1 for _ in notifier.notification_log.iter_entries())
+    logger.info(f"{notifier.notification_file} contains {notification_count} notification entries")
     
     # Run the scraper once
     logger.info("Running scraper to get new listings...")
@@ -56,19 +46,18 @@ def test_duplicate_detection():
     # Check final state of files
     logger.info("Checking final state of files...")
     
-    if os.path.exists('seen_listings.json'):
-        with open('seen_listings.json', 'r') as f:
-            seen_data = json.load(f)
-            logger.info(f"seen_listings.json now contains {len(seen_data.get('seen_ids', []))} seen listings")
+    seen_count = scraper.seen_store.count()
+    if seen_count:
+        logger.info(f"Seen listings store now contains {seen_count} seen listings")
     else:
-        logger.error("seen_listings.json still does not exist!")
+        logger.error("Seen listings store is still empty!")
     
-    if os.path.exists('notifications.json'):
-        with open('notifications.json', 'r') as f:
-            notifications = json.load(f)
-            logger.info(f"notifications.json now contains {len(notifications)} notification entries")
+    notifier.notification_log.flush()
+    if os.path.exists(notifier.notification_file):
+        notification_count = sum(1 for _ in notifier.notification_log.iter_entries())
+        logger.info(f"{notifier.notification_file} now contains {notification_count} notification entries")
     else:
-        logger.error("notifications.json still does not exist!")
+        logger.error(f"{notifier.notification_file} still does not exist!")
     
     # Test duplicate detection
     logger.info("Testing duplicate detection by running scraper again...")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for SendGrid delivery against a local mock HTTP server.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email_delivery import SendGridDelivery
+from http_retry import parse_retry_after
+
+
+class MockSendGrid:
+    """Local stand-in for the SendGrid mail/send endpoint.
+
+    Answers with the queued (status, headers) responses first, then 202.
+    """
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.requests = []
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                mock.requests.append((dict(self.headers), json.loads(body)))
+                status, headers = mock.responses.pop(0) if mock.responses else (202, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v3/mail/send"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_delivery(mock, sleeps, **kwargs):
+    return SendGridDelivery('SG.test', api_url=mock.url, backoff_base=0.01, sleep=sleeps.append, **kwargs)
+
+
+def test_batches_personalizations():
+    mock = MockSendGrid()
+    try:
+        delivery = make_delivery(mock, [], batch_size=2)
+        recipients = ['a@example.com', 'b@example.com', 'c@example.com', 'a@example.com']
+        assert delivery.send('from@example.com', 'Subject', [{"type": "text/html", "value": "<p>x</p>"}], recipients)
+
+        batches = [[p['to'][0]['email'] for p in payload['personalizations']] for _, payload in mock.requests]
+        assert batches == [['a@example.com', 'b@example.com'], ['c@example.com']]
+        assert mock.requests[0][0]['Authorization'] == 'Bearer SG.test'
+    finally:
+        mock.close()
+
+
+def test_retries_honor_retry_after():
+    mock = MockSendGrid([(429, {'Retry-After': '7'}), (503, {})])
+    try:
+        sleeps = []
+        delivery = make_delivery(mock, sleeps)
+        assert delivery.send('from@example.com', 'Subject', [], ['a@example.com'])
+        assert len(mock.requests) == 3
+        assert sleeps[0] == 7
+        assert 0 <= sleeps[1] <= 0.02
+    finally:
+        mock.close()
+
+
+def test_gives_up_on_long_retry_after():
+    mock = MockSendGrid([(429, {'Retry-After': '3600'})])
+    try:
+        sleeps = []
+        delivery = make_delivery(mock, sleeps, max_retry_after=30)
+        assert not delivery.send('from@example.com', 'Subject', [], ['a@example.com'])
+        # An hour would outlast the shutdown drain: no sleeping, no further attempts
+        assert len(mock.requests) == 1 and not sleeps
+    finally:
+        mock.close()
+
+
+def test_gives_up_on_client_errors_and_after_max_retries():
+    mock = MockSendGrid([(400, {})] + [(500, {})] * 3)
+    try:
+        sleeps = []
+        delivery = make_delivery(mock, sleeps, max_retries=2)
+        assert not delivery.send('from@example.com', 'Subject', [], ['a@example.com'])
+        assert len(mock.requests) == 1 and not sleeps
+        assert not delivery.send('from@example.com', 'Subject', [], ['a@example.com'])
+        assert len(mock.requests) == 4 and len(sleeps) == 2
+    finally:
+        mock.close()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('12') == 12
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('soon') is None
+
+
+if __name__ == "__main__":
+    test_batches_personalizations()
+    test_retries_honor_retry_after()
+    test_gives_up_on_long_retry_after()
+    test_gives_up_on_client_errors_and_after_max_retries()
+    test_parse_retry_after()
+    print("✅ Email delivery tests passed!")
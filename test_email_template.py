@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline tests for notification email rendering.
+"""
+
+from datetime import datetime
+from email_template import EmailRenderer
+from listing import Listing
+
+
+def make_listing(number: int, title: str = None) -> Listing:
+    return Listing(
+        id=f'listing-{number}',
+        title=title or f'Appartement Oude Delft {number}',
+        price='€ 1.250 per maand',
+        location='2611 AB Delft (Centrum)',
+        details='60 m² 3 kamers',
+        link=f'https://www.pararius.nl/appartement-te-huur/delft/{number}/oude-delft'
+    )
+
+
+def test_renders_escaped_html_and_text():
+    listing = make_listing(1, title='<script>alert("hi")</script> & Co')
+    plain = {'title': 'Test "quoted"', 'price': '€1,200', 'location': 'Delft', 'details': '2 bedrooms',
+             'link': 'https://example.com/?a=1&b="2"'}
+    text, html = EmailRenderer().render([listing, plain], generated_at=datetime(2024, 1, 2, 3, 4, 5))
+
+    assert '<script>' not in html
+    assert '&lt;script&gt;alert(&quot;hi&quot;)&lt;/script&gt; &amp; Co' in html
+    assert 'href="https://example.com/?a=1&amp;b=&quot;2&quot;"' in html
+    assert 'Found: 2 new listing(s)' in html
+    assert 'Generated on: 2024-01-02 03:04:05' in html
+    assert html.rstrip().endswith('</html>')
+
+    # The plain-text part is not escaped
+    assert '\n1. <script>alert("hi")</script> & Co\n' in text
+    assert '\n2. Test "quoted"\n   Price: €1,200\n' in text
+    assert 'https://www.pararius.nl/appartement-te-huur/delft/1/oude-delft' in text
+
+
+def test_suspected_duplicates_are_marked():
+    copy = make_listing(2)
+    copy.duplicate_of = {'id': 'listing-1', 'kind': 'duplicate', 'similarity': 0.84,
+                         'link': 'https://www.pararius.nl/appartement-te-huur/delft/1/oude-delft'}
+    relisted = make_listing(3)
+    relisted.duplicate_of = {'id': 'listing-0', 'kind': 'relisting', 'similarity': 1.0}
+    text, html = EmailRenderer().render([make_listing(1), copy, relisted])
+    assert text.count('Possibly') == 2 and html.count('⚠️') == 2
+    assert '   Possibly the same home as https://www.pararius.nl/appartement-te-huur/delft/1/oude-delft\n' in text
+    assert 'Possibly a relisting' in html
+
+
+def test_fragments_are_cached_by_listing_and_text():
+    renderer = EmailRenderer(max_fragments=3)
+    listings = [make_listing(number) for number in range(3)]
+    first = renderer.render(listings, generated_at=datetime(2024, 1, 1))
+    assert (renderer.hits, renderer.misses) == (0, 3)
+
+    # Another subscriber's digest with the same listings reuses every fragment
+    assert renderer.render(listings, generated_at=datetime(2024, 1, 1)) == first
+    assert (renderer.hits, renderer.misses) == (3, 3)
+
+    # Renumbered in a different digest, but the fragments are the same
+    text, _ = renderer.render(listings[2:], generated_at=datetime(2024, 1, 1))
+    assert '\n1. Appartement Oude Delft 2\n' in text
+    assert renderer.hits == 4
+
+    # An edited listing keeps its ID but is rendered again
+    edited = make_listing(2)
+    edited.price = '€ 1.195 per maand'
+    text, _ = renderer.render([edited])
+    assert 'Price: € 1.195 per maand' in text and (renderer.hits, renderer.misses) == (4, 4)
+
+    # The cache is bounded, least recently used out first
+    renderer.render([make_listing(3)])
+    assert 'listing-0' not in renderer._fragments
+    assert len(renderer._fragments) == 3
+
+
+if __name__ == "__main__":
+    test_renders_escaped_html_and_text()
+    test_suspected_duplicates_are_marked()
+    test_fragments_are_cached_by_listing_and_text()
+    print("✅ Email template tests passed!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline tests for detail-page enrichment and its on-disk LRU cache.
+"""
+
+import os
+import tempfile
+from benchmarks.stub_server import StubPararius, start_server
+from config import TARGET_URL
+from detail_cache import DetailCache
+from enrichment import ListingEnricher, parse_detail_page
+from rate_limit import HostRateLimiter
+from scraper import ParariusScraper
+
+ENGLISH_PAGE = """
+<html><body>
+<dl>
+    <dt>Deposit</dt><dd>€ 1,500</dd>
+    <dt>Available from</dt><dd>01-09-2025</dd>
+    <dt>Interior</dt><dd>Shell, no floor</dd>
+    <dt>Energy rating</dt><dd>Label C (indicative)</dd>
+</dl>
+</body></html>
+"""
+
+
+def test_parse_detail_page_by_term():
+    fields = parse_detail_page(ENGLISH_PAGE)
+    assert fields['deposit'] == '€ 1,500'
+    assert fields['available_from'] == '01-09-2025'
+    assert fields['energy_label'] == 'C'
+    assert fields['furnishing'] == 'shell'
+    assert parse_detail_page('') == {}
+
+
+def test_detail_cache_is_a_bounded_lru():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'details.db')
+        cache = DetailCache(path, max_bytes=300)
+        for number in range(3):
+            cache.put(f'https://example.com/{number}', {'deposit': 'x' * 60})
+        assert len(cache) == 3
+
+        # Using entry 0 makes entry 1 the least recently used
+        assert cache.get('https://example.com/0') == {'deposit': 'x' * 60}
+        for number in range(3, 5):
+            cache.put(f'https://example.com/{number}', {'deposit': 'x' * 60})
+        assert cache.size <= 300
+        assert 'https://example.com/1' not in cache and 'https://example.com/0' in cache
+        cache.close()
+
+        # Survives a restart, with the same size accounting
+        reopened = DetailCache(path, max_bytes=300)
+        assert len(reopened) == 3 and reopened.size == cache.size
+        assert reopened.get('https://example.com/4') == {'deposit': 'x' * 60}
+
+        reopened.close()
+
+        # Two runs filling the same file: each put counts the other's entries too
+        path = os.path.join(directory, 'shared.db')
+        runs = [DetailCache(path, max_bytes=300), DetailCache(path, max_bytes=300)]
+        for number in range(6):
+            writer = runs[number % 2]
+            writer.put(f'https://example.com/{number}', {'deposit': 'x' * 60})
+            stored = writer.conn.execute("SELECT SUM(size) FROM details").fetchone()[0]
+            assert writer.size == stored <= 300
+        assert len(runs[0]) == 3
+        for run in runs:
+            run.close()
+
+
+def test_new_listings_enriched_once_through_the_stub():
+    stub = StubPararius(listings=12, page_size=30)
+    server, base_url = start_server(stub)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            scraper = ParariusScraper(base_url=base_url)
+            scraper.rate_limiter = HostRateLimiter(0, 0)
+            scraper.history = None
+            scraper.enricher = ListingEnricher(scraper.fetch_detail_page, DetailCache(os.path.join(directory, 'details.db')), workers=3)
+
+            listings = scraper.get_current_listings(TARGET_URL)
+            assert len(listings) == 12
+            assert scraper.enricher.enrich(listings) == 12
+            assert stub.stats['details'] == 12
+            assert all(listing.features['deposit_cents'] for listing in listings)
+            assert all(listing.to_dict()['features'] == listing.features for listing in listings)
+
+            # Overlapping searches and re-runs are served from the cache
+            again = [listing.with_searches(['other']) for listing in listings]
+            for listing in again:
+                listing.features = None
+            assert scraper.enricher.enrich(again) == 12
+            assert stub.stats['details'] == 12
+            scraper.enricher.cache.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_parse_detail_page_by_term()
+    test_detail_cache_is_a_bounded_lru()
+    test_new_listings_enriched_once_through_the_stub()
+    print("✅ Enrichment tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Offline tests for retries, backoff and circuit breaking in the fetch layer.
+"""
+
+import random
+import requests
+from fetcher import Fetcher, CircuitBreaker, decorrelated_jitter, OK, THROTTLED, HTTP_ERROR, NETWORK_ERROR, CIRCUIT_OPEN
+from rate_limit import HostRateLimiter
+
+URL = 'https://www.pararius.nl/huurwoningen/delft'
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ''
+
+
+class ScriptedSession:
+    """Answers each request with the next scripted status (or raises a connection error)."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+
+    def get(self, url, timeout=None, headers=None):
+        self.requests += 1
+        step = self.script.pop(0)
+        if step == 'down':
+            raise requests.ConnectionError('connection refused')
+        status, headers = step if isinstance(step, tuple) else (step, {})
+        return FakeResponse(status, headers)
+
+
+def make_fetcher(script, **kwargs):
+    sleeps = []
+    fetcher = Fetcher(ScriptedSession(script), HostRateLimiter(0, 0), sleep=sleeps.append, **kwargs)
+    return fetcher, sleeps
+
+
+def test_retries_honor_retry_after():
+    fetcher, sleeps = make_fetcher([(429, {'Retry-After': '2'}), 503, 'down', 200], max_retries=3)
+    result = fetcher.fetch(URL)
+    assert result.outcome == OK and result.attempts == 4
+    assert sleeps[0] == 2
+    assert all(1 <= delay <= 30 for delay in sleeps[1:])
+
+
+def test_gives_up_and_reports_outcome():
+    fetcher, sleeps = make_fetcher([429, 429, 429], max_retries=2)
+    result = fetcher.fetch(URL)
+    assert result.outcome == THROTTLED and result.attempts == 3 and len(sleeps) == 2
+
+    fetcher, sleeps = make_fetcher([404])
+    result = fetcher.fetch(URL)
+    assert result.outcome == HTTP_ERROR and result.status_code == 404 and not sleeps
+
+    fetcher, _ = make_fetcher(['down'], max_retries=0)
+    assert fetcher.fetch(URL).outcome == NETWORK_ERROR
+
+
+def test_breaker_pauses_host():
+    fetcher, _ = make_fetcher([503, 503, 503, 503], max_retries=1, breaker_threshold=3)
+    assert fetcher.fetch(URL).outcome == HTTP_ERROR
+    # The third consecutive failure opens the circuit mid-retry
+    assert fetcher.fetch(URL).outcome == CIRCUIT_OPEN
+    assert fetcher.session.requests == 3
+    assert fetcher.breaker_for(URL).state == 'open'
+
+    # A Retry-After too long to wait out pauses the host right away
+    fetcher, sleeps = make_fetcher([(429, {'Retry-After': '600'})], max_retry_after=60)
+    assert fetcher.fetch(URL).outcome == THROTTLED and not sleeps
+    assert fetcher.fetch(URL).outcome == CIRCUIT_OPEN
+
+
+def test_breaker_half_open_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow() and not breaker.allow()  # a single probe
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow() and breaker.allow()
+
+
+def test_client_errors_close_a_half_open_breaker():
+    now = [0.0]
+    fetcher, _ = make_fetcher([503, 404, 200], max_retries=0, breaker_threshold=1, breaker_reset=10)
+    fetcher.breaker_for(URL).clock = lambda: now[0]
+    assert fetcher.fetch(URL).outcome == HTTP_ERROR
+    assert fetcher.fetch(URL).outcome == CIRCUIT_OPEN
+
+    # The probe finds a removed listing: the host is up, so the breaker closes
+    now[0] = 11
+    result = fetcher.fetch(URL)
+    assert result.outcome == HTTP_ERROR and result.status_code == 404
+    assert fetcher.breaker_for(URL).state == 'closed' and not fetcher.breaker_for(URL).probing
+    assert fetcher.fetch(URL).outcome == OK
+
+    # An unexpected error during the probe opens the breaker again instead of leaving the probe in flight
+    fetcher, _ = make_fetcher([503], max_retries=0, breaker_threshold=1, breaker_reset=10)
+    breaker = fetcher.breaker_for(URL)
+    breaker.clock = lambda: now[0]
+    fetcher.fetch(URL)
+    now[0] = 22
+    fetcher.session.script = []
+    try:
+        fetcher.fetch(URL)
+        assert False, "the session error must reach the caller"
+    except IndexError:
+        pass
+    assert not breaker.probing and breaker.state == 'open'
+    now[0] = 33
+    assert breaker.allow()
+
+
+def test_decorrelated_jitter_bounds():
+    rng = random.Random(1)
+    delay = 1.0
+    for _ in range(50):
+        previous, delay = delay, decorrelated_jitter(delay, 1.0, 30.0, rng)
+        assert 1.0 <= delay <= min(30.0, previous * 3)
+
+
+if __name__ == "__main__":
+    test_retries_honor_retry_after()
+    test_gives_up_and_reports_outcome()
+    test_breaker_pauses_host()
+    test_breaker_half_open_probe()
+    test_client_errors_close_a_half_open_breaker()
+    test_decorrelated_jitter_bounds()
+    print("✅ Fetcher tests passed!")
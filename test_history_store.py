@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the columnar listing history and its analytics.
+"""
+
+import os
+import tempfile
+import pytest
+from history_store import ListingHistory
+from listing import Listing
+
+DAY = 24 * 3600
+# Monday 2024-01-01 00:00 UTC
+MONDAY = 1704067200
+
+
+def make_listing(slug, price, area=50, city='delft'):
+    return Listing(slug, f"Appartement {slug}", f"€ {price:,} per maand".replace(',', '.'),
+                   f"2611 CD {city.title()}", f"{area} m²2 kamers",
+                   f"https://www.pararius.nl/appartement-te-huur/{city}/{slug}/straat")
+
+
+def test_record_and_repair():
+    with tempfile.TemporaryDirectory() as directory:
+        history = ListingHistory(directory)
+        assert history.record([make_listing('a1', 1000), make_listing('b2', 1500)], timestamp=MONDAY) == 2
+        assert history.record([make_listing('a1', 950)], timestamp=MONDAY + DAY) == 1
+
+        # Simulate a crash halfway through an append
+        with open(os.path.join(directory, 'timestamp.col'), 'ab') as f:
+            f.write(b'\0' * 8)
+
+        reopened = ListingHistory(directory)
+        assert reopened.rows == 3
+        assert list(reopened.column('price_cents')) == [100000, 150000, 95000]
+        assert list(reopened.column('listing')) == [0, 1, 0]
+        assert reopened.cities.values == ['delft']
+
+
+def test_analytics():
+    pytest.importorskip('numpy')
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = ListingHistory(directory)
+        history.record([make_listing('a1', 1000), make_listing('b2', 1500), make_listing('c3', 900, city='leiden')], timestamp=MONDAY)
+        history.record([make_listing('a1', 900), make_listing('b2', 1500)], timestamp=MONDAY + DAY)
+        history.record([make_listing('b2', 1400)], timestamp=MONDAY + 8 * DAY)
+
+        medians = {(row['city'], row['week']): row for row in history.median_price_per_m2()}
+        # a1 counts once that week, at its last price (900 / 50 = 18), b2 at 30
+        assert medians[('delft', '2024-01-01')]['median_price_per_m2'] == 24.0
+        assert medians[('delft', '2024-01-01')]['listings'] == 2
+        assert medians[('leiden', '2024-01-01')]['median_price_per_m2'] == 18.0
+        assert medians[('delft', '2024-01-08')]['median_price_per_m2'] == 28.0
+
+        assert sorted(history.time_to_rent().tolist()) == [0.0, 1.0]
+        assert history.time_to_rent(city='leiden').tolist() == [0.0]
+
+        drops = history.price_drops()
+        assert [(drop['listing'].split('/')[-2], drop['old_price_cents'], drop['new_price_cents']) for drop in drops] == [
+            ('a1', 100000, 90000), ('b2', 150000, 140000)]
+
+
+if __name__ == "__main__":
+    test_record_and_repair()
+    test_analytics()
+    print("✅ Listing history tests passed!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the metrics registry, its Prometheus rendering and the pipeline hooks.
+"""
+
+import requests
+from metrics import MetricsRegistry, REGISTRY, PARSE_SECONDS, LISTINGS_PARSED, start_metrics_server
+from benchmarks.pages import synthetic_page
+from scraper import ParariusScraper
+
+
+def test_prometheus_text():
+    registry = MetricsRegistry()
+    fetches = registry.counter('fetches_total', 'Fetches')
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    listings = registry.gauge('listings', 'Listings')
+
+    fetches.inc(outcome='ok')
+    fetches.inc(2, outcome='throttled')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+    listings.set(30, search='delft "centrum"')
+
+    text = registry.render()
+    assert '# TYPE fetches_total counter' in text
+    assert 'fetches_total{outcome="throttled"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_count 3' in text
+    assert 'listings{search="delft \\"centrum\\""} 30' in text
+
+    summary = registry.summary()['metrics']
+    assert summary['latency_seconds']['total']['count'] == 3
+    assert summary['fetches_total']['{outcome="ok"}'] == 1
+
+
+def test_parse_is_instrumented_and_served():
+    parsed_before = LISTINGS_PARSED.value()
+    pages_before = PARSE_SECONDS.count()
+    ParariusScraper().parse_listings(synthetic_page(12))
+    assert LISTINGS_PARSED.value() == parsed_before + 12
+    assert PARSE_SECONDS.count() == pages_before + 1
+
+    server = start_metrics_server(0, host='127.0.0.1')
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        response = requests.get(f"{base_url}/metrics")
+        assert response.status_code == 200
+        assert f"scraper_listings_parsed_total {LISTINGS_PARSED.value():g}" in response.text
+        assert requests.get(f"{base_url}/other").status_code == 404
+    finally:
+        server.shutdown()
+    assert REGISTRY.summary()['metrics']['scraper_listings_parsed_total']
+
+
+if __name__ == "__main__":
+    test_prometheus_text()
+    test_parse_is_instrumented_and_served()
+    print("✅ Metrics tests passed!")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Offline tests for stable listing IDs, the legacy ID transition and the near-duplicate index.
+"""
+
+import os
+import tempfile
+from listing import Listing
+from near_duplicates import NearDuplicateIndex, listing_tokens
+from scraper import ParariusScraper
+from searches import Search
+from seen_store import SQLiteSeenStore
+
+
+def make_listing(slug, title='Appartement Oude Delft 112', price='€ 1.347 per maand',
+                 location='2611 CD Delft (Binnenstad)', details='62 m²3 kamersGestoffeerd'):
+    return Listing(slug, title, price, location, details, f"https://www.pararius.nl/appartement-te-huur/delft/{slug}/oude-delft")
+
+
+def test_relistings_and_copies_match_neighbours_do_not():
+    with tempfile.TemporaryDirectory() as directory:
+        index = NearDuplicateIndex(os.path.join(directory, 'duplicates.db'))
+        original = make_listing('85b96202')
+        neighbour = make_listing('2dd2bf93', title='Appartement Oude Delft 114')
+        elsewhere = make_listing('93c2d6b5', title='Appartement Markt 5', location='2611 GP Delft', details='35 m²1 kamer')
+        assert index.check([original, neighbour, elsewhere]) == {}
+
+        # Posted again under a new number at a new rent, and copied by another agency with its own wording
+        relisted = make_listing('c2f47f70', price='€ 1.395 per maand')
+        copy = make_listing('7b3e55d1', title='Bovenwoning Oude Delft 112', details='60 m²3 kamersGemeubileerd')
+        matches = index.check([relisted, copy])
+        assert matches['c2f47f70'] == ('85b96202', 1.0)
+        assert matches['7b3e55d1'][0] in ('85b96202', 'c2f47f70')
+        assert len(index) == 5
+        index.close()
+
+        # Signatures persist between runs
+        reopened = NearDuplicateIndex(os.path.join(directory, 'duplicates.db'))
+        assert reopened.check([make_listing('a1b2c3d4')])['a1b2c3d4'][1] == 1.0
+        reopened.close()
+
+
+def test_other_flats_in_the_same_building_do_not_match():
+    with tempfile.TemporaryDirectory() as directory:
+        index = NearDuplicateIndex(os.path.join(directory, 'duplicates.db'))
+        def flat(slug, price, details):
+            return Listing(slug, 'Appartement Van Hasseltlaan 12', price, '2624 HA Delft (Tanthof-Oost)', details,
+                           f"https://www.pararius.nl/appartement-te-huur/delft/{slug}/van-hasseltlaan")
+
+        small = flat('1a2b3c4d', '€ 1.400 per maand', '55 m²3 kamers2 slaapkamers')
+        large = flat('5e6f7a8b', '€ 1.250 per maand', '72 m²3 kamers2 slaapkamers')
+        assert index.check([small, large]) == {}
+        # Sizes a step apart are rounding, and a relisting still matches; a different bedroom count does not
+        assert index.check([flat('9c0d1e2f', '€ 1.450 per maand', '57 m²3 kamers2 slaapkamers')])['9c0d1e2f'][0] == '1a2b3c4d'
+        assert index.check([flat('3a4b5c6d', '€ 1.400 per maand', '56 m²3 kamers1 slaapkamer')]) == {}
+        index.close()
+
+
+def test_listings_without_text_are_not_compared():
+    empty = Listing('x', '', '€ 970 per maand', 'Location not available', 'Details not available',
+                    'https://www.pararius.nl/appartement-te-huur/schiedam/2dd2bf93/boylestraat')
+    assert listing_tokens(empty) == set()
+    with tempfile.TemporaryDirectory() as directory:
+        index = NearDuplicateIndex(os.path.join(directory, 'duplicates.db'))
+        assert index.check([empty, empty]) == {} and len(index) == 0
+        index.close()
+
+
+def test_new_listings_skip_legacy_ids_and_flag_duplicates():
+    with tempfile.TemporaryDirectory() as directory:
+        scraper = ParariusScraper()
+        scraper.history = None
+        scraper.seen_store = SQLiteSeenStore(os.path.join(directory, 'seen.db'))
+        scraper.duplicate_index = NearDuplicateIndex(os.path.join(directory, 'duplicates.db'))
+
+        known = make_listing('85b96202')
+        # Seen by an older version, under the ID built from title, location and price
+        scraper.seen_store.mark_seen([known.legacy_id])
+        copy = make_listing('7b3e55d1', title='Bovenwoning Oude Delft 112')
+        fresh = make_listing('93c2d6b5', title='Appartement Markt 5', location='2611 GP Delft', details='35 m²1 kamer')
+        scraper.crawl = lambda url: ([known, copy, fresh], True)
+        new = scraper.get_new_listings()
+        assert [listing.id for listing in new] == ['7b3e55d1', '93c2d6b5']
+        assert new[0]['duplicate_of'] == {'id': '85b96202', 'kind': 'duplicate', 'similarity': new[0].duplicate_of['similarity'],
+                                          'link': known.link}
+        assert 'duplicate_of' not in new[1]
+
+        # The listing known under its legacy ID was indexed, so its relisting is recognized
+        # once it has been offline for a while
+        scraper.seen_store.conn.execute("UPDATE seen_listings SET last_seen = last_seen - ? WHERE id = '85b96202'", (3 * 3600,))
+        relisted = make_listing('c2f47f70', price='€ 1.395 per maand')
+        scraper.crawl = lambda url: ([relisted, fresh], True)
+        new = scraper.get_new_listings()
+        assert [listing.id for listing in new] == ['c2f47f70'] and new[0].duplicate_of['kind'] == 'relisting'
+
+        # Or left out altogether
+        scraper.duplicate_action = 'drop'
+        scraper.crawl = lambda url: ([make_listing('d4e5f6a7', price='€ 1.410 per maand'), fresh], True)
+        assert scraper.get_new_listings() == []
+        scraper.seen_store.close()
+        scraper.duplicate_index.close()
+
+
+def test_copies_found_by_another_search_link_the_original():
+    with tempfile.TemporaryDirectory() as directory:
+        scraper = ParariusScraper()
+        scraper.history = None
+        scraper.seen_store = SQLiteSeenStore(os.path.join(directory, 'seen.db'))
+        scraper.duplicate_index = NearDuplicateIndex(os.path.join(directory, 'duplicates.db'))
+        delft, binnenstad = Search('delft', 'https://www.pararius.nl/huurwoningen/delft'), Search('binnenstad', 'https://www.pararius.nl/huurwoningen/delft/binnenstad')
+        original = make_listing('85b96202')
+        copy = make_listing('7b3e55d1', title='Bovenwoning Oude Delft 112')
+        results = {delft.url: [original], binnenstad.url: [copy]}
+        scraper.crawl = lambda url: (list(results[url]), True)
+
+        # Scheduled one search at a time, as run_continuous does
+        assert [listing.id for listing in scraper.get_new_listings([delft])] == ['85b96202']
+        new = scraper.get_new_listings([binnenstad])
+        assert [listing.id for listing in new] == ['7b3e55d1']
+        assert new[0].duplicate_of['kind'] == 'duplicate' and new[0].duplicate_of['link'] == original.link
+
+        # Once both have been gone for a while, a match is a relisting
+        scraper.seen_store.conn.execute("UPDATE seen_listings SET last_seen = last_seen - ?", (3 * 3600,))
+        results[binnenstad.url] = [make_listing('c2f47f70', price='€ 1.395 per maand')]
+        new = scraper.get_new_listings([binnenstad])
+        assert new[0].duplicate_of['kind'] == 'relisting' and 'link' not in new[0].duplicate_of
+        scraper.seen_store.close()
+        scraper.duplicate_index.close()
+
+
+if __name__ == "__main__":
+    test_relistings_and_copies_match_neighbours_do_not()
+    test_other_flats_in_the_same_building_do_not_match()
+    test_listings_without_text_are_not_compared()
+    test_new_listings_skip_legacy_ids_and_flag_duplicates()
+    test_copies_found_by_another_search_link_the_original()
+    print("✅ Near-duplicate tests passed!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the append-only notification log.
+"""
+
+import json
+import os
+import tempfile
+from notification_log import NotificationLog, migrate_json_notifications
+
+
+def make_entry(number):
+    return {"timestamp": f"2025-08-04T11:{number:02d}:00", "count": 1, "listings": [{"title": f"Listing {number} – €"}]}
+
+
+def test_rotation_keeps_full_history():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = NotificationLog(os.path.join(tmp, 'notifications.jsonl'), max_bytes=300, compress=True)
+        for number in range(40):
+            log.append(make_entry(number))
+        log.close()
+
+        segments = log.segments()
+        assert len(segments) > 1
+        assert all(path.endswith('.gz') for _, path in segments)
+        assert [entry['timestamp'] for entry in log.iter_entries()] == [make_entry(n)['timestamp'] for n in range(40)]
+
+
+def test_tail_reads_across_segments():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = NotificationLog(os.path.join(tmp, 'notifications.jsonl'), max_bytes=300, compress=False)
+        for number in range(25):
+            log.append(make_entry(number))
+
+        assert log.tail(0) == []
+        assert log.tail(3) == [make_entry(n) for n in (22, 23, 24)]
+        assert log.tail(10) == [make_entry(n) for n in range(15, 25)]
+        assert log.tail(100) == [make_entry(n) for n in range(25)]
+        log.close()
+
+        # A channel still writing after shutdown closed the log: the entry is kept and the log stays closed
+        log.append(make_entry(25))
+        assert log._file is None and log.tail(1) == [make_entry(25)]
+
+
+def test_migration_from_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'notifications.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump([make_entry(1), make_entry(2)], f)
+
+        log = NotificationLog(os.path.join(tmp, 'notifications.jsonl'))
+        assert migrate_json_notifications(log, json_path) == 2
+        assert migrate_json_notifications(log, json_path) == 0
+        log.append(make_entry(3))
+        assert log.tail(5) == [make_entry(1), make_entry(2), make_entry(3)]
+        log.close()
+
+
+if __name__ == "__main__":
+    test_rotation_keeps_full_history()
+    test_tail_reads_across_segments()
+    test_migration_from_json()
+    print("✅ Notification log tests passed!")
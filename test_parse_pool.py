@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the process-pool parse stage.
+"""
+
+from benchmarks.pages import listing_fields, render_page
+from parse_pool import ParsePool, plan_batches
+from scraper import ParariusScraper
+
+PATH = '/huurwoningen/delft'
+
+
+def result_page(page: int, page_count: int = 1) -> str:
+    """Page `page` of a search, 30 listings none of the other pages have."""
+    return render_page((listing_fields(number) for number in range(30 * (page - 1), 30 * page)),
+                       path=PATH, page=page, page_count=page_count)
+
+
+def fields(pages):
+    """Listings without the time they were parsed at."""
+    return [[{key: value for key, value in listing.items() if key != 'timestamp'} for listing in page] for page in pages]
+
+
+def test_batches_cover_pages_in_order():
+    for sizes, workers in [([38000] * 64, 8), ([100, 1, 1, 1], 4), ([1, 1, 1, 100], 2), ([38000] * 3, 8), ([5], 4)]:
+        batches = plan_batches(sizes, workers, batch_bytes=128 * 1024)
+        assert [index for batch in batches for index in batch] == list(range(len(sizes)))
+        assert all(len(batch) for batch in batches)
+        assert len(batches) == min(len(sizes), max(workers, -(-sum(sizes) // (128 * 1024))))
+    # 64 pages of 38 KB: 19 batches of 3 or 4 pages
+    assert {len(batch) for batch in plan_batches([38000] * 64, 8, 128 * 1024)} == {3, 4}
+    assert plan_batches([], 4, 1024) == []
+
+
+def test_pool_parses_like_the_scraper():
+    pages = [result_page(page) for page in range(1, 7)]
+    scraper = ParariusScraper()
+    expected = [scraper.parse_listings(page) for page in pages]
+
+    pooled = ParariusScraper()
+    pooled.parse_pool = ParsePool(workers=2, min_bytes=0, batch_bytes=1)
+    try:
+        assert pooled.parse_pool.worthwhile([page.encode('utf-8') for page in pages])
+        parsed = pooled.parse_pages(pages)
+        assert pooled.parse_pool._executor is not None and not pooled.parse_pool.broken
+    finally:
+        pooled.close()
+    assert fields(parsed) == fields(expected) and len(parsed) == 6
+
+
+def test_small_batches_and_failures_parse_in_process():
+    pages = [result_page(page) for page in range(1, 4)]
+    scraper = ParariusScraper()
+    expected = [scraper.parse_listings(page) for page in pages]
+
+    # Below min_bytes: the pool is never started
+    scraper.parse_pool = ParsePool(workers=2, min_bytes=10 * 1024 * 1024)
+    assert fields(scraper.parse_pages(pages)) == fields(expected) and scraper.parse_pool._executor is None
+
+    # A pool that fails is switched off and the pages are parsed in-process
+    class FailingExecutor:
+        def submit(self, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    scraper.parse_pool = ParsePool(workers=2, min_bytes=0)
+    scraper.parse_pool._executor = FailingExecutor()
+    assert fields(scraper.parse_pages(pages)) == fields(expected)
+    assert scraper.parse_pool.broken and not scraper.parse_pool.worthwhile([b'x'] * 2)
+
+
+def test_batched_crawl_reuses_unchanged_pages():
+    url = f"https://www.pararius.nl{PATH}"
+    pages = {url + (f"/page-{page}" if page > 1 else ''): result_page(page, page_count=3) for page in (1, 2, 3)}
+    scraper = ParariusScraper()
+    scraper.parse_pool = ParsePool(workers=2, min_bytes=10 * 1024 * 1024)
+    parsed = []
+    original = scraper.parse_pages
+    scraper.parse_pages = lambda batch: parsed.append(len(batch)) or original(batch)
+
+    changed_urls = set(pages)
+
+    def fetch_page_if_changed(url):
+        scraper.page_cache.setdefault(url, {})
+        if url in changed_urls:
+            return pages[url], True
+        return None, False
+    scraper.fetch_page_if_changed = fetch_page_if_changed
+
+    listings, changed = scraper.crawl(url)
+    assert changed and len(listings) == 90 and parsed == [3]
+
+    # Only page 2 changed: it alone is parsed, the other pages come from the last parse
+    changed_urls = {f"{url}/page-2"}
+    again, changed = scraper.crawl(url)
+    assert changed and parsed == [3, 1] and [listing.id for listing in again] == [listing.id for listing in listings]
+
+
+if __name__ == "__main__":
+    test_batches_cover_pages_in_order()
+    test_pool_parses_like_the_scraper()
+    test_small_batches_and_failures_parse_in_process()
+    test_batched_crawl_reuses_unchanged_pages()
+    print("✅ Parse pool tests passed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Check that the lxml fast-path parser and the BeautifulSoup fallback agree on the saved fixtures.
+"""
+
+import glob
+import os
+import warnings
+from bs4 import XMLParsedAsHTMLWarning
+from scraper import ParariusScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def without_timestamps(listings):
+    """Drop the parse time, which differs between runs."""
+    return [{key: value for key, value in listing.items() if key != 'timestamp'} for listing in listings]
+
+
+def test_engines_agree_on_fixtures():
+    scraper = ParariusScraper()
+    assert scraper.fast_parser is not None
+
+    fixtures = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'search_page_*.html')))
+    assert fixtures
+    for path in fixtures:
+        with open(path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+
+        fast = without_timestamps(scraper.parse_listings(html_content))
+        with warnings.catch_warnings():
+            # The edge-case fixture starts with an XML declaration on purpose
+            warnings.simplefilter('ignore', XMLParsedAsHTMLWarning)
+            soup = without_timestamps(scraper._parse_listings_soup(html_content))
+        assert fast, f"no listings parsed from {path}"
+        assert fast == soup, f"parsers disagree on {path}"
+
+
+def test_empty_page():
+    scraper = ParariusScraper()
+    assert scraper.parse_listings('') == []
+    assert scraper.parse_listings('<html><body></body></html>') == []
+
+
+if __name__ == "__main__":
+    test_engines_agree_on_fixtures()
+    test_empty_page()
+    print("✅ Parser engine tests passed!")
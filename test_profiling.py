@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the per-cycle profiler.
+"""
+
+import os
+import pstats
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from profiling import CycleProfiler
+from benchmarks.pages import synthetic_page
+from scraper import ParariusScraper
+
+
+def _parse_pages():
+    scraper = ParariusScraper()
+    pages = [synthetic_page(30, seed=seed) for seed in range(4)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        return sum(len(listings) for listings in pool.map(scraper.parse_listings, pages))
+
+
+def test_profiles_sampled_cycles():
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = CycleProfiler(output_dir=directory, every=2, top=10)
+        check = profiler.wrap(_parse_pages)
+
+        results = [check() for _ in range(3)]
+        assert results == [120, 120, 120]
+        assert profiler.calls == 3
+        assert profiler.profiled == 2  # cycles 1 and 3
+
+        files = sorted(os.listdir(directory))
+        assert [name.split('-')[1] for name in files] == ['00001', '00001', '00003', '00003']
+        assert {os.path.splitext(name)[1] for name in files} == {'.pstats', '.txt'}
+
+        # Parsing happened on pool threads but shows up in the cycle's stats
+        stats = pstats.Stats(os.path.join(directory, files[0]))
+        assert any(function == 'parse_listings' for _, _, function in stats.stats)
+
+        with open(os.path.join(directory, files[1]), encoding='utf-8') as f:
+            report = f.read()
+        assert 'Top 10 functions by cumulative time' in report
+        assert 'allocation sites' in report
+
+
+def test_threads_outside_the_cycle_stay_unprofiled():
+    """Threads started before or after a profiled cycle run unprofiled, and Thread.start is left alone."""
+    def hooks():
+        return sys.getprofile(), sys.gettrace()
+
+    start = threading.Thread.start
+    with tempfile.TemporaryDirectory() as directory:
+        # Like the scheduler: a worker started before the cycle runs another search meanwhile
+        scheduler = ThreadPoolExecutor(max_workers=1, thread_name_prefix='check')
+        scheduler.submit(lambda: None).result()
+
+        def cycle():
+            assert threading.Thread.start is start
+            assert scheduler.submit(hooks).result() == (None, None)
+            return _parse_pages()
+
+        profiler = CycleProfiler(output_dir=directory)
+        assert profiler.wrap(cycle)() == 120
+        assert threading.getprofile() is None
+
+        # Threads started after the cycle get no profiler
+        later = ThreadPoolExecutor(max_workers=1)
+        assert later.submit(hooks).result() == (None, None)
+        later.shutdown()
+        scheduler.shutdown()
+
+        stats = pstats.Stats(os.path.join(directory, sorted(os.listdir(directory))[0]))
+        functions = {function for _, _, function in stats.stats}
+        assert 'parse_listings' in functions
+        if sys.version_info < (3, 12):
+            # From 3.12 the cycle's profiler sees every thread
+            assert 'hooks' not in functions
+
+
+def test_profiled_errors_propagate():
+    with tempfile.TemporaryDirectory() as directory:
+        def failing():
+            raise RuntimeError('boom')
+
+        check = CycleProfiler(output_dir=directory).wrap(failing)
+        try:
+            check()
+            assert False, 'expected the error to propagate'
+        except RuntimeError:
+            pass
+        assert len(os.listdir(directory)) == 2
+
+
+if __name__ == "__main__":
+    test_profiles_sampled_cycles()
+    test_threads_outside_the_cycle_stay_unprofiled()
+    test_profiled_errors_propagate()
+    print("✅ Profiling tests passed!")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the content-addressed response cache and its use by the scraper.
+"""
+
+import os
+import tempfile
+from benchmarks.stub_server import StubPararius, start_server
+from config import TARGET_URL
+from rate_limit import HostRateLimiter
+from response_cache import ResponseCache, cache_key, parse_ttls
+from scraper import ParariusScraper
+
+
+def test_cache_key_normalizes_urls():
+    assert cache_key('HTTPS://www.Pararius.nl:443/huurwoningen/delft/?b=2&a=1#top') == \
+        'https://www.pararius.nl/huurwoningen/delft?a=1&b=2'
+    assert cache_key('http://127.0.0.1:8765/x') == 'http://127.0.0.1:8765/x'
+    assert parse_ttls('/huurwoningen/*=30; /*-te-huur/*=86400;bad') == [('/huurwoningen/*', 30.0), ('/*-te-huur/*', 86400.0)]
+
+
+def test_identical_bodies_stored_once_and_evicted_by_size():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(directory, ttls=parse_ttls('/*-te-huur/*=3600'), default_ttl=0, compression='gzip')
+        body = b'<html>' + b'listing ' * 500 + b'</html>'
+        cache.put('https://example.com/huurwoningen/delft', body, etag='"a"')
+        cache.put('https://example.com/huurwoningen/delft?page=1', body)
+        assert len(cache) == 2 and cache.blob_count() == 1
+        assert cache.size < len(body) / 10
+
+        stored = cache.get('https://example.com/huurwoningen/delft/')
+        assert stored.body == body and stored.etag == '"a"'
+        assert not stored.fresh
+        cache.put('https://example.com/appartement-te-huur/delft/1/x', b'detail')
+        assert cache.get('https://example.com/appartement-te-huur/delft/1/x').fresh
+
+        # A changed body replaces the old blob once nothing points to it
+        cache.put('https://example.com/huurwoningen/delft', b'changed')
+        cache.put('https://example.com/huurwoningen/delft?page=1', b'changed')
+        assert cache.blob_count() == 2
+        objects = [name for _, _, files in os.walk(os.path.join(directory, 'objects')) for name in files]
+        assert len(objects) == 2 and all(name.endswith('.gz') for name in objects)
+
+        # Least recently used blobs go first once the size limit is passed
+        cache.max_bytes = cache.size + 70
+        cache.get('https://example.com/huurwoningen/delft')
+        cache.put('https://example.com/other', os.urandom(64))
+        assert cache.get('https://example.com/appartement-te-huur/delft/1/x') is None
+        assert cache.get('https://example.com/huurwoningen/delft').body == b'changed'
+        cache.close()
+
+
+def test_scraper_reuses_and_revalidates_cached_pages():
+    stub = StubPararius(listings=45, page_size=30)
+    server, base_url = start_server(stub)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            def run(ttl):
+                # A fresh scraper per run, like separate --once invocations
+                scraper = ParariusScraper(base_url=base_url, response_cache=ResponseCache(directory, default_ttl=ttl))
+                scraper.rate_limiter = HostRateLimiter(0, 0)
+                scraper.history = None
+                listings, changed = scraper.crawl(TARGET_URL)
+                scraper.response_cache.close()
+                return listings, changed
+
+            listings, changed = run(ttl=60)
+            assert changed and len(listings) == 45 and stub.stats['200'] == 2
+
+            # Recent enough: no requests at all
+            cached, changed = run(ttl=60)
+            assert changed and [l.id for l in cached] == [l.id for l in listings]
+            assert stub.stats['requests'] == 2
+
+            # Stale: conditional GETs, and the 304s are answered from the cached bodies
+            revalidated, changed = run(ttl=0)
+            assert changed and [l.id for l in revalidated] == [l.id for l in listings]
+            assert stub.stats['304'] == 2 and stub.stats['200'] == 2
+    finally:
+        server.shutdown()
+
+
+def test_only_one_shot_runs_cache_by_default():
+    import config
+    from main import open_response_cache
+    saved = config.RESPONSE_CACHE_ENABLED, config.RESPONSE_CACHE_DIR
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            config.RESPONSE_CACHE_DIR = directory
+            for enabled, one_shot, expected in [('auto', True, True), ('auto', False, False),
+                                                ('true', False, True), ('false', True, False)]:
+                config.RESPONSE_CACHE_ENABLED = enabled
+                cache = open_response_cache(one_shot)
+                assert (cache is not None) == expected, (enabled, one_shot)
+                if cache is not None:
+                    cache.close()
+    finally:
+        config.RESPONSE_CACHE_ENABLED, config.RESPONSE_CACHE_DIR = saved
+
+
+if __name__ == "__main__":
+    test_cache_key_normalizes_urls()
+    test_identical_bodies_stored_once_and_evicted_by_size()
+    test_scraper_reuses_and_revalidates_cached_pages()
+    test_only_one_shot_runs_cache_by_default()
+    print("✅ Response cache tests passed!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the adaptive check scheduler.
+"""
+
+import threading
+import time
+from datetime import datetime
+from scheduler import AdaptiveInterval, Job, Scheduler, parse_profiles
+
+
+def test_interval_follows_arrival_rate():
+    interval = AdaptiveInterval(initial=1800, minimum=60, maximum=3600, alpha=0.5, target=1, jitter=0)
+    assert interval.next_interval() == 1800
+
+    # 6 new listings in 10 minutes: one expected every 100 seconds
+    interval.observe(6, 600)
+    assert interval.next_interval() == 100
+    # A burst is capped by the minimum
+    interval.observe(60, 60)
+    assert interval.next_interval() == 60
+
+    # Quiet checks decay the rate until the maximum is reached
+    for _ in range(20):
+        interval.observe(0, 3600)
+    assert interval.next_interval() == 3600
+
+
+def test_time_of_day_profiles():
+    profiles = parse_profiles("08:00-18:00=0.5; 23:00-07:00=4; bogus")
+    assert len(profiles) == 2
+    interval = AdaptiveInterval(initial=600, minimum=60, maximum=3600, profiles=profiles, jitter=0)
+    assert interval.next_interval(datetime(2024, 1, 1, 9, 30)) == 300
+    assert interval.next_interval(datetime(2024, 1, 1, 2, 0)) == 2400
+    assert interval.next_interval(datetime(2024, 1, 1, 20, 0)) == 600
+    assert interval.next_interval(datetime(2024, 1, 1, 18, 0)) == 600
+
+
+def test_scheduler_runs_and_skips_overlapping_runs():
+    release = threading.Event()
+    calls = {'fast': 0, 'slow': 0}
+
+    def fast():
+        calls['fast'] += 1
+        return 0
+
+    def slow():
+        calls['slow'] += 1
+        release.wait(5)
+        return 1
+
+    scheduler = Scheduler(workers=2)
+    slow_job = Job('slow', slow, AdaptiveInterval(0.02, 0.02, 0.02, jitter=0))
+    scheduler.add(Job('fast', fast, AdaptiveInterval(0.02, 0.02, 0.02, jitter=0)))
+    scheduler.add(slow_job)
+
+    runner = threading.Thread(target=scheduler.run)
+    runner.start()
+    time.sleep(0.3)
+    release.set()
+    scheduler.stop(wait=True)
+    runner.join(2)
+
+    assert not runner.is_alive()
+    assert calls['fast'] >= 5
+    # The slow check never overlapped itself
+    assert calls['slow'] <= 2 and slow_job.skipped >= 5
+
+
+if __name__ == "__main__":
+    test_interval_follows_arrival_rate()
+    test_time_of_day_profiles()
+    test_scheduler_runs_and_skips_overlapping_runs()
+    print("✅ Scheduler tests passed!")
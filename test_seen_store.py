@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the seen-listing stores and the JSON migration.
+"""
+
+import json
+import os
+import tempfile
+import time
+from metrics import SEEN_INDEX_LOOKUPS
+from seen_store import SQLiteSeenStore, JsonSeenStore, WriteBehindSeenStore, migrate_json_seen_listings
+
+
+def test_sqlite_store_keeps_history():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSeenStore(os.path.join(tmp, 'seen.db'))
+        assert store.mark_seen(['a', 'b'], now=100) == {'a', 'b'}
+        # 'a' dropped off the results; it must not come back as new later
+        assert store.mark_seen(['b', 'c'], now=200) == {'c'}
+        assert store.mark_seen(['a', 'c'], now=300) == set()
+        assert store.all_ids() == {'a', 'b', 'c'}
+        assert store.known_ids(['a', 'd']) == {'a'} and store.count() == 3
+
+        rows = dict((row[0], row[1:]) for row in store.conn.execute("SELECT id, first_seen, last_seen FROM seen_listings"))
+        assert rows == {'a': (100, 300), 'b': (100, 200), 'c': (200, 300)}
+        store.close()
+
+
+def test_overlapping_runs_claim_each_listing_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'seen.db')
+        first, second = SQLiteSeenStore(path), SQLiteSeenStore(path)
+        assert first.mark_seen(['x', 'y']) == {'x', 'y'}
+        assert second.mark_seen(['x', 'y', 'z']) == {'z'}
+        first.close()
+        second.close()
+
+
+def test_json_migration_runs_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'seen_listings.json')
+        with open(json_path, 'w') as f:
+            json.dump({'seen_ids': ['old-1', 'old-2']}, f)
+
+        store = SQLiteSeenStore(os.path.join(tmp, 'seen.db'))
+        assert migrate_json_seen_listings(store, json_path) == 2
+        assert migrate_json_seen_listings(store, json_path) == 0
+        assert store.mark_seen(['old-1', 'new-1']) == {'new-1'}
+        store.close()
+
+
+def test_json_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JsonSeenStore(os.path.join(tmp, 'seen_listings.json'))
+        assert store.mark_seen(['a']) == {'a'}
+        assert store.mark_seen(['a', 'b']) == {'b'}
+        assert store.count() == 2
+        assert store.known_ids(['b', 'c']) == {'b'}
+        # Written by rename, nothing left behind
+        assert os.listdir(tmp) == ['seen_listings.json']
+
+
+def test_write_behind_keeps_cycles_in_memory():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'seen.db')
+        start = time.time()
+        backing = SQLiteSeenStore(path)
+        backing.mark_seen(['a'], now=start - 100)
+        store = WriteBehindSeenStore(backing, interval=0).start()
+
+        class Untouchable:
+            def mark_seen(self, listing_ids, now=None):
+                raise AssertionError("a cycle must not write to the backing store")
+
+            def known_ids(self, listing_ids):
+                raise AssertionError("recent and never-seen listings must be answered from memory")
+
+        store.store, real = Untouchable(), backing
+        assert store.mark_seen(['a', 'b'], now=start) == {'b'}
+        assert store.mark_seen(['b', 'c'], now=start + 100) == {'c'}
+        assert store.known_ids(['a', 'd']) == {'a'} and store.pending == 3
+
+        # A failed write-behind keeps the changes for the next attempt
+        assert store.flush() == 0 and store.pending == 3
+        store.store = real
+        assert store.flush() == 3 and store.pending == 0
+        rows = dict((row[0], row[1:]) for row in backing.conn.execute("SELECT id, first_seen, last_seen FROM seen_listings"))
+        assert rows == {'a': (start - 100, start), 'b': (start, start + 100), 'c': (start + 100, start + 100)}
+        store.close()
+
+
+def test_touch_refreshes_only_known_listings():
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.time() - 1000
+        backing = SQLiteSeenStore(os.path.join(tmp, 'seen.db'))
+        backing.mark_seen(['a', 'b'], now=start)
+        backing.touch(['a', 'new'], now=start + 400)
+        assert sorted(backing.seen_since()) == [('a', start + 400), ('b', start)]
+
+        store = WriteBehindSeenStore(backing, interval=0, ttl=3000).start()
+        store.touch(['b', 'other'], now=start + 800)
+        assert store.last_seen(['a', 'b', 'other']) == {'a': start + 400, 'b': start + 800}
+        assert store.pending == 1 and store.expire(now=start + 3600) == 1
+        assert store.all_ids() == {'b'} and store.mark_seen(['other'], now=start + 3700) == {'other'}
+        store.close()
+
+
+def test_sqlite_store_forgets_listings_after_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSeenStore(os.path.join(tmp, 'seen.db'))
+        store.mark_seen(['old', 'kept'], now=100)
+        store.mark_seen(['kept', 'new'], now=500)
+        assert sorted(store.seen_since(400)) == [('kept', 500), ('new', 500)]
+        assert store.expire(before=400) == 1
+        assert store.all_ids() == {'kept', 'new'}
+        # Forgotten listings are new again when they come back
+        assert store.mark_seen(['old'], now=600) == {'old'}
+        store.close()
+
+
+def test_write_behind_filter_survives_restarts():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, bloom_path = os.path.join(tmp, 'seen.db'), os.path.join(tmp, 'seen.bloom')
+        now = time.time()
+        store = WriteBehindSeenStore(SQLiteSeenStore(db_path), interval=0, ttl=86400 * 60,
+                                     bloom_path=bloom_path, recent=3600).start()
+        store.mark_seen([f"listing-{number}" for number in range(200)], now=now - 7200)
+        store.close()
+        assert os.path.exists(bloom_path)
+
+        # Written by a --once run after the filter was saved
+        backing = SQLiteSeenStore(db_path)
+        backing.mark_seen(['late'], now=now - 60)
+        lookups = []
+        known_ids = backing.known_ids
+        backing.known_ids = lambda listing_ids: lookups.append(list(listing_ids)) or known_ids(listing_ids)
+
+        store = WriteBehindSeenStore(backing, interval=0, ttl=86400 * 60, bloom_path=bloom_path, recent=3600).start()
+        before = {source: SEEN_INDEX_LOOKUPS.value(source=source) for source in ('memory', 'filter', 'store')}
+        # Not seen for two hours: out of the recent set, confirmed by the store; 'late' is recent again
+        assert store.mark_seen(['listing-1', 'late', 'fresh'], now=now) == {'fresh'}
+        assert lookups == [['listing-1']]
+        # One answer from each source, whatever the store said
+        assert {source: SEEN_INDEX_LOOKUPS.value(source=source) - count for source, count in before.items()} == \
+            {'memory': 1, 'filter': 1, 'store': 1}
+
+        # Sixty days on, everything but the listings seen just now is forgotten
+        later = now + 86400 * 60 - 1
+        assert store.expire(now=later) == 199
+        assert store.mark_seen(['listing-1', 'listing-2'], now=later) == {'listing-2'}
+        store.close()
+
+
+def test_write_behind_thread_and_close_persist_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'seen_listings.json')
+        store = WriteBehindSeenStore(JsonSeenStore(path), interval=0.05).start()
+        store.mark_seen(['a', 'b'])
+        deadline = time.monotonic() + 5
+        while JsonSeenStore(path).all_ids() != {'a', 'b'} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert JsonSeenStore(path).all_ids() == {'a', 'b'} and store.pending == 0
+
+        store.mark_seen(['c'])
+        store.close()
+        assert JsonSeenStore(path).all_ids() == {'a', 'b', 'c'}
+
+
+if __name__ == "__main__":
+    test_sqlite_store_keeps_history()
+    test_overlapping_runs_claim_each_listing_once()
+    test_json_migration_runs_once()
+    test_json_store()
+    test_write_behind_keeps_cycles_in_memory()
+    test_touch_refreshes_only_known_listings()
+    test_sqlite_store_forgets_listings_after_ttl()
+    test_write_behind_filter_survives_restarts()
+    test_write_behind_thread_and_close_persist_changes()
+    print("✅ Seen store tests passed!")
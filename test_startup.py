@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Cold start regression test: importing the cron entry point must stay cheap and side-effect free.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modules that are imported where they are used, never at startup
+LAZY_MODULES = ('requests', 'bs4', 'lxml', 'dotenv', 'numpy', 'sqlite3', 'http.server')
+
+# Importing railway_job took ~230ms before the heavy imports were made lazy and ~55ms after; the default
+# leaves room for a busy CI machine, set STARTUP_BUDGET_MS=150 for a tighter check
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', 500))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module: str, cwd: str):
+    """Run `python -X importtime -c "import module"`; return {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd, capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=ROOT), check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cold_start_is_lazy_and_side_effect_free():
+    with tempfile.TemporaryDirectory() as directory:
+        # A .env file is read without python-dotenv
+        with open(os.path.join(directory, '.env'), 'w') as f:
+            f.write('# local settings\nexport SEEN_TTL_DAYS="30"\n')
+        times = import_times('railway_job', directory)
+        # No log files, stores or history created just by importing
+        assert os.listdir(directory) == ['.env']
+
+    assert 'railway_job' in times and 'main' in times
+    eager = [name for name in times if name.split('.')[0] in LAZY_MODULES or name in LAZY_MODULES]
+    assert not eager, f"imported at startup: {eager}"
+
+
+def test_env_file_fills_unset_variables():
+    from config import _load_env_file
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, '.env')
+        with open(path, 'w') as f:
+            f.write('# local settings\nexport STARTUP_TEST_A="quoted # value"\nSTARTUP_TEST_B = 2  # comment\n'
+                    'STARTUP_TEST_C=from file\nnot a setting\n')
+        os.environ['STARTUP_TEST_C'] = 'from environment'
+        try:
+            _load_env_file(path)
+            assert [os.environ.get(f'STARTUP_TEST_{key}') for key in 'ABC'] == ['quoted # value', '2', 'from environment']
+        finally:
+            for key in 'ABC':
+                os.environ.pop(f'STARTUP_TEST_{key}', None)
+
+
+def test_cold_start_within_budget():
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [import_times('railway_job', directory) for _ in range(3)]
+
+    # Best of three, since a busy machine only ever makes imports slower
+    best = min(run['railway_job'] for run in runs)
+    assert best / 1000 < STARTUP_BUDGET_MS, f"importing railway_job took {best / 1000:.0f}ms"
+
+
+if __name__ == "__main__":
+    test_cold_start_is_lazy_and_side_effect_free()
+    test_env_file_fills_unset_variables()
+    test_cold_start_within_budget()
+    print("✅ Startup tests passed!")
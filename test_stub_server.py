@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Crawl the local Pararius stand-in server end to end.
+"""
+
+import requests
+from benchmarks.stub_server import StubPararius, start_server
+from config import TARGET_URL
+from rate_limit import HostRateLimiter
+from scraper import ParariusScraper
+
+
+def make_scraper(base_url):
+    scraper = ParariusScraper(base_url=base_url)
+    scraper.rate_limiter = HostRateLimiter(0, 0)
+    scraper.history = None
+    return scraper
+
+
+def test_crawl_pagination_etags_and_churn():
+    stub = StubPararius(listings=95, page_size=30, churn_rate=0.1, churn_interval=3600)
+    server, base_url = start_server(stub)
+    try:
+        scraper = make_scraper(base_url)
+        assert scraper.rebase_url(TARGET_URL).startswith(base_url + '/huurwoningen/delft/')
+
+        listings, changed = scraper.crawl(TARGET_URL)
+        assert changed and len(listings) == 95
+        assert all(listing.link.startswith(base_url) for listing in listings)
+        assert stub.stats['200'] == 4
+
+        # Every page revalidates with its ETag
+        _, changed = scraper.crawl(TARGET_URL)
+        assert not changed and stub.stats['304'] == 4
+
+        stub.churn()
+        churned, changed = scraper.crawl(TARGET_URL)
+        new_ids = {listing.id for listing in churned} - {listing.id for listing in listings}
+        assert changed and len(churned) == 95 and len(new_ids) == 10
+        # New listings appear first, as on the real site
+        assert {listing.id for listing in churned[:10]} == new_ids
+    finally:
+        server.shutdown()
+
+
+def test_fault_injection():
+    stub = StubPararius(listings=10, rate_429=1.0, retry_after=7)
+    server, base_url = start_server(stub)
+    try:
+        response = requests.get(f"{base_url}/huurwoningen/delft")
+        assert response.status_code == 429 and response.headers['Retry-After'] == '7'
+        assert requests.get(f"{base_url}/_stats").json()['429'] == 1
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_crawl_pagination_etags_and_churn()
+    test_fault_injection()
+    print("✅ Stub server tests passed!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline tests for subscriber filters and the matching index.
+"""
+
+import random
+from subscribers import Subscriber, SubscriberIndex, RangeIndex, listing_attributes
+from benchmarks.bench_subscribers import synthetic_subscribers, synthetic_listings
+
+LISTING = {
+    'title': 'Appartement Oude Delft 112',
+    'price': '€ 1.347 per maand',
+    'location': '2611 CD Delft (Binnenstad)',
+    'details': '62 m²3 kamersGestoffeerd',
+    'link': 'https://www.pararius.nl/appartement-te-huur/delft/85b96202/oude-delft',
+}
+
+
+def test_listing_attributes():
+    price, area, bedrooms, city, words = listing_attributes(LISTING)
+    assert (price, area, bedrooms, city) == (1347, 62, 2, 'delft')
+    assert {'appartement', 'oude', 'delft', '112'} <= words
+
+    # Older markup without a location falls back to the city in the URL
+    bare = {'title': '', 'price': '€ 970 per maand', 'location': 'Location not available',
+            'details': 'Details not available', 'link': 'https://www.pararius.nl/appartement-te-huur/den-haag/2dd2bf93/x'}
+    assert listing_attributes(bare)[:4] == (970, None, None, 'den-haag')
+
+
+def test_range_index_boundaries():
+    index = RangeIndex([(1000, 1500), (None, 1000), (1500, None), (None, None)])
+    assert index.lookup(999) == 0b1010
+    assert index.lookup(1000) == 0b1011
+    assert index.lookup(1200) == 0b1001
+    assert index.lookup(1500) == 0b1101
+    assert index.lookup(1501) == 0b1100
+    assert index.lookup(None) == 0b1111
+
+
+def test_filters():
+    subscribers = [
+        Subscriber('a@example.com', max_price=1400, cities=['Delft']),
+        Subscriber('b@example.com', max_price=1300),
+        Subscriber('c@example.com', min_area=60, min_bedrooms=2, cities=['Den Haag', 'delft']),
+        Subscriber('d@example.com', keywords=['balkon']),
+        Subscriber('e@example.com', keywords=['Oude Delft']),
+    ]
+    index = SubscriberIndex(subscribers)
+    assert [s.email for s in index.match(LISTING)] == ['a@example.com', 'c@example.com', 'e@example.com']
+    assert index.match_batch([LISTING]) == {'a@example.com': [LISTING], 'c@example.com': [LISTING], 'e@example.com': [LISTING]}
+
+
+def test_multi_word_keywords_need_every_word():
+    subscribers = [
+        Subscriber('a@example.com', keywords=['Oude Delft']),
+        Subscriber('b@example.com', keywords=['open keuken', 'tuin']),
+    ]
+    index = SubscriberIndex(subscribers)
+    elsewhere = dict(LISTING, title='Appartement Nieuwe Langendijk 3')
+    kitchen = dict(LISTING, details='62 m² 3 kamers open keuken')
+    assert index.match(elsewhere) == [] and not subscribers[0].matches(elsewhere)
+    assert index.match(LISTING) == [subscribers[0]]
+    assert index.match(kitchen) == subscribers
+    assert index.match(dict(LISTING, details='62 m² 3 kamers keuken')) == [subscribers[0]]
+    assert index.match(dict(LISTING, details='tuin')) == subscribers
+    for listing in (elsewhere, kitchen, LISTING):
+        assert index.match(listing) == [s for s in subscribers if s.matches(listing)]
+
+
+def test_index_agrees_with_full_scan():
+    rng = random.Random(7)
+    subscribers = synthetic_subscribers(500, rng)
+    index = SubscriberIndex(subscribers)
+    for listing in synthetic_listings(50, rng) + [LISTING]:
+        assert index.match(listing) == [s for s in subscribers if s.matches(listing)]
+
+
+if __name__ == "__main__":
+    test_listing_attributes()
+    test_range_index_boundaries()
+    test_filters()
+    test_multi_word_keywords_need_every_word()
+    test_index_agrees_with_full_scan()
+    print("✅ Subscriber tests passed!")